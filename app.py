@@ -2,20 +2,28 @@
 # app.py — ISMarket Date-wise, Table-wise & Recommendations Viewer
 # ===================================================================
 
-from flask import Flask, jsonify, render_template, request
+from flask import (Flask, Response, g, jsonify, make_response, render_template,
+                   request, stream_with_context)
 from flask_cors import CORS
-import sqlite3
 import os
 import datetime
-from chartink import update_all
+import hashlib
+import time
+import chartink
+import deltas
+import events
+import export
+import jobs
+import metrics
+import report
+import rules
+import storage
+from cache import ResponseCache
 
 # Initialize Flask
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-@app.route("/")
-def home():
-    return render_template("index.html")
 # ---------------------------------------------------------
 # CORS headers (extra safety for browsers)
 # ---------------------------------------------------------
@@ -28,121 +36,52 @@ def add_cors_headers(response):
 
 
 # ---------------------------------------------------------
-# FORMAT DATE (Indian style)
+# REQUEST METRICS (see /metrics)
 # ---------------------------------------------------------
-def format_indian_date():
-    today = datetime.date.today()
-    day = today.day
-
-    if day in [1, 21, 31]:
-        suffix = "st"
-    elif day in [2, 22]:
-        suffix = "nd"
-    elif day in [3, 23]:
-        suffix = "rd"
-    else:
-        suffix = "th"
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
 
-    formatted_day = f"{day}{suffix}"
-    month = today.strftime("%B")
-    year = today.year
 
-    return f"{formatted_day} {month} {year}"
+@app.after_request
+def record_request(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+
+    # Route pattern, not the raw path, so labels stay bounded
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe(metrics.HTTP_REQUEST, time.perf_counter() - started,
+                    route=route, method=request.method, status=response.status_code)
+    if not response.is_streamed:
+        metrics.observe(metrics.HTTP_RESPONSE_BYTES, response.calculate_content_length() or 0,
+                        route=route)
+    return response
 
 
 # ---------------------------------------------------------
-# TABLE → HTML Generator
+# STORAGE
 # ---------------------------------------------------------
-def table_to_html(rows, title):
-    """
-    Convert rows into an HTML table for the report.
-
-    Even if there is no data, we still show a table
-    with fixed columns:
-    stock_name | price | change | volume | symbol
-    """
-    # Protect against None
-    rows = rows or []
-
-    # Section title
-    html = f"<h3>{title}</h3>"
-    html += "<table style='width:100%; border-collapse:collapse; background:#d7ecff;'>"
-
-    # Fixed column order (same as your screenshot)
-    columns = ["stock_name", "price", "change", "volume", "symbol"]
-
-    # ---- Header row ----
-    html += "<tr>"
-    for col in columns:
-        html += f"<th style='border:1px solid #000; padding:6px;'>{col}</th>"
-    html += "</tr>"
-
-    # ---- Data rows (only if we have any) ----
-    for row in rows:
-        html += "<tr>"
-        for col in columns:
-            value = row.get(col, "")
-            html += f"<td style='border:1px solid #000; padding:6px;'>{value}</td>"
-        html += "</tr>"
+# Screener data comes from storage.py (ISMARKET_STORAGE picks the backend)
+store = storage.get_store()
 
-    html += "</table><br>"
-    return html
+# Days with data, loaded once; refreshes run here add their day on commit
+day_index = storage.DayIndex(store)
+chartink.SAVE_LISTENERS.append(lambda day, screeners: day_index.add(day))
 
+# Pushes refresh events to /api/events streams (one poller per worker)
+event_hub = events.Hub()
 
+# Built responses, keyed by request + the day's data version
+response_cache = ResponseCache()
 
-def filter_top5_for_report(rows):
-    """
-    Apply all business rules for Technical Analysis Report:
-
-    1) Only top 5 stocks (by % change, highest first)
-    2) Skip if % change < 2
-    3) Skip if volume < 2000
-    4) Skip if price < 5
-    5) Skip dummy 'N/A' rows
-    """
-    filtered = []
-
-    for r in rows:
-        # Skip dummy / empty rows
-        name = str(r.get("stock_name", "")).strip()
-        if not name or name.upper() == "N/A":
-            continue
-
-        # Safely convert values
-        try:
-            price = float(r.get("price") or 0)
-        except Exception:
-            price = 0.0
-
-        try:
-            change = float(r.get("change") or 0)
-        except Exception:
-            change = 0.0
-
-        try:
-            volume = int(r.get("volume") or 0)
-        except Exception:
-            volume = 0
-
-        # Apply your conditions
-        if change < 2:      # condition 2
-            continue
-        if volume < 2000:   # condition 3
-            continue
-        if price < 5:       # condition 4
-            continue
-
-        filtered.append(r)
-
-    # Sort by % change (highest first) and take only top 5
-    filtered.sort(key=lambda x: float(x.get("change") or 0), reverse=True)
-    return filtered[:5]
-
-# ---------------------------------------------------------
-# PATH SETTINGS
-# ---------------------------------------------------------
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-MAIN_DB = os.path.join(BASE_DIR, "chartink_data.db")
+metrics.gauge("ismarket_response_cache_hits_total", "Response cache hits",
+              lambda: response_cache.hits, kind="counter")
+metrics.gauge("ismarket_response_cache_misses_total", "Response cache misses",
+              lambda: response_cache.misses, kind="counter")
+metrics.gauge("ismarket_response_cache_entries", "Responses held in the cache",
+              lambda: len(response_cache))
+metrics.gauge("ismarket_days", "Days with screener data", lambda: len(day_index.days()))
 
 TABLES = {
     "bms": "Best Multibagger Stocks",
@@ -356,35 +295,74 @@ FORMULAS = {
 }
 
 # ---------------------------------------------------------
-# GET DB PATH FOR SPECIFIC DAY OR LATEST
+# RESOLVE SPECIFIC DAY OR LATEST (None if no data)
 # ---------------------------------------------------------
-def get_db_path_for_day(day=None):
-    daily_dir = os.path.join(BASE_DIR, "daily_dbs")
+def resolve_day(day=None):
+    if day:
+        return day if day_index.has(day) else None
+    return day_index.latest()
 
-    if not os.path.exists(daily_dir):
-        return None
 
-    if day:
-        db_file = os.path.join(daily_dir, f"{day}.db")
-        return db_file if os.path.exists(db_file) else None
+# ---------------------------------------------------------
+def read_tables(day, keys, view_rules):
+    """
+    Load several screeners for a day in one pass, filtered by
+    `view_rules`. Returns ({key: rows}, [keys with no table for that day]).
+    """
+    return store.read_filtered(day, {k: view_rules for k in keys})
 
-    files = [f for f in os.listdir(daily_dir) if f.endswith(".db")]
-    if not files:
+
+def request_rules():
+    """rules.VIEW_RULES overridden by ?min_change=&min_volume=&min_price=&limit=&order_by="""
+    return rules.rules_from_args(request.args, rules.VIEW_RULES)
+
+
+def request_day(name):
+    """?<name>=YYYY-MM-DD → "YYYY_MM_DD" key, None if absent; ValueError if not a date."""
+    value = request.args.get(name)
+    if not value:
         return None
-    latest = sorted(files, reverse=True)[0]
-    return os.path.join(daily_dir, latest)
+    try:
+        return storage.parse_day(value)
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' date {value!r} (expected YYYY-MM-DD)")
 
 
 # ---------------------------------------------------------
-def read_table_from_daily_db(db_path, table_name):
-    try:
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute(f'SELECT * FROM "{table_name}"').fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
-    except Exception:
-        return []
+# CACHED RESPONSES (ETag / Last-Modified / 304)
+# ---------------------------------------------------------
+def cached_response(key, version, build):
+    """
+    Serve build() through the response cache.
+
+    `version` is the data version of the day being served (its last
+    write time). It is part of the cache key and the ETag, so a refresh
+    changes both; clients holding the current version get a 304.
+    """
+    if version is None:
+        return build()
+
+    etag = hashlib.md5(repr((key, version)).encode()).hexdigest()
+    last_modified = datetime.datetime.fromtimestamp(version, datetime.timezone.utc)
+
+    if request.if_none_match.contains(etag):
+        resp = make_response("", 304)
+    else:
+        hit = response_cache.get((key, version))
+        if hit is None:
+            built = make_response(build())
+            if built.status_code != 200:
+                return built
+            hit = (built.get_data(), built.mimetype)
+            response_cache.put((key, version), hit)
+        resp = make_response(hit[0])
+        resp.mimetype = hit[1]
+
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = "no-cache"
+    # Handles If-Modified-Since for clients that don't send ETags
+    return resp.make_conditional(request)
 
 
 # ---------------------------------------------------------
@@ -396,14 +374,14 @@ def home():
     return render_template("index.html", titles=TABLES)
 
 
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/api/get_days")
 def get_days():
-    daily_dir = os.path.join(BASE_DIR, "daily_dbs")
-    if not os.path.exists(daily_dir):
-        return jsonify({"days": []})
-    days = [f.replace(".db", "") for f in os.listdir(daily_dir) if f.endswith(".db")]
-    days.sort(reverse=True)
-    return jsonify({"days": days})
+    return jsonify({"days": day_index.days()})
 
 
 # ---------------------------------------------------------
@@ -411,133 +389,282 @@ def get_days():
 # ---------------------------------------------------------
 @app.route("/api/today-report")
 def today_report():
-    today_str = format_indian_date()
-    db_path = get_db_path_for_day(None)
+    today_str = report.format_indian_date()
+    report_day = resolve_day(None)
 
-    if not db_path:
+    if not report_day:
         return jsonify({
-            "title": f"Technical Analysis Report — {today_str}",
+            "title": report.report_title(today_str),
             "summary": "No database found for today.",
             "content": "<p>No data available. Please run update first.</p>"
         })
 
-    # Sections included in the report (you can add more later)
-    section_keys = [
-        ("bms", "Best Multibagger Stocks"),
-        ("lowest_pe", "Top stocks with the lowest Price Earning Ratios(PE)"),
-        ("bullish_script", "Bullish Script"),
-        ("profit_jump", "Profit jump by 200%"),
-        ("sales_jump", "Sales jump by 200%"),
-        ("below_book_value", "Stocks below Book value - Undervalued"),
-        ("buy_entry_intraday", "Buy entry intraday"),
-    ]
-
-    # Report header
-    full_html = f"""
-        <h2>Technical Analysis Report — {today_str}</h2>
-        <p>This report is automatically generated from Chartink screeners.</p>
-        <br>
-    """
-
-    # Build each section with filters applied
-    for i, (key, title) in enumerate(section_keys, start=1):
-        rows = read_table_from_daily_db(db_path, key)
-
-        # ✅ apply your conditions and take top 5
-        rows_filtered = filter_top5_for_report(rows)
-
-        full_html += table_to_html(rows_filtered, f"{i}.) {title}")
-
-    return jsonify({
-        "title": f"Technical Analysis Report — {today_str}",
-        "summary": f"Technical analysis report as on {today_str}.",
-        "content": full_html
-    })
+    # ✅ Pre-rendered at refresh time (report.py) → no store reads
+    pub = report.published()
+    if pub and pub["payload"].get("day") == report_day \
+            and pub["payload"].get("title") == report.report_title(today_str):
+        resp = make_response(pub["raw"])
+        resp.mimetype = "application/json"
+        resp.set_etag(hashlib.md5(repr(("today-report", report_day, pub["mtime"])).encode()).hexdigest())
+        resp.last_modified = datetime.datetime.fromtimestamp(pub["mtime"], datetime.timezone.utc)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp.make_conditional(request)
+
+    # Not published yet (or a new calendar day) → build it
+    return cached_response(
+        ("today-report", report_day, today_str),
+        store.data_version(report_day),
+        lambda: jsonify(report.build_today_report(report.read_sections(store, report_day), today_str)),
+    )
 
 
 
 @app.route("/api/get_table/<table>")
 def get_table(table):
-    day = request.args.get("day")
-    if day:
-        day = day.replace("-", "_")
-    db_path = get_db_path_for_day(day)
-    if not db_path:
+    try:
+        day = request_day("day")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    data_day = resolve_day(day)
+    if not data_day:
         return jsonify({"error": "DB not found", "day": day}), 500
 
-    data = {}
     if table == "all":
-        for t in TABLES.keys():
-            data[t] = read_table_from_daily_db(db_path, t)
+        keys = list(TABLES.keys())
     elif table in TABLES:
-        data[table] = read_table_from_daily_db(db_path, table)
+        keys = [table]
     else:
         return jsonify({"error": "Invalid table"}), 400
 
-    return jsonify({"day": day, "tables": data})
+    try:
+        view_rules = request_rules()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def build():
+        data, missing = read_tables(data_day, keys, view_rules)
+        return jsonify({"day": day, "tables": data, "missing": missing, "rules": view_rules})
 
+    return cached_response(("get_table", day, data_day, table, rules.rules_key(view_rules)),
+                           store.data_version(data_day), build)
 
-@app.route("/api/update_live")
+
+@app.route("/api/update_live", methods=["GET", "POST"])
 def update_live():
+    """
+    Start a background refresh (or attach to the running one) and
+    return its job id at once. Poll /api/update_status/<job_id>.
+    """
     try:
-        update_all()
-        return jsonify({"status": "ok", "message": "Live data updated successfully!"})
+        job, started = jobs.start_refresh()
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+    return jsonify({
+        "status": "started" if started else "running",
+        "message": "Refresh started" if started else "Refresh already running",
+        "job_id": job["id"],
+        "status_url": f"/api/update_status/{job['id']}",
+    }), 202
+
+
+@app.route("/api/update_status")
+@app.route("/api/update_status/<job_id>")
+def update_status(job_id=None):
+    job = jobs.get_job(job_id) if job_id else jobs.latest_job()
+    if not job:
+        return jsonify({"error": "Job not found", "job_id": job_id}), 404
+    return jsonify(job)
+
+
+# ---------------------------------------------------------
+# API — WHAT CHANGED (precomputed at refresh time, see deltas.py)
+#   /api/diff?screener=bms                        latest run-to-run change
+#   /api/diff?from=2025-11-27&to=2025-11-28&screener=bms,bullish_script
+# ---------------------------------------------------------
+@app.route("/api/diff")
+def screener_diff():
+    try:
+        start, end = request_day("from"), request_day("to") or day_index.latest()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    screeners = [s for s in request.args.get("screener", "").split(",") if s]
+    bad = [s for s in screeners if s not in TABLES]
+    if bad:
+        return jsonify({"error": "Invalid screener", "screeners": bad}), 400
+    if not end:
+        return jsonify({"error": "DB not found", "day": end}), 500
+    if start and start >= end:
+        return jsonify({"error": "from must be before to"}), 400
+
+    keys = screeners or list(TABLES)
+    if start:
+        out = deltas.diffs(keys, start, end)
+    else:
+        out = {key: {"added": run["added"], "dropped": run["dropped"], "moved": run["moved"],
+                     "runs": 1, "at": run["created_at"]} if run else None
+               for key, run in deltas.last_runs(keys, end).items()}
+
+    return jsonify({"from": start or "last_run", "to": end, "screeners": out})
+
+
+# ---------------------------------------------------------
+# API — LIVE UPDATES (Server-Sent Events, see events.py)
+#   new EventSource("/api/events") → "refresh" events with the day,
+#   the screeners that changed and their rows
+# ---------------------------------------------------------
+@app.route("/api/events")
+def event_stream():
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({"error": "Invalid last_id"}), 400
+
+    return Response(
+        stream_with_context(event_hub.stream(last_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------------------------------------
+# API — PER-SYMBOL HISTORY
+#   /api/symbol/TATAMOTORS/history?from=2025-11-01&to=2025-11-30
+#                                  &screener=bms,bullish_script
+# ---------------------------------------------------------
+@app.route("/api/symbol/<symbol>/history")
+def symbol_history(symbol):
+    try:
+        start, end = request_day("from"), request_day("to")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    screeners = [s for s in request.args.get("screener", "").split(",") if s]
+    bad = [s for s in screeners if s not in TABLES]
+    if bad:
+        return jsonify({"error": "Invalid screener", "screeners": bad}), 400
+
+    symbol = symbol.strip().upper()
+    hits = store.symbol_history(symbol, start, end, screeners or None)
+    return jsonify({
+        "symbol": symbol,
+        "from": start,
+        "to": end,
+        "screeners": screeners or list(TABLES.keys()),
+        "count": len(hits),
+        "history": hits,
+    })
+
+
+# ---------------------------------------------------------
+# API — BULK EXPORT (streamed)
+#   /api/export?from=2025-11-01&to=2025-11-30&format=csv
+#              &screener=bms,lowest_pe&gzip=0
+# ---------------------------------------------------------
+@app.route("/api/export")
+def export_history():
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in export.FORMATS:
+        return jsonify({"error": "Invalid format", "formats": list(export.FORMATS)}), 400
+
+    # Validated here: a bad date can't fail mid-stream, after the 200
+    try:
+        start, end = request_day("from"), request_day("to")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    screeners = [s for s in request.args.get("screener", "").split(",") if s]
+    bad = [s for s in screeners if s not in TABLES]
+    if bad:
+        return jsonify({"error": "Invalid screener", "screeners": bad}), 400
+
+    compress = request.args.get("gzip", "1") != "0"
+    chunks = export.export_chunks(store, fmt, start, end, screeners or None, compress)
+    filename = export.export_filename(fmt, start, end, compress)
+    mimetype = "application/gzip" if filename.endswith(".gz") else export.FORMATS[fmt][0]
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 
 # ---------------------------------------------------------
 # HTML VIEWS
 # ---------------------------------------------------------
 @app.route("/view/all")
 def view_all():
-    day = request.args.get("day")
-    if day:
-        day = day.replace("-", "_")
-    db_path = get_db_path_for_day(day)
-
-    tables_data = {}
-    if db_path:
-        for key in TABLES:
-            tables_data[key] = read_table_from_daily_db(db_path, key)
-
-    return render_template(
-        "view.html",
-        title="All Recommendations",
-        tables=tables_data,
-        titles=TABLES,
-        day=day,
-        current_table=None,
-        formulas=FORMULAS,
-    )
+    try:
+        day = request_day("day")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    data_day = resolve_day(day)
+    try:
+        view_rules = request_rules()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def build():
+        tables_data, missing = {}, []
+        if data_day:
+            tables_data, missing = read_tables(data_day, TABLES.keys(), view_rules)
+
+        return render_template(
+            "view.html",
+            title="All Recommendations",
+            tables=tables_data,
+            missing=missing,
+            titles=TABLES,
+            day=day,
+            current_table=None,
+            formulas=FORMULAS,
+        )
+
+    version = store.data_version(data_day) if data_day else None
+    return cached_response(("view_all", day, data_day, rules.rules_key(view_rules)),
+                           version, build)
 
 
 @app.route("/view/<table>")
 def view_single_table(table):
-    day = request.args.get("day")
-    if day:
-        day = day.replace("-", "_")
-    db_path = get_db_path_for_day(day)
-
-    tables_data = {}
-    if db_path and table in TABLES:
-        tables_data[table] = read_table_from_daily_db(db_path, table)
-
-    return render_template(
-        "view.html",
-        title=TABLES.get(table, "Unknown Screener"),
-        tables=tables_data,
-        titles=TABLES,
-        day=day,
-        current_table=table,
-        formulas=FORMULAS,
-    )
+    try:
+        day = request_day("day")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    data_day = resolve_day(day)
+    try:
+        view_rules = request_rules()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def build():
+        tables_data, missing = {}, []
+        if data_day and table in TABLES:
+            tables_data, missing = read_tables(data_day, [table], view_rules)
+
+        return render_template(
+            "view.html",
+            title=TABLES.get(table, "Unknown Screener"),
+            tables=tables_data,
+            missing=missing,
+            titles=TABLES,
+            day=day,
+            current_table=table,
+            formulas=FORMULAS,
+        )
+
+    version = store.data_version(data_day) if data_day else None
+    return cached_response(("view", table, day, data_day, rules.rules_key(view_rules)),
+                           version, build)
 
 
 # ---------------------------------------------------------
 if __name__ == "__main__":
     print("🚀 ISMarket running → http://127.0.0.1:8000")
-    print("📘 Using DB folder:", os.path.join(BASE_DIR, "daily_dbs"))
+    print(f"📘 Using {store.name} storage")
     app.run(host="0.0.0.0", port=8000, debug=True)
 
 
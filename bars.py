@@ -0,0 +1,247 @@
+# ===================================================================
+# bars.py — local OHLCV bars for the local scan engine
+#
+#   bars/
+#     symbols.csv                symbol,name
+#     daily/TATAMOTORS.csv       date,open,high,low,close,volume
+#     15m/TATAMOTORS.csv         (intraday: date = "YYYY-MM-DD HH:MM")
+#
+#   load_bars("daily") lines every symbol up on one calendar and returns
+#   (symbols × bars) arrays, NaN where a symbol has no bar. When
+#   barstore.py has a store for the timeframe, the arrays are memmap
+#   views from it instead of CSV reads.
+#
+#   python bars.py download --period 2y            → daily bars via yfinance
+#   python bars.py download --timeframe 15m --period 30d
+#   python bars.py synth --symbols 2000 --bars 400 → random-walk test data
+# ===================================================================
+
+import argparse
+import csv
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+BARS_DIR = os.getenv("ISMARKET_BARS_DIR", os.path.join(BASE_DIR, "bars"))
+
+# Bars kept per symbol: enough for max(260, ...) and 200-bar averages
+LOOKBACK = int(os.getenv("ISMARKET_BARS_LOOKBACK", "400"))
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+
+# Timeframes built from daily bars rather than stored (pandas period);
+# the latest bar is the week / month in progress, as on Chartink
+RESAMPLED = {"weekly": "W-FRI", "monthly": "M"}
+
+
+class Bars:
+    """One timeframe of the universe: symbols × bars arrays, oldest bar first."""
+
+    def __init__(self, timeframe, symbols, names, times, arrays):
+        self.timeframe = timeframe
+        self.symbols = symbols
+        self.names = names
+        self.times = times
+        self.open = arrays["open"]
+        self.high = arrays["high"]
+        self.low = arrays["low"]
+        self.close = arrays["close"]
+        self.volume = arrays["volume"]
+
+    def field(self, name):
+        return getattr(self, name)
+
+    @property
+    def shape(self):
+        return self.close.shape
+
+    def reindex(self, symbols):
+        """Same bars with rows in `symbols` order; NaN rows for symbols not here."""
+        row = {s: i for i, s in enumerate(self.symbols)}
+        have = [i for i, s in enumerate(symbols) if s in row]
+        src = [row[symbols[i]] for i in have]
+        arrays = {}
+        for f in FIELDS:
+            arrays[f] = np.full((len(symbols), len(self.times)), np.nan)
+            arrays[f][have] = self.field(f)[src]
+        names = dict(zip(self.symbols, self.names))
+        return Bars(self.timeframe, list(symbols), [names.get(s, s) for s in symbols],
+                    self.times, arrays)
+
+
+def load_names(folder=BARS_DIR):
+    path = os.path.join(folder, "symbols.csv")
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="", encoding="utf-8") as f:
+        return {r["symbol"]: r.get("name") or r["symbol"] for r in csv.DictReader(f)}
+
+
+def load_bars(timeframe="daily", folder=BARS_DIR, lookback=LOOKBACK, symbols=None):
+    import barstore
+
+    if barstore.exists(timeframe, folder):
+        return barstore.BarStore(timeframe, folder).bars(lookback, symbols)
+
+    files = sorted(glob.glob(os.path.join(folder, timeframe, "*.csv")))
+    if symbols:
+        wanted = set(symbols)
+        files = [f for f in files if os.path.basename(f)[:-4] in wanted]
+    if not files:
+        raise FileNotFoundError(f"No {timeframe} bars in {os.path.join(folder, timeframe)}")
+
+    frames = {}
+    for path in files:
+        df = pd.read_csv(path, dtype={"date": str})
+        frames[os.path.basename(path)[:-4]] = df.tail(lookback)
+
+    # One calendar: the last `lookback` distinct timestamps seen anywhere
+    # (ISO strings sort in time order, so no datetime parsing needed)
+    stamps = {sym: df["date"].to_numpy(dtype=str) for sym, df in frames.items()}
+    times = np.unique(np.concatenate(list(stamps.values())))[-lookback:]
+
+    syms = list(frames)
+    arrays = {f: np.full((len(syms), len(times)), np.nan) for f in FIELDS}
+    for i, sym in enumerate(syms):
+        pos = np.searchsorted(times, stamps[sym])
+        keep = (pos < len(times)) & (times[np.minimum(pos, len(times) - 1)] == stamps[sym])
+        for f in FIELDS:
+            arrays[f][i, pos[keep]] = frames[sym][f].to_numpy(dtype=float)[keep]
+
+    names = load_names(folder)
+    return Bars(timeframe, syms, [names.get(s, s) for s in syms], times, arrays)
+
+
+def resample(daily, timeframe):
+    """Daily Bars → weekly / monthly Bars (first open, max high, ..., summed volume)."""
+    periods = pd.to_datetime(daily.times).to_period(RESAMPLED[timeframe])
+    how = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+
+    arrays = {}
+    for f in FIELDS:
+        grouped = pd.DataFrame(daily.field(f).T, index=periods).groupby(level=0)
+        agg = grouped.sum(min_count=1) if f == "volume" else getattr(grouped, how[f])()
+        arrays[f] = agg.to_numpy().T
+    times = agg.index.astype(str).to_numpy()
+    return Bars(timeframe, daily.symbols, daily.names, times, arrays)
+
+
+# ---------------------------------------------------------
+# DATA SOURCES
+# ---------------------------------------------------------
+def write_bars(timeframe, symbol, df, folder=BARS_DIR):
+    os.makedirs(os.path.join(folder, timeframe), exist_ok=True)
+    df[["date"] + FIELDS].to_csv(os.path.join(folder, timeframe, f"{symbol}.csv"), index=False)
+
+
+# yfinance interval per timeframe (intraday history is limited to ~60 days)
+INTERVALS = {"daily": "1d", "15m": "15m", "5m": "5m"}
+
+# NSE session, for synthetic intraday bars
+SESSION_OPEN, SESSION_MINUTES = "09:15", 375
+
+
+def download(symbols, period="2y", folder=BARS_DIR, timeframe="daily"):
+    """
+    NSE bars from Yahoo Finance (SYMBOL.NS). With a bar store for the
+    timeframe the bars are appended to it (e.g. --period 5d each day);
+    otherwise each symbol's CSV is rewritten.
+    """
+    import yfinance as yf
+
+    import barstore
+
+    store = barstore.BarStore(timeframe, folder) if barstore.exists(timeframe, folder) else None
+    fmt = "%Y-%m-%d" if timeframe == "daily" else "%Y-%m-%d %H:%M"
+    frames = []
+    for sym in symbols:
+        hist = yf.Ticker(f"{sym}.NS").history(period=period, interval=INTERVALS[timeframe],
+                                              auto_adjust=False)
+        if hist.empty:
+            print(f"⚠ No {timeframe} bars for {sym}")
+            continue
+        df = hist.reset_index()
+        df = df.rename(columns={df.columns[0]: "date"}).rename(columns=str.lower)
+        df["date"] = pd.to_datetime(df["date"]).dt.strftime(fmt)
+        if store is None:
+            write_bars(timeframe, sym, df, folder)
+        else:
+            frames.append(df.assign(symbol=sym))
+        print(f"📈 {sym}: {len(df)} {timeframe} bars")
+
+    if frames:
+        written, skipped = store.append(pd.concat(frames, ignore_index=True))
+        print(f"📦 {written} bars → {store.path} ({skipped} skipped)")
+
+
+def bar_times(timeframe, n_bars, end=None):
+    """Timestamps of the last n_bars trading bars (session hours for intraday)."""
+    end = (end or pd.Timestamp.today()).normalize()
+    if timeframe not in INTERVALS or timeframe == "daily":
+        return pd.bdate_range(end=end, periods=n_bars).strftime("%Y-%m-%d")
+
+    minutes = int(timeframe[:-1])
+    per_day = SESSION_MINUTES // minutes
+    days = pd.bdate_range(end=end, periods=-(-n_bars // per_day))
+    offsets = pd.to_timedelta(np.arange(per_day) * minutes, unit="min") + pd.Timedelta(SESSION_OPEN + ":00")
+    stamps = (days.values[:, None] + offsets.values[None, :]).ravel()[-n_bars:]
+    return pd.DatetimeIndex(stamps).strftime("%Y-%m-%d %H:%M")
+
+
+def synth(n_symbols=2000, n_bars=LOOKBACK, timeframe="daily", folder=BARS_DIR, seed=1):
+    """Random-walk bars for n_symbols, for benchmarks and offline runs."""
+    rng = np.random.default_rng(seed)
+    dates = bar_times(timeframe, n_bars)
+    # Smaller moves per bar on shorter timeframes
+    scale = 1.0 if timeframe == "daily" else 0.25
+
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, "symbols.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["symbol", "name"])
+        for i in range(n_symbols):
+            w.writerow([f"SYM{i:04d}", f"Synthetic Stock {i:04d}"])
+
+    for i in range(n_symbols):
+        close = rng.uniform(20, 2000) * np.exp(np.cumsum(rng.normal(0.0005, 0.02 * scale, n_bars)))
+        open_ = close * np.exp(rng.normal(0, 0.01 * scale, n_bars))
+        high = np.maximum(open_, close) * (1 + rng.exponential(0.01 * scale, n_bars))
+        low = np.minimum(open_, close) * (1 - rng.exponential(0.01 * scale, n_bars))
+        df = pd.DataFrame({
+            "date": dates, "open": open_.round(2), "high": high.round(2),
+            "low": low.round(2), "close": close.round(2),
+            "volume": rng.lognormal(12, 1, n_bars).astype(int),
+        })
+        write_bars(timeframe, f"SYM{i:04d}", df, folder)
+    print(f"🧬 {n_symbols} symbols × {n_bars} {timeframe} bars → {folder}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OHLCV bars")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    dl = sub.add_parser("download", help="daily bars from Yahoo Finance")
+    dl.add_argument("--symbols", help="comma-separated (default: bars/symbols.csv)")
+    dl.add_argument("--period", default="2y")
+    dl.add_argument("--timeframe", choices=list(INTERVALS), default="daily")
+    sy = sub.add_parser("synth", help="random-walk bars")
+    sy.add_argument("--symbols", type=int, default=2000)
+    sy.add_argument("--bars", type=int, default=LOOKBACK)
+    sy.add_argument("--timeframe", default="daily")
+    sy.add_argument("--seed", type=int, default=1)
+    ld = sub.add_parser("load", help="time a full load")
+    ld.add_argument("--timeframe", default="daily")
+    args = parser.parse_args()
+
+    if args.cmd == "download":
+        syms = args.symbols.split(",") if args.symbols else list(load_names())
+        download(syms, args.period, timeframe=args.timeframe)
+    elif args.cmd == "synth":
+        synth(args.symbols, args.bars, args.timeframe, seed=args.seed)
+    else:
+        start = time.perf_counter()
+        bars = load_bars(args.timeframe)
+        print(f"📂 {bars.shape[0]} symbols × {bars.shape[1]} bars in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,317 @@
+# ===================================================================
+# barstore.py — memory-mapped OHLCV store (symbol × time per timeframe)
+#
+#   bars/store/daily/
+#     meta.json            symbols (row index), bar count, capacity, generation
+#     times.<gen>.i8       bar timestamps (datetime64[m]), one per column
+#     open.<gen>.f8 ...    float64 (symbols, capacity) arrays, NaN = no bar
+#
+#   BarStore("daily").bars(400)    → bars.Bars whose arrays are read-only
+#                                    views of the memmaps (no copy); every
+#                                    process reading the store shares the
+#                                    same page cache
+#   BarStore("daily").append(rows) → new bars go into the next free
+#                                    columns; a bar already stored for
+#                                    that time is overwritten in place
+#
+#   bars.load_bars() reads from here when a store exists for the
+#   timeframe, and from the per-symbol CSVs otherwise.
+#
+#   python barstore.py import --timeframe daily    → build from bars/daily/*.csv
+#   python barstore.py append new_bars.csv --timeframe daily
+#   python barstore.py info
+#
+#   Writers take the store's lock file (.write.lock), so appends from
+#   several processes queue up. Readers only map the columns meta.json
+#   counts, and meta.json is replaced atomically after the data is
+#   written, so a reader never sees a half-appended bar. Published cells
+#   are never written in place: growing the capacity, adding symbols or
+#   restating a stored bar writes a new generation of files, published
+#   by the same meta.json swap. The previous generation is kept until
+#   the next one, so a reader that read meta.json just before still maps
+#   it, and one that's further behind reloads meta.json and retries.
+# ===================================================================
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import bars as bars_mod
+
+DTYPE = np.float64
+MIN_CAPACITY = 512
+WRITE_LOCK = ".write.lock"
+WRITE_LOCK_TIMEOUT = 300
+
+
+def store_dir(timeframe, folder=None):
+    return os.path.join(folder or bars_mod.BARS_DIR, "store", timeframe)
+
+
+def exists(timeframe, folder=None):
+    return os.path.exists(os.path.join(store_dir(timeframe, folder), "meta.json"))
+
+
+def _time_strings(times, timeframe):
+    """datetime64[m] → the "YYYY-MM-DD" / "YYYY-MM-DD HH:MM" strings the CSVs use."""
+    if timeframe == "daily":
+        return np.datetime_as_string(times, unit="D")
+    return np.char.replace(np.datetime_as_string(times, unit="m"), "T", " ")
+
+
+class BarStore:
+    def __init__(self, timeframe="daily", folder=None):
+        self.timeframe = timeframe
+        self.folder = folder
+        self.path = store_dir(timeframe, folder)
+        self._load_meta()
+
+    # ---------------------------------------------------------
+    # LAYOUT
+    # ---------------------------------------------------------
+    def _load_meta(self):
+        try:
+            with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            meta = {"symbols": [], "n_times": 0, "capacity": 0, "gen": 0}
+        self.symbols = meta["symbols"]
+        self.n_times = meta["n_times"]
+        self.capacity = meta["capacity"]
+        self.gen = meta["gen"]
+        self.row = {s: i for i, s in enumerate(self.symbols)}
+
+    def _write_meta(self):
+        meta = {"timeframe": self.timeframe, "symbols": self.symbols, "n_times": self.n_times,
+                "capacity": self.capacity, "gen": self.gen}
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".meta.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, os.path.join(self.path, "meta.json"))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _publish(self):
+        """Swap in meta.json, then drop generations older than the previous one."""
+        self._write_meta()
+        for old in glob.glob(os.path.join(self.path, "*.*.*")):
+            gen = os.path.basename(old).split(".")[1]
+            if gen.isdigit() and int(gen) < self.gen - 1:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass  # still mapped (Windows); removed by a later regrow
+
+    @contextmanager
+    def _write_lock(self):
+        """Cross-process writer lock: a write transaction on an empty SQLite file."""
+        os.makedirs(self.path, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.path, WRITE_LOCK),
+                               timeout=WRITE_LOCK_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield
+        finally:
+            conn.close()
+
+    def _file(self, name, gen=None):
+        ext = "i8" if name == "times" else "f8"
+        return os.path.join(self.path, f"{name}.{self.gen if gen is None else gen}.{ext}")
+
+    def _map(self, name, mode="r", gen=None, shape=None):
+        if name == "times":
+            return np.memmap(self._file(name, gen), dtype="datetime64[m]", mode=mode,
+                             shape=(shape or (len(self.symbols), self.capacity))[1:])
+        return np.memmap(self._file(name, gen), dtype=DTYPE, mode=mode,
+                         shape=shape or (len(self.symbols), self.capacity))
+
+    def _regrow(self, symbols, capacity):
+        """
+        Copy into a new generation of files sized (symbols, capacity).
+        Readers keep using the current one until _publish().
+        """
+        old_gen, old_rows, n = self.gen, len(self.symbols), self.n_times
+        new_gen = old_gen + 1
+        shape = (len(symbols), capacity)
+
+        times = self._map("times", "w+", new_gen, shape)
+        if n:
+            times[:n] = self._map("times")[:n]
+        times.flush()
+        for f in bars_mod.FIELDS:
+            arr = self._map(f, "w+", new_gen, shape)
+            arr[:] = np.nan
+            if n and old_rows:
+                arr[:old_rows, :n] = self._map(f)[:, :n]
+            arr.flush()
+            del arr
+
+        self.symbols, self.capacity, self.gen = list(symbols), capacity, new_gen
+        self.row = {s: i for i, s in enumerate(self.symbols)}
+
+    # ---------------------------------------------------------
+    # READ
+    # ---------------------------------------------------------
+    def times(self):
+        if not self.n_times:
+            return np.array([], dtype="datetime64[m]")
+        return self._map("times")[:self.n_times]
+
+    def bars(self, lookback=None, symbols=None):
+        """Latest `lookback` bars as bars.Bars; zero-copy unless `symbols` picks rows."""
+        try:
+            return self._bars(lookback, symbols)
+        except FileNotFoundError:
+            # Files regrown twice since meta.json was read → reload it once
+            self._load_meta()
+            return self._bars(lookback, symbols)
+
+    def _bars(self, lookback, symbols):
+        if not self.n_times:
+            raise FileNotFoundError(f"No {self.timeframe} bars in {self.path}")
+        n = self.n_times
+        cols = slice(max(0, n - lookback) if lookback else 0, n)
+
+        rows, syms = slice(None), self.symbols
+        if symbols:
+            picked = [self.row[s] for s in symbols if s in self.row]
+            rows, syms = picked, [self.symbols[i] for i in picked]
+
+        arrays = {f: np.asarray(self._map(f)[rows, cols]) for f in bars_mod.FIELDS}
+        names = bars_mod.load_names(self.folder or bars_mod.BARS_DIR)
+        times = _time_strings(np.asarray(self.times()[cols]), self.timeframe)
+        return bars_mod.Bars(self.timeframe, syms, [names.get(s, s) for s in syms], times, arrays)
+
+    # ---------------------------------------------------------
+    # WRITE
+    # ---------------------------------------------------------
+    def append(self, rows):
+        """
+        rows: DataFrame with symbol, date and the OHLCV columns (any number
+        of symbols and bars). Bars later than the last stored one are
+        appended; bars for an already stored time restate it (NaN fields
+        keep the stored value); bars for a time older than the last one
+        that isn't stored are skipped. Returns (written, skipped).
+        """
+        if rows.empty:
+            return 0, 0
+        with self._write_lock():
+            self._load_meta()   # another process may have appended since
+            return self._append(rows)
+
+    def _append(self, rows):
+        stamps = pd.to_datetime(rows["date"]).to_numpy().astype("datetime64[m]")
+        values = {f: rows[f].to_numpy(dtype=DTYPE) for f in bars_mod.FIELDS}
+        old_n = self.n_times
+        stored = np.asarray(self.times())
+        last = stored[-1] if old_n else None
+
+        new_syms = [s for s in pd.unique(rows["symbol"]) if s not in self.row]
+        new_times = np.unique(stamps if last is None else stamps[stamps > last])
+        needed = old_n + len(new_times)
+        capacity = self.capacity
+        if needed > capacity:
+            capacity = max(needed, 2 * capacity, MIN_CAPACITY)
+
+        # Restated bars that change a published value → new generation
+        restated = np.zeros(len(rows), dtype=bool)
+        if old_n:
+            c = np.searchsorted(stored, stamps)
+            known = rows["symbol"].map(self.row).to_numpy()
+            restated = (c < old_n) & (stored[np.minimum(c, old_n - 1)] == stamps) & pd.notna(known)
+        changed = False
+        if restated.any():
+            r = known[restated].astype(np.int64)
+            c = c[restated]
+            for f in bars_mod.FIELDS:
+                new, old = values[f][restated], np.asarray(self._map(f)[r, c])
+                if np.any(~np.isnan(new) & (new != old)):
+                    changed = True
+                    break
+
+        regrown = bool(new_syms) or capacity != self.capacity or changed
+        if regrown:
+            self._regrow(self.symbols + new_syms, capacity)
+
+        if len(new_times):
+            times = self._map("times", "r+")
+            times[old_n:needed] = new_times
+            times.flush()
+        all_times = np.asarray(self._map("times")[:needed])
+
+        col = np.searchsorted(all_times, stamps)
+        ok = (col < needed) & (all_times[np.minimum(col, needed - 1)] == stamps)
+        row = np.array([self.row[s] for s in rows["symbol"]])
+        # In place only into columns readers can't see yet
+        target = ok if regrown else ok & (col >= old_n)
+        for f in bars_mod.FIELDS:
+            put = target & ~np.isnan(values[f])
+            arr = self._map(f, "r+")
+            arr[row[put], col[put]] = values[f][put]
+            arr.flush()
+            del arr
+
+        # Publish the new columns / generation only once the data is on disk
+        self.n_times = needed
+        self._publish()
+        return int(ok.sum()), int((~ok).sum())
+
+
+def import_csv(timeframe="daily", folder=None):
+    """Build (or extend) the store from the per-symbol CSVs under bars/<timeframe>/."""
+    folder = folder or bars_mod.BARS_DIR
+    files = sorted(glob.glob(os.path.join(folder, timeframe, "*.csv")))
+    frames = []
+    for path in files:
+        df = pd.read_csv(path, dtype={"date": str})
+        df["symbol"] = os.path.basename(path)[:-4]
+        frames.append(df)
+    if not frames:
+        raise FileNotFoundError(f"No {timeframe} bars in {os.path.join(folder, timeframe)}")
+
+    store = BarStore(timeframe, folder)
+    written, skipped = store.append(pd.concat(frames, ignore_index=True))
+    print(f"📦 {timeframe}: {written} bars from {len(files)} CSVs → {store.path} "
+          f"({len(store.symbols)} symbols × {store.n_times} bars, {skipped} skipped)")
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory-mapped bar store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    im = sub.add_parser("import", help="build from bars/<timeframe>/*.csv")
+    im.add_argument("--timeframe", default="daily")
+    ap = sub.add_parser("append", help="append a CSV of symbol,date,open,high,low,close,volume")
+    ap.add_argument("csv")
+    ap.add_argument("--timeframe", default="daily")
+    info = sub.add_parser("info", help="symbols / bars / load time per timeframe")
+    args = parser.parse_args()
+
+    if args.cmd == "import":
+        import_csv(args.timeframe)
+    elif args.cmd == "append":
+        store = BarStore(args.timeframe)
+        written, skipped = store.append(pd.read_csv(args.csv, dtype={"date": str}))
+        print(f"📦 {written} bars appended to {args.timeframe} ({skipped} skipped, older than the store)")
+    else:
+        for path in sorted(glob.glob(os.path.join(bars_mod.BARS_DIR, "store", "*"))):
+            store = BarStore(os.path.basename(path))
+            start = time.perf_counter()
+            b = store.bars(bars_mod.LOOKBACK)
+            print(f"   {store.timeframe:<8} {len(store.symbols):5d} symbols × {store.n_times:6d} bars "
+                  f"(capacity {store.capacity}), last {b.times[-1]}, "
+                  f"{bars_mod.LOOKBACK} bars mapped in {(time.perf_counter() - start) * 1000:.1f}ms")
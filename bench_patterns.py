@@ -0,0 +1,109 @@
+# ===================================================================
+# bench_patterns.py — candlestick pattern scan benchmark
+#
+#   python bench_patterns.py --symbols 2000 --days 5 --runs 5
+#
+#   Writes synthetic 5m / 15m / daily bars for --symbols symbols into a
+#   scratch folder (bars.synth) and times:
+#     - loading each timeframe from CSV, and from the memmap bar store
+#     - every pattern over the whole history (all bars, all symbols)
+#     - the local pattern screeners end to end (engine.run_scans on the
+#       latest bar), with a fresh Context and with saved indicator state
+# ===================================================================
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+TIMEFRAME_BARS = {"5m": 75, "15m": 25, "daily": None}   # bars per session day
+
+
+def timed(fn, runs):
+    times, out = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, out
+
+
+def run_benchmark(symbols=2000, days=5, runs=5, seed=1):
+    folder = tempfile.mkdtemp(prefix="bench_patterns_")
+    os.environ["ISMARKET_BARS_DIR"] = folder
+    import bars
+    import barstore
+    import chartink
+    import engine
+    import indicators as ind
+    import patterns
+
+    keys = [k for k, cfg in chartink.CHARTINK_SCANS.items()
+            if cfg.get("engine") == "local" and k in engine.LOCAL_SCANS]
+    sizes = {tf: (per_day * days if per_day else bars.LOOKBACK) for tf, per_day in TIMEFRAME_BARS.items()}
+    for tf, n in sizes.items():
+        bars.synth(symbols, n, tf, folder, seed)
+
+    result = {"symbols": symbols, "bars": sizes, "load_ms": {}, "store_ms": {}, "history": {}, "scan": {}}
+    loaded = {}
+    for tf in sizes:
+        result["load_ms"][tf], loaded[tf] = timed(lambda: bars.load_bars(tf, folder), 1)
+        barstore.import_csv(tf, folder)
+        result["store_ms"][tf], _ = timed(lambda: bars.load_bars(tf, folder), runs)
+
+    # Every pattern, every bar
+    for key in keys:
+        tf = chartink.CHARTINK_SCANS[key].get("timeframe", "daily")
+        b = loaded[tf]
+        cd = patterns.Candles(b.open, b.high, b.low, b.close, b.volume)
+        rsi = ind.rsi(b.close, 14)
+        if key in engine.PATTERN_SCANS:
+            fn = lambda: engine.PATTERN_SCANS[key](cd, rsi)
+        else:
+            fn = lambda: patterns.first_candle_breakout(cd, b.times)
+        ms, mask = timed(fn, runs)
+        result["history"][key] = {"timeframe": tf, "ms": ms, "hits": int(mask.sum())}
+
+    # Screeners end to end, bars already in memory
+    def scan(make):
+        ctx = make()
+        for tf, b in loaded.items():
+            ctx.add(tf, b)
+        return engine.run_scans(keys, chartink.CHARTINK_SCANS, ctx=ctx)
+
+    result["scan"]["fresh_ms"], out = timed(lambda: scan(engine.Context), runs)
+    scan(engine.IncrementalContext)   # build the saved state once
+    result["scan"]["state_ms"], _ = timed(lambda: scan(engine.IncrementalContext), runs)
+    result["scan"]["matches"] = {k: len(df) for k, df in out.items()}
+    return result
+
+
+def print_report(r):
+    print(f"\n📊 Pattern benchmark — {r['symbols']} symbols, bars {r['bars']}")
+    print("   load (CSV):  " + ", ".join(f"{tf} {ms:.0f}ms" for tf, ms in r["load_ms"].items()))
+    print("   load (store): " + ", ".join(f"{tf} {ms:.1f}ms" for tf, ms in r["store_ms"].items()))
+    print(f"   {'pattern (all bars)':<28} {'tf':>6} {'ms':>8} {'hits':>8}")
+    for key, h in r["history"].items():
+        print(f"   {key:<28} {h['timeframe']:>6} {h['ms']:8.2f} {h['hits']:8d}")
+    s = r["scan"]
+    print(f"   screeners, latest bar: {s['fresh_ms']:.1f}ms fresh, {s['state_ms']:.1f}ms with saved state")
+    print(f"   matches: {s['matches']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Candlestick pattern benchmark")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=5, help="intraday sessions of 5m / 15m bars")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the result to this file")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.symbols, args.days, args.runs, args.seed)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 {args.json}")
@@ -0,0 +1,180 @@
+# ===================================================================
+# bench_reads.py — read-path load benchmark
+#
+#   python bench_reads.py --days 500 --backend history --requests 300
+#   python bench_reads.py --days 500 --backend daily --spread-days
+#   python bench_reads.py --url http://127.0.0.1:8000 --requests 1000 --concurrency 8
+#
+#   Builds a scratch store of --days synthetic days (gen_history.py) and
+#   drives /view/all, /api/get_table/all and /api/today-report through
+#   the Flask test client; with --url it drives a running server (e.g.
+#   gunicorn) over HTTP instead. Reports requests/s, p50/p95/p99 latency,
+#   response size and status counts per endpoint.
+#
+#   --spread-days asks for a random ?day= on every request, which keeps
+#   the response cache cold; without it the latest day is served warm.
+# ===================================================================
+
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from bench_refresh import percentile
+
+ENDPOINTS = ["/view/all", "/api/get_table/all", "/api/today-report"]
+
+
+def scratch_env(backend, folder):
+    """Point every ISMARKET_* location at `folder` (before app/storage import)."""
+    os.environ.update({
+        "ISMARKET_STORAGE": backend,
+        "ISMARKET_HISTORY_DB": os.path.join(folder, "history.db"),
+        "ISMARKET_DB_URL": f"sqlite:///{os.path.join(folder, 'ismarket.db')}",
+        "ISMARKET_DAILY_DIR": os.path.join(folder, "daily_dbs"),
+        "ISMARKET_MAIN_DB": os.path.join(folder, "chartink_data.db"),
+    })
+
+
+def summarize(latencies, sizes, statuses, wall):
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "avg_bytes": sum(sizes) / len(sizes) if sizes else 0,
+        "statuses": statuses,
+    }
+
+
+def drive(fetch, paths, concurrency):
+    """Run fetch(path) → (status, size) over `paths` on `concurrency` threads."""
+    latencies, sizes, statuses = [], [], {}
+    lock = threading.Lock()
+    queue = iter(paths)
+
+    def worker():
+        while True:
+            with lock:
+                path = next(queue, None)
+            if path is None:
+                return
+            start = time.perf_counter()
+            status, size = fetch(path)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                sizes.append(size)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, sizes, statuses, time.perf_counter() - start)
+
+
+def client_fetcher():
+    import app
+
+    local = threading.local()
+
+    def fetch(path):
+        # A test client per thread; they share the app (and its caches)
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.app.test_client()
+        resp = client.get(path)
+        return resp.status_code, len(resp.get_data())
+
+    return fetch, app.day_index.days()
+
+
+def http_fetcher(base_url):
+    import requests
+
+    local = threading.local()
+
+    def fetch(path):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        resp = session.get(base_url.rstrip("/") + path, timeout=60)
+        return resp.status_code, len(resp.content)
+
+    return fetch, fetch_days(base_url)
+
+
+def fetch_days(base_url):
+    import requests
+
+    return requests.get(base_url.rstrip("/") + "/api/get_days", timeout=30).json().get("days", [])
+
+
+def run_benchmark(fetch, days, requests_per_endpoint=200, concurrency=4,
+                  spread_days=False, seed=1):
+    rnd = random.Random(seed)
+    results = {}
+    for endpoint in ENDPOINTS:
+        paths = []
+        for _ in range(requests_per_endpoint):
+            # today-report always serves the latest day
+            if spread_days and days and endpoint != "/api/today-report":
+                paths.append(f"{endpoint}?day={rnd.choice(days)}")
+            else:
+                paths.append(endpoint)
+        results[endpoint] = drive(fetch, paths, concurrency)
+    return results
+
+
+def print_report(results, label):
+    print(f"\n📊 Read benchmark — {label}")
+    print(f"   {'endpoint':<22} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'bytes':>9}  status")
+    for endpoint, r in results.items():
+        print(f"   {endpoint:<22} {r['rps']:8.1f} {r['p50_ms']:7.2f}ms {r['p95_ms']:7.2f}ms "
+              f"{r['p99_ms']:7.2f}ms {r['avg_bytes']:9.0f}  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-path load benchmark")
+    parser.add_argument("--url", help="benchmark a running server instead of the test client")
+    parser.add_argument("--backend", choices=["history", "sql", "daily"], default="history",
+                        help="storage backend for the scratch store")
+    parser.add_argument("--days", type=int, default=250, help="synthetic days to generate")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--spread-days", action="store_true", help="random ?day= per request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the result to this file")
+    args = parser.parse_args()
+
+    if args.url:
+        fetch, days = http_fetcher(args.url)
+        label = args.url
+    else:
+        scratch_env(args.backend, tempfile.mkdtemp(prefix="bench_reads_"))
+        import gen_history
+        import storage
+
+        gen_history.generate(storage.get_store(), args.days, datetime.date.today(),
+                             args.symbols, args.seed)
+        fetch, days = client_fetcher()
+        label = f"test client, {args.backend} store, {args.days} days"
+
+    label += f", concurrency={args.concurrency}" + (", spread days" if args.spread_days else "")
+    results = run_benchmark(fetch, days, args.requests, args.concurrency,
+                            args.spread_days, args.seed)
+    print_report(results, label)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"label": label, "results": results}, f, indent=2)
+        print(f"💾 {args.json}")
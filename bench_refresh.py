@@ -0,0 +1,138 @@
+# ===================================================================
+# bench_refresh.py — end-to-end refresh benchmark against the stand-in
+#
+#   python bench_refresh.py --runs 5 --latency 0.4 --jitter 0.3 --workers 6
+#   python bench_refresh.py --error-rate 0.1 --reject-rate 0.05 --json out.json
+#
+#   Starts chartink_stub.py on a free port, points chartink.py at it and
+#   runs update_all() --runs times into a throwaway history store.
+#   Reports per-scan latency (p50 / p95 / max over every scan of every
+#   run) and total refresh time, so changes to the fetch path can be
+#   compared on numbers instead of against live chartink.com.
+# ===================================================================
+
+import argparse
+import json
+import math
+import os
+import tempfile
+import time
+
+from chartink_stub import StubServer, load_recorded
+
+# Scans without a clause are given this one, so every screener is fetched
+PLACEHOLDER_SCAN = "( {cash} ( latest close > 0 ) ) "
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(values):
+    return {
+        "n": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "max": max(values) if values else 0.0,
+        "mean": sum(values) / len(values) if values else 0.0,
+    }
+
+
+def run_benchmark(runs=3, workers=None, stub_opts=None, fill=True, cold=False):
+    # chartink / storage read their settings at import; use a scratch store
+    tmp = tempfile.mkdtemp(prefix="bench_refresh_")
+    os.environ["ISMARKET_STORAGE"] = "history"
+    os.environ["ISMARKET_HISTORY_DB"] = os.path.join(tmp, "history.db")
+    import chartink
+
+    scans = chartink.CHARTINK_SCANS
+    if fill:
+        for cfg in scans.values():
+            cfg["scan"] = cfg.get("scan") or PLACEHOLDER_SCAN
+            cfg.pop("engine", None)  # every scan goes to the stub
+
+    per_scan = {key: [] for key in scans}
+    totals, fallbacks = [], 0
+
+    def count_fallback(key, state):
+        nonlocal fallbacks
+        if state in ("fallback", "timeout"):
+            fallbacks += 1
+
+    with StubServer(**(stub_opts or {})) as stub:
+        chartink.BASE_URL = stub.url
+        for _ in range(runs):
+            if cold:
+                chartink._csrf.update(token=None, fetched_at=0.0)
+            timings = {}
+            start = time.perf_counter()
+            chartink.update_all(workers=workers, on_progress=count_fallback, timings=timings)
+            totals.append(time.perf_counter() - start)
+            for key, secs in timings.items():
+                per_scan[key].append(secs)
+        stats = dict(stub.stats)
+
+    return {
+        "runs": runs,
+        "workers": workers or chartink.FETCH_WORKERS,
+        "stub": {k: v for k, v in (stub_opts or {}).items() if k != "recorded"},
+        "requests": stats,
+        "fallbacks": fallbacks,
+        "scan_latency": summarize([s for v in per_scan.values() for s in v]),
+        "per_scan": {key: summarize(v) for key, v in per_scan.items()},
+        "refresh_total": summarize(totals),
+    }
+
+
+def print_report(result):
+    print(f"\n📊 Refresh benchmark — {result['runs']} runs, workers={result['workers']}, "
+          f"stub={result['stub']}")
+    print(f"   {'scan':<28} {'p50':>8} {'p95':>8} {'max':>8}")
+    for key, s in sorted(result["per_scan"].items(), key=lambda kv: kv[1]["p95"], reverse=True):
+        print(f"   {key:<28} {s['p50']:7.3f}s {s['p95']:7.3f}s {s['max']:7.3f}s")
+
+    s = result["scan_latency"]
+    print(f"   {'all scans':<28} {s['p50']:7.3f}s {s['p95']:7.3f}s {s['max']:7.3f}s")
+    t = result["refresh_total"]
+    print(f"   {'refresh total':<28} {t['p50']:7.3f}s {t['p95']:7.3f}s {t['max']:7.3f}s")
+    print(f"   requests {result['requests']}, fallbacks {result['fallbacks']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end refresh benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--reject-rate", type=float, default=0.0)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--recorded", help="recorded responses (chartink_stub.py record)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--configured-only", action="store_true",
+                        help="skip scans that have no clause (default: fetch all)")
+    parser.add_argument("--cold", action="store_true", help="drop the CSRF token before each run")
+    parser.add_argument("--json", help="also write the result to this file")
+    args = parser.parse_args()
+
+    result = run_benchmark(
+        runs=args.runs,
+        workers=args.workers,
+        stub_opts={
+            "latency": args.latency, "jitter": args.jitter,
+            "error_rate": args.error_rate, "reject_rate": args.reject_rate,
+            "rows": args.rows, "recorded": load_recorded(args.recorded), "seed": args.seed,
+        },
+        fill=not args.configured_only,
+        cold=args.cold,
+    )
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 {args.json}")
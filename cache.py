@@ -0,0 +1,46 @@
+# ===================================================================
+# cache.py — in-process response cache for the web app
+#
+#   Entries are keyed by (endpoint, day, table, ..., data version).
+#   The data version comes from the store (last write time of a day),
+#   so a refresh makes old entries unreachable without any explicit
+#   invalidation; LRU eviction then drops them.
+# ===================================================================
+
+import threading
+from collections import OrderedDict
+
+CACHE_SIZE = 256
+
+
+class ResponseCache:
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -1,10 +1,23 @@
+import argparse
 import os
-import sqlite3
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
 from datetime import datetime
 
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+import deltas
+import engine
+import events
+import metrics
+import report
+import storage
 
 # ===================================================================
 # PATHS & SETTINGS
@@ -12,21 +25,50 @@ from bs4 import BeautifulSoup
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
-DB_FOLDER = os.path.join(BASE_DIR, "daily_dbs")
-MAIN_DB = os.path.join(BASE_DIR, "chartink_data.db")
+# Same paths as storage.py (ISMARKET_DAILY_DIR / ISMARKET_MAIN_DB override)
+DB_FOLDER = storage.DB_FOLDER
+MAIN_DB = storage.MAIN_DB
 os.makedirs(DB_FOLDER, exist_ok=True)
 
 TODAY_KEY = datetime.now().strftime("%Y_%m_%d")
 DAILY_DB = os.path.join(DB_FOLDER, f"{TODAY_KEY}.db")
 
+
+def today_key():
+    # Long-running processes (web app, scheduler) must not reuse the
+    # import-time TODAY_KEY after midnight.
+    return datetime.now().strftime("%Y_%m_%d")
+
 FINAL_COLS = ["stock_name", "price", "change", "volume", "symbol"]
 
+# Concurrent fetch: how many scans may be in flight at once, and how long
+# (seconds) the whole refresh may take before unfinished scans fall back.
+FETCH_WORKERS = int(os.getenv("CHARTINK_WORKERS", "6"))
+FETCH_DEADLINE = float(os.getenv("CHARTINK_DEADLINE", "90"))
+
+PROCESS_URL = "https://chartink.com/screener/process"
+
+# Every chartink.com URL is rebased onto BASE_URL before it is fetched;
+# point it at chartink_stub.py to refresh / benchmark offline.
+CHARTINK_HOST = "https://chartink.com"
+BASE_URL = os.getenv("CHARTINK_BASE_URL", CHARTINK_HOST).rstrip("/")
+
+# One csrf-token serves every scan; re-fetched after this many seconds
+# or as soon as Chartink rejects it (HTTP 419 / 403).
+CSRF_TTL = float(os.getenv("CHARTINK_CSRF_TTL", "1200"))
 
 
 # ===================================================================
 # CHARTINK SCANS + LINKS
 #   - For now only bms has real scan code
 #   - Others will use fallback until you fill their scan clauses
+#   - "refresh": "intraday" → re-scraped through market hours by
+#     scheduler.py; everything else is refreshed once a day
+#   - "engine": "local" → "scan" is compiled by clause.py and evaluated
+#     by engine.py over local bars (bars/), no request to chartink.com;
+#     without a clause, engine.LOCAL_SCANS[key] is used
+#   - "timeframe": bars the results are priced from ("daily" default,
+#     "5m", "15m")
 # ===================================================================
 
 CHARTINK_SCANS = {
@@ -58,28 +100,51 @@ CHARTINK_SCANS = {
     },
     "buy_entry_intraday": {
         "url": "https://chartink.com/screener/buy-entry-intraday",
+        "refresh": "intraday",
         "scan": "( {33489} ( daily parabolic sar( 0.04,0.02,0.2 ) < daily ema( close,9 ) and 1 day ago  parabolic sar( 0.04,0.02,0.2 ) >= 1 day ago  ema( close,9 ) ) ) ",
     },
 
-    # These still don’t have scan codes → will fallback to N/A until you add
-    "short_term_breakouts": {"url": "https://chartink.com/screener/", "scan": None},
-    "potential_breakouts": {"url": "https://chartink.com/screener/", "scan": None},
-    "bearish_engulf_5m": {"url": "https://chartink.com/screener/", "scan": None},
-    "tweezer_bottom_15m": {"url": "https://chartink.com/screener/", "scan": None},
-    "bullish_harami_15m": {"url": "https://chartink.com/screener/", "scan": None},
-    "dragonfly_doji_15m": {"url": "https://chartink.com/screener/", "scan": None},
-    "bearish_kicker_15m": {"url": "https://chartink.com/screener/", "scan": None},
-    "first_15m_breakout_both": {"url": "https://chartink.com/screener/", "scan": None},
-    "morning_star_bullish": {"url": "https://chartink.com/screener/", "scan": None},
-    "bearish_engulfing_strong": {"url": "https://chartink.com/screener/", "scan": None},
+    # Technical part of the bms screen (market cap / eps / debt aren't in local bars)
+    "short_term_breakouts": {
+        "url": "https://chartink.com/screener/",
+        "scan": "( {cash} ( daily high >= daily max( 260 , daily high ) * 0.9 and daily low >= daily min( 260 , daily low ) * 2 and daily close > daily sma( daily close , 100 ) and daily sma( daily close , 20 ) > daily sma( daily close , 200 ) and daily high < daily max( 260 , daily high ) * 1 and daily rsi( 14 ) >= 55 ) )",
+        "engine": "local",
+    },
+    "potential_breakouts": {
+        "url": "https://chartink.com/screener/",
+        "scan": "( {cash} ( daily ema( close,20 ) > daily ema( close,50 ) and daily close >= daily max( 60 , daily close ) * 0.98 and daily volume > daily sma( volume,10 ) ) )",
+        "engine": "local",
+    },
+
+    # Candlestick patterns → engine.LOCAL_SCANS (patterns.py), on the
+    # "timeframe" bars
+    "bearish_engulf_5m": {"url": "https://chartink.com/screener/", "scan": None, "refresh": "intraday",
+                          "engine": "local", "timeframe": "5m"},
+    "tweezer_bottom_15m": {"url": "https://chartink.com/screener/", "scan": None, "refresh": "intraday",
+                           "engine": "local", "timeframe": "15m"},
+    "bullish_harami_15m": {"url": "https://chartink.com/screener/", "scan": None, "refresh": "intraday",
+                           "engine": "local", "timeframe": "15m"},
+    "dragonfly_doji_15m": {"url": "https://chartink.com/screener/", "scan": None, "refresh": "intraday",
+                           "engine": "local", "timeframe": "15m"},
+    "bearish_kicker_15m": {"url": "https://chartink.com/screener/", "scan": None, "refresh": "intraday",
+                           "engine": "local", "timeframe": "15m"},
+    "first_15m_breakout_both": {"url": "https://chartink.com/screener/", "scan": None, "refresh": "intraday",
+                                "engine": "local", "timeframe": "15m"},
+    "morning_star_bullish": {"url": "https://chartink.com/screener/", "scan": None, "engine": "local"},
+    "bearish_engulfing_strong": {"url": "https://chartink.com/screener/", "scan": None, "engine": "local"},
 }
 
 # ===================================================================
 # FALLBACK DF
 # ===================================================================
 
-def fallback_df():
-    return pd.DataFrame(
+def fallback_df(reason="empty"):
+    """
+    One N/A row. `reason` is kept in df.attrs so callers can tell a scan
+    that found nothing ("empty", "no_scan") from one that failed
+    ("error", "timeout").
+    """
+    df = pd.DataFrame(
         [{
             "stock_name": "N/A",
             "symbol": "N/A",
@@ -96,6 +161,109 @@ def fallback_df():
         }],
         columns=FINAL_COLS,
     )
+    df.attrs["fallback"] = reason
+    return df
+
+
+def is_fallback(df):
+    return bool(df.attrs.get("fallback"))
+
+
+def is_failed(df):
+    return df.attrs.get("fallback") in ("error", "timeout")
+
+
+# ===================================================================
+# Shared HTTP session + csrf-token cache
+#   - one pooled Session keeps TLS connections (and cookies) alive
+#   - the token is read once and reused until CSRF_TTL or a 419/403
+# ===================================================================
+
+_session = None
+_session_lock = threading.Lock()
+
+_csrf = {"token": None, "fetched_at": 0.0}
+_csrf_lock = threading.Lock()
+
+_CSRF_META_RE = re.compile(r"<meta[^>]*name=[\"']csrf-token[\"'][^>]*>", re.I)
+_CONTENT_RE = re.compile(r"content=[\"']([^\"']+)[\"']", re.I)
+
+
+def chartink_url(url):
+    if url.startswith(CHARTINK_HOST):
+        return BASE_URL + url[len(CHARTINK_HOST):]
+    return url
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2,
+                                  pool_maxsize=max(FETCH_WORKERS, 1))
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update({"User-Agent": "Mozilla/5.0"})
+            _session = s
+        return _session
+
+
+def parse_csrf_token(html):
+    # The meta tag sits in <head>; a regex finds it without parsing the page
+    m = _CSRF_META_RE.search(html)
+    if m:
+        content = _CONTENT_RE.search(m.group(0))
+        if content:
+            return content.group(1)
+
+    # Unusual markup → full parse as before
+    tag = BeautifulSoup(html, "html.parser").select_one("meta[name='csrf-token']")
+    return tag["content"] if tag else None
+
+
+def get_csrf_token(page_url, stale=None):
+    """
+    Return the cached csrf-token, fetching `page_url` only when the cache
+    is empty, older than CSRF_TTL, or still holds the `stale` token that
+    Chartink just rejected. Concurrent callers share a single page fetch.
+    """
+    with _csrf_lock:
+        token = _csrf["token"]
+        expired = time.monotonic() - _csrf["fetched_at"] > CSRF_TTL
+        if token and not expired and (stale is None or token != stale):
+            return token
+
+        metrics.inc(metrics.CSRF_FETCHES)
+        with metrics.timer(metrics.CHARTINK_STAGE, stage="csrf_get"):
+            r = get_session().get(page_url, timeout=15)
+            r.raise_for_status()
+
+        with metrics.timer(metrics.CHARTINK_STAGE, stage="csrf_parse"):
+            token = parse_csrf_token(r.text)
+        _csrf["token"] = token
+        _csrf["fetched_at"] = time.monotonic() if token else 0.0
+        return token
+
+
+def _post_scan(scan_code, screener_url, csrf):
+    with metrics.timer(metrics.CHARTINK_STAGE, stage="post"):
+        return _post(scan_code, screener_url, csrf)
+
+
+def _post(scan_code, screener_url, csrf):
+    return get_session().post(
+        chartink_url(PROCESS_URL),
+        data={"scan_clause": scan_code},
+        headers={
+            "X-CSRF-TOKEN": csrf,
+            "Referer": screener_url,
+            "X-Requested-With": "XMLHttpRequest",
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+        },
+        timeout=15,
+    )
 
 
 # ===================================================================
@@ -104,141 +272,303 @@ def fallback_df():
 
 def get_chartink_results(key, cfg):
     scan_code = cfg.get("scan")
-    screener_url = cfg.get("url") or "https://chartink.com/screener/"
+    screener_url = chartink_url(cfg.get("url") or "https://chartink.com/screener/")
 
     if not scan_code:
         print(f"⚠ No scan code for {key} → fallback")
-        return fallback_df()
+        return fallback_df("no_scan")
 
     print(f"\n🔎 Fetching screener → {key}")
 
-    payload = {"scan_clause": scan_code}
-
     try:
-        with requests.Session() as s:
-            # Fetch CSRF token
-            r = s.get(screener_url, timeout=15)
-            r.raise_for_status()
-
-            soup = BeautifulSoup(r.text, "html.parser")
-            csrf_tag = soup.select_one("meta[name='csrf-token']")
-            if not csrf_tag:
+        csrf = get_csrf_token(screener_url)
+        if not csrf:
+            print("❌ CSRF not found → fallback")
+            return fallback_df("error")
+
+        resp = _post_scan(scan_code, screener_url, csrf)
+
+        # Token expired / session rotated → refresh once and retry
+        if resp.status_code in (403, 419):
+            metrics.inc(metrics.CSRF_REJECTED)
+            print(f"🔁 CSRF rejected ({resp.status_code}) for {key} → refreshing token")
+            csrf = get_csrf_token(screener_url, stale=csrf)
+            if not csrf:
                 print("❌ CSRF not found → fallback")
-                return fallback_df()
-
-            csrf = csrf_tag["content"]
-
-            s.headers.update({
-                "X-CSRF-TOKEN": csrf,
-                "User-Agent": "Mozilla/5.0",
-                "Referer": screener_url,
-                "X-Requested-With": "XMLHttpRequest",
-                "Accept": "application/json, text/javascript, */*; q=0.01",
-                "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-            })
-
-            resp = s.post("https://chartink.com/screener/process",
-                          data=payload, timeout=15)
-            resp.raise_for_status()
+                return fallback_df("error")
+            resp = _post_scan(scan_code, screener_url, csrf)
 
+        resp.raise_for_status()
+        with metrics.timer(metrics.CHARTINK_STAGE, stage="json"):
             data_json = resp.json()
 
     except Exception as e:
         print(f"❌ ERROR → {e}")
-        return fallback_df()
+        return fallback_df("error")
 
     rows_json = data_json.get("data", [])
     if not rows_json:
         print(f"⚠ Chartink returned 0 rows for {key}")
         return fallback_df()
 
-    # Correct mapping
-    rows = []
-    for r in rows_json:
-        rows.append({
-            "stock_name": r.get("name", ""),
-            "price": r.get("close", 0),
-            "change": r.get("per_chg", 0),
-            "volume": r.get("volume", 0),
-            "symbol": r.get("nsecode", "")
-        })
-
-    df = pd.DataFrame(rows, columns=FINAL_COLS)
-
-    # ⭐ FILTER: change >= 2
-    df = df[df["change"] >= 2]
+    with metrics.timer(metrics.CHARTINK_STAGE, stage="dataframe"):
+        # Correct mapping
+        rows = []
+        for r in rows_json:
+            rows.append({
+                "stock_name": r.get("name", ""),
+                "price": r.get("close", 0),
+                "change": r.get("per_chg", 0),
+                "volume": r.get("volume", 0),
+                "symbol": r.get("nsecode", "")
+            })
 
-    # ⭐ SORT: highest change first
-    df = df.sort_values(by="change", ascending=False)
+        # ⭐ The full result set is saved; thresholds / top-N are applied
+        #    when reading (rules.py), so history can be replayed under new rules
+        return pd.DataFrame(rows, columns=FINAL_COLS)
 
-    # ⭐ LIMIT: top 5 rows
-    df = df.head(5)
 
-    # Fallback if nothing remains
-    if df.empty:
-        print(f"⚠ After filtering top 5 change>=2 → nothing for {key}")
-        return fallback_df()
 
-    return df
 
+   
 
 
+# ===================================================================
+# Build ALL screeners
+# ===================================================================
 
-   
+def _finish(key, df, elapsed, on_progress=None):
+    metrics.observe(metrics.CHARTINK_SCAN, elapsed, screener=key)
+    if is_fallback(df):
+        metrics.inc(metrics.FALLBACKS, screener=key, reason=df.attrs["fallback"])
+    if on_progress:
+        on_progress(key, "fallback" if is_fallback(df) else "done")
+
+
+def _timed_fetch(key, cfg, on_progress=None):
+    if on_progress:
+        on_progress(key, "running")
+    start = time.perf_counter()
+    df = get_chartink_results(key, cfg)
+    elapsed = time.perf_counter() - start
+    _finish(key, df, elapsed, on_progress)
+    return df, elapsed
+
+
+def _run_local(keys, on_progress=None):
+    """
+    Scans with "engine": "local", in one pass over local bars (engine.py).
+    Returns ({key: DataFrame}, {key: seconds}); each scan is charged the
+    whole pass, since they share the indicator work.
+    """
+    for key in keys:
+        if on_progress:
+            on_progress(key, "running")
+    print(f"\n🧮 Local engine → {', '.join(keys)}")
+
+    start = time.perf_counter()
+    try:
+        results = engine.run_scans(keys, CHARTINK_SCANS)
+    except Exception as e:
+        print(f"❌ Local engine ERROR → {e}")
+        results = {}
+    elapsed = time.perf_counter() - start
+
+    screeners, timings = {}, {}
+    for key in keys:
+        df = results.get(key)
+        if df is None:
+            df = fallback_df("error")
+        elif df.empty:
+            print(f"⚠ Local engine found 0 rows for {key}")
+            df = fallback_df()
+        screeners[key], timings[key] = df, elapsed
+        _finish(key, df, elapsed, on_progress)
+    return screeners, timings
+
+
+def build_screeners(workers=None, timings=None, on_progress=None, keys=None):
+    """
+    Fetch every screener in CHARTINK_SCANS (or only `keys`) → {key: DataFrame}.
+
+    workers=1 walks the scans one by one (old behaviour). Anything higher
+    runs them on a thread pool, so a slow scan only costs its own time.
+    Scans still unfinished after FETCH_DEADLINE seconds get fallback_df().
+    Per-scan seconds are written into `timings` when a dict is passed.
+    `on_progress(key, state)` is called as each scan starts ("running")
+    and ends ("done", "fallback" or "timeout").
+    """
+    workers = FETCH_WORKERS if workers is None else workers
+    timings = {} if timings is None else timings
+    scans = {k: CHARTINK_SCANS[k] for k in (keys or CHARTINK_SCANS)}
+    local = [k for k, cfg in scans.items() if cfg.get("engine") == "local"]
+    remote = {k: cfg for k, cfg in scans.items() if k not in local}
+
+    if workers <= 1:
+        screeners = {}
+        if local:
+            found, secs = _run_local(local, on_progress)
+            screeners.update(found)
+            timings.update(secs)
+        for key, cfg in remote.items():
+            screeners[key], timings[key] = _timed_fetch(key, cfg, on_progress)
+        return {key: screeners[key] for key in scans}
+
+    results = {}
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chartink")
+    futures = {
+        pool.submit(_timed_fetch, key, cfg, on_progress): key
+        for key, cfg in remote.items()
+    }
+    if local:
+        # One task for every local scan; its key is the tuple of scans
+        futures[pool.submit(_run_local, local, on_progress)] = tuple(local)
+    try:
+        for fut in as_completed(futures, timeout=FETCH_DEADLINE):
+            key = futures[fut]
+            if isinstance(key, tuple):
+                found, secs = fut.result()
+                results.update(found)
+                timings.update(secs)
+            else:
+                results[key], timings[key] = fut.result()
+    except FuturesTimeout:
+        for key in local + list(remote):
+            if key not in results:
+                print(f"⏱ {key} not done after {FETCH_DEADLINE:.0f}s → fallback")
+                results[key] = fallback_df("timeout")
+                timings[key] = FETCH_DEADLINE
+                metrics.inc(metrics.FALLBACKS, screener=key, reason="timeout")
+                if on_progress:
+                    on_progress(key, "timeout")
+    finally:
+        # Don't wait for hung requests; queued scans are cancelled.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # Keep CHARTINK_SCANS order, same as the sequential path
+    return {key: results[key] for key in scans}
 
 
 # ===================================================================
-# Build ALL screeners
+# Timing report
 # ===================================================================
 
-def build_screeners():
-    screeners = {}
-    for key, cfg in CHARTINK_SCANS.items():
-        screeners[key] = get_chartink_results(key, cfg)
-    return screeners
+def print_timing_report(timings, wall, label="refresh"):
+    print(f"\n⏱ Timing report ({label})")
+    for key, secs in sorted(timings.items(), key=lambda kv: kv[1], reverse=True):
+        print(f"   {key:<28} {secs:7.2f}s")
+    print(f"   {'sum of scans':<28} {sum(timings.values()):7.2f}s")
+    print(f"   {'wall clock':<28} {wall:7.2f}s")
+
+
+def compare_fetch_modes(workers=None):
+    """Run one sequential and one concurrent fetch and report both timings."""
+    walls = {}
+    for label, n in (("sequential", 1), ("concurrent", workers or FETCH_WORKERS)):
+        timings = {}
+        start = time.perf_counter()
+        build_screeners(workers=n, timings=timings)
+        walls[label] = time.perf_counter() - start
+        print_timing_report(timings, walls[label], f"{label}, workers={n}")
+
+    if walls["concurrent"] > 0:
+        speedup = walls["sequential"] / walls["concurrent"]
+        print(f"\n⚡ Concurrent refresh is {speedup:.1f}x faster")
+    return walls
+
 
 # ===================================================================
 # Save DB
 # ===================================================================
 
-def save_daily_db(screeners):
-    conn = sqlite3.connect(DAILY_DB)
-    for name, df in screeners.items():
-        df.to_sql(name, conn, if_exists="replace", index=False)
-    conn.close()
-    print(f"💾 Saved Daily DB → {DAILY_DB}")
-    return DAILY_DB
-
-
-def register_daily_db(path):
-    conn = sqlite3.connect(MAIN_DB)
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS records (
-            day TEXT PRIMARY KEY,
-            db_path TEXT
-        )
-        """
-    )
-    conn.execute("REPLACE INTO records VALUES (?, ?)", (TODAY_KEY, path))
-    conn.commit()
-    conn.close()
-    print("📘 Updated main DB index")
+# Legacy one-file-per-day writers (ISMARKET_STORAGE=daily)
+def save_daily_db(screeners, day=None):
+    return storage.DailyFileStore(DB_FOLDER, MAIN_DB).write_day(day or today_key(), screeners)
+
+
+def register_daily_db(path, day=None):
+    storage.DailyFileStore(DB_FOLDER, MAIN_DB).register(day or today_key(), path)
+
+
+# Called as fn(day, screeners) after a refresh is committed to the store
+SAVE_LISTENERS = []
+
+
+def save_screeners(screeners, day=None):
+    """Write a (full or partial) refresh for `day` to the configured store."""
+    day = day or today_key()
+    store = storage.get_store()
+    result = store.save_run(day, screeners)
+    for fn in SAVE_LISTENERS:
+        try:
+            fn(day, screeners)
+        except Exception as e:
+            print(f"⚠ Save listener {getattr(fn, '__name__', fn)} failed → {e}")
+    record_deltas(day, screeners)
+    render_reports(store, day)
+    publish_event(store, day, screeners)
+    return result
+
+
+def record_deltas(day, screeners):
+    """Store what entered / left / moved in each screener since its last run (deltas.py)."""
+    fetched = {key: df for key, df in screeners.items() if not is_failed(df)}
+    try:
+        changed = deltas.record(day, fetched)
+        print(f"🔀 Deltas: {len(changed)} of {len(fetched)} screeners changed since their last run")
+    except Exception as e:
+        print(f"⚠ Delta record failed → {e}")
+
+
+def render_reports(store, day):
+    """Pre-render the report files for `day` (report.py); a failure keeps the old ones."""
+    try:
+        with metrics.timer(metrics.RENDER):
+            report.publish(store, day)
+        print(f"📝 Reports rendered → {report.REPORTS_DIR}")
+    except Exception as e:
+        print(f"⚠ Report render failed → {e}")
+
+
+def publish_event(store, day, screeners):
+    """Tell connected dashboards which screeners changed (events.py)."""
+    try:
+        event = events.record(store, day, screeners)
+        if event:
+            print(f"📣 Event {event['id']}: {len(event['changed'])} screeners changed")
+    except Exception as e:
+        print(f"⚠ Event publish failed → {e}")
+
 
 # ===================================================================
 # Main Function
 # ===================================================================
 
-def update_all():
+def update_all(workers=None, on_progress=None, timings=None):
     print("\n🚀 Updating ALL Screeners using Chartink...\n")
 
-    screeners = build_screeners()
-    dbpath = save_daily_db(screeners)
-    register_daily_db(dbpath)
+    day = today_key()
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
+    screeners = build_screeners(workers=workers, timings=timings,
+                                on_progress=on_progress)
+    print_timing_report(timings, time.perf_counter() - start)
+
+    save_screeners(screeners, day)
 
     print("\n🎯 Screener Update Completed Successfully!\n")
     return True
 
 
 if __name__ == "__main__":
-    update_all()
+    parser = argparse.ArgumentParser(description="Refresh Chartink screeners")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"concurrent scans (default {FETCH_WORKERS}, 1 = sequential)")
+    parser.add_argument("--compare", action="store_true",
+                        help="time a sequential and a concurrent fetch, save nothing")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_fetch_modes(args.workers)
+    else:
+        update_all(workers=args.workers)
@@ -0,0 +1,220 @@
+# ===================================================================
+# chartink_stub.py — local stand-in for chartink.com
+#
+#   python chartink_stub.py --port 8765 --latency 0.3 --error-rate 0.05
+#   CHARTINK_BASE_URL=http://127.0.0.1:8765 python chartink.py
+#
+#   Serves what chartink.py talks to:
+#     GET  /screener/<slug>    → page with a <meta name="csrf-token">
+#     POST /screener/process   → Chartink-shaped JSON for scan_clause
+#
+#   Responses are recorded (see `record` below) or synthetic; latency,
+#   jitter, HTTP 500 rate and CSRF-rotation (419) rate are configurable.
+#
+#   python chartink_stub.py record --out chartink_recorded.json
+#       fetch every scan in CHARTINK_SCANS from chartink.com once and
+#       save {scan_clause: response} for --recorded
+# ===================================================================
+
+import argparse
+import hashlib
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+PAGE_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="csrf-token" content="{token}">
+<title>Chartink stand-in</title>
+</head>
+<body><h1>{path}</h1></body>
+</html>
+"""
+
+
+def synthetic_response(scan_clause, rows):
+    """
+    Chartink-shaped JSON with `rows` stocks. Seeded by the clause, so a
+    scan gets the same stocks on every call.
+    """
+    seed = int(hashlib.sha1(scan_clause.encode("utf-8")).hexdigest()[:8], 16)
+    rnd = random.Random(seed)
+    data = []
+    for i in range(rows):
+        n = rnd.randrange(5000)
+        close = round(rnd.uniform(5, 5000), 2)
+        data.append({
+            "sr": i + 1,
+            "nsecode": f"SYM{n:04d}",
+            "name": f"Synthetic Stock {n:04d}",
+            "bsecode": str(500000 + n),
+            "per_chg": round(rnd.uniform(-8, 12), 2),
+            "close": close,
+            "volume": rnd.randrange(100, 5_000_000),
+        })
+    return {"draw": 1, "recordsTotal": rows, "recordsFiltered": rows, "data": data}
+
+
+class StubServer:
+    """
+    Threaded stand-in server. Use as a context manager, or start() /
+    stop(); `url` is the base URL to give chartink.BASE_URL.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, reject_rate=0.0, rows=50, recorded=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reject_rate = reject_rate
+        self.rows = rows
+        self.recorded = recorded or {}
+        self.random = random.Random(seed)
+        self.token = secrets.token_hex(20)
+        self.stats = {"pages": 0, "posts": 0, "errors": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _roll(self, rate):
+        with self._lock:
+            return self.random.random() < rate
+
+    def _delay(self):
+        with self._lock:
+            spread = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        time.sleep(max(self.latency + spread, 0.0))
+
+    def respond(self, scan_clause):
+        return self.recorded.get(scan_clause) or synthetic_response(scan_clause, self.rows)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                body = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                stub._count("pages")
+                if not self.path.startswith("/screener"):
+                    return self._send(404, "not found", "text/plain")
+                html = PAGE_HTML.format(token=stub.token, path=self.path)
+                self._send(200, html, "text/html; charset=UTF-8")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                stub._count("posts")
+
+                if self.path != "/screener/process":
+                    return self._send(404, "not found", "text/plain")
+                # reject_rate: the session "expires" → new token, 419
+                if stub._roll(stub.reject_rate):
+                    stub.token = secrets.token_hex(20)
+                if self.headers.get("X-CSRF-TOKEN") != stub.token:
+                    stub._count("rejected")
+                    return self._send(419, '{"message": "CSRF token mismatch."}',
+                                      "application/json")
+
+                stub._delay()
+                if stub._roll(stub.error_rate):
+                    stub._count("errors")
+                    return self._send(500, '{"message": "Server Error"}', "application/json")
+
+                clause = (form.get("scan_clause") or [""])[0]
+                self._send(200, json.dumps(stub.respond(clause)), "application/json")
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        name="chartink-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def load_recorded(path):
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record(out_path):
+    """Save the live chartink.com response for every configured scan."""
+    import chartink
+
+    recorded = {}
+    for key, cfg in chartink.CHARTINK_SCANS.items():
+        if not cfg.get("scan"):
+            continue
+        page = cfg.get("url") or "https://chartink.com/screener/"
+        resp = chartink._post_scan(cfg["scan"], page, chartink.get_csrf_token(page))
+        resp.raise_for_status()
+        recorded[cfg["scan"]] = resp.json()
+        print(f"🎙 {key} → {len(recorded[cfg['scan']].get('data', []))} rows")
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(recorded, f)
+    print(f"💾 Recorded {len(recorded)} scans → {out_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Chartink stand-in server")
+    parser.add_argument("cmd", nargs="?", choices=["serve", "record"], default="serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per POST")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± seconds around --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of POSTs answered 500")
+    parser.add_argument("--reject-rate", type=float, default=0.0,
+                        help="share of POSTs that rotate the CSRF token (→ 419)")
+    parser.add_argument("--rows", type=int, default=50, help="rows per synthetic response")
+    parser.add_argument("--recorded", help="JSON file from `record`")
+    parser.add_argument("--out", default="chartink_recorded.json", help="(record) output file")
+    args = parser.parse_args()
+
+    if args.cmd == "record":
+        record(args.out)
+    else:
+        server = StubServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                            args.reject_rate, args.rows, load_recorded(args.recorded))
+        print(f"🧪 Chartink stand-in on {server.url} (Ctrl+C to stop)")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
@@ -0,0 +1,385 @@
+# ===================================================================
+# clause.py — Chartink scan clauses → AST → vectorized masks
+#
+#   node = parse("( {cash} ( daily close > daily sma( close,200 ) "
+#                "and daily rsi( 14 ) > 51 ) )")
+#   mask = evaluate(node, ctx)        → bool per symbol (engine.Context)
+#
+#   Only the technical part of the language is understood: OHLCV fields,
+#   sma / ema / rsi / macd / parabolic sar / max / min, arithmetic,
+#   comparisons, and / or, "N days ago" and [-N] candle offsets, on
+#   daily / weekly / monthly / 5 minute / 15 minute bars. Anything else
+#   (market cap, eps, watchlist segments, ...) raises ClauseError, so a
+#   scan is either evaluated exactly or left to Chartink.
+#
+#   Indicator series come from engine.Context, which caches them by
+#   (name, args, timeframe); a term like sma(close, 200) is computed
+#   once per run however many scans use it.
+# ===================================================================
+
+import operator
+import re
+
+import numpy as np
+
+
+class ClauseError(ValueError):
+    """A clause this module can't parse or evaluate locally."""
+
+
+# ---------------------------------------------------------
+# VOCABULARY
+# ---------------------------------------------------------
+FIELDS = {"open", "high", "low", "close", "volume"}
+
+# name → (Context method, numeric args, takes a source field)
+FUNCTIONS = {
+    "sma": ("sma", 1, True),
+    "ema": ("ema", 1, True),
+    "max": ("max", 1, True),
+    "min": ("min", 1, True),
+    "rsi": ("rsi", 1, False),
+    "macd histogram": ("macd_hist", 3, False),
+    "macd line": ("macd_line", 2, False),
+    "macd signal": ("macd_signal", 3, False),
+    "parabolic sar": ("psar", 3, False),
+}
+
+# Timeframe words → bars.py timeframe; "N minute" is matched separately
+TIMEFRAMES = {"latest": "daily", "daily": "daily", "weekly": "weekly", "monthly": "monthly"}
+MINUTES = {5: "5m", 15: "15m"}
+
+AGO_UNITS = {"day", "days", "week", "weeks", "month", "months", "candle", "candles"}
+
+SEGMENTS = {"cash"}  # universes we can reproduce locally (all of bars/)
+
+NAMES = FIELDS | set(FUNCTIONS)
+LONGEST_NAME = max(len(n.split()) for n in NAMES)
+
+CMP_OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt,
+           "<=": operator.le, "=": operator.eq, "!=": operator.ne}
+ARITH_OPS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv}
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+      (?P<num>\d+\.?\d*|\.\d+)
+    | (?P<op>>=|<=|!=|=|>|<|\+|-|\*|/|\(|\)|,|\[|\])
+    | (?P<seg>\{[^}]*\})
+    | (?P<word>[A-Za-z_]+)
+    )""", re.VERBOSE)
+
+
+def tokenize(text):
+    tokens, pos, text = [], 0, text.strip()
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if not m or m.end() == pos:
+            bad = text[pos:].lstrip()[:1]
+            raise ClauseError(f"unexpected character {bad!r} at {len(text) - len(text[pos:].lstrip())}")
+        kind = m.lastgroup
+        value = m.group(kind)
+        tokens.append((kind, float(value) if kind == "num" else value.lower()))
+        pos = m.end()
+    return tokens
+
+
+# ---------------------------------------------------------
+# PARSER
+#   Nodes are plain tuples, so identical sub-expressions are equal
+#   and hashable:
+#     ("num", 2.0)                  ("field", tf, "close")
+#     ("call", tf, "sma", args)     ("ago", n, node)
+#     ("neg", node)                 ("arith", "*", a, b)
+#     ("cmp", ">", a, b)            ("and", nodes) / ("or", nodes)
+#   tf is None until resolved (an unprefixed term inherits the
+#   timeframe of the call it's an argument of, else daily).
+# ---------------------------------------------------------
+class _Parser:
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.i = 0
+
+    def peek(self, k=0):
+        j = self.i + k
+        return self.tokens[j] if j < len(self.tokens) else (None, None)
+
+    def next(self):
+        tok = self.peek()
+        self.i += 1
+        return tok
+
+    def accept(self, value):
+        if self.peek()[1] == value:
+            self.i += 1
+            return True
+        return False
+
+    def where(self):
+        value = self.peek()[1]
+        return "end of clause" if value is None else repr(value)
+
+    def expect(self, value):
+        if not self.accept(value):
+            raise ClauseError(f"expected {value!r}, got {self.where()}")
+
+    # scan := "(" scan ")" | {segment} "(" expr ")" | expr
+    def scan(self):
+        node = self._scan()
+        if self.peek()[0] is not None:
+            raise ClauseError(f"unexpected {self.where()}")
+        return node
+
+    def _scan(self):
+        kind, value = self.peek()
+        if kind == "seg":
+            self.next()
+            segment = value.strip("{} ")
+            if segment not in SEGMENTS:
+                raise ClauseError(f"segment {{{segment}}} has no local equivalent")
+            self.expect("(")
+            node = self.expr()
+            self.expect(")")
+            return node
+        if value == "(" and self.peek(1)[0] == "seg":
+            self.next()
+            node = self._scan()
+            self.expect(")")
+            return node
+        return self.expr()
+
+    def expr(self):
+        return self._chain("or", self.conj)
+
+    def conj(self):
+        return self._chain("and", self.comparison)
+
+    def _chain(self, word, part):
+        nodes = [part()]
+        while self.accept(word):
+            nodes.append(part())
+        return nodes[0] if len(nodes) == 1 else (word, tuple(nodes))
+
+    def comparison(self):
+        left = self.arith()
+        if self.peek()[1] in CMP_OPS:
+            op = self.next()[1]
+            return ("cmp", op, left, self.arith())
+        return left
+
+    def arith(self):
+        node = self.term()
+        while self.peek()[1] in ("+", "-"):
+            op = self.next()[1]
+            node = ("arith", op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek()[1] in ("*", "/"):
+            op = self.next()[1]
+            node = ("arith", op, node, self.unary())
+        return node
+
+    def unary(self):
+        if self.accept("-"):
+            return ("neg", self.unary())
+        return self.atom()
+
+    def atom(self):
+        kind, value = self.peek()
+
+        if value == "(":
+            self.next()
+            node = self.expr()
+            self.expect(")")
+            return node
+
+        # [0] / [-1] candle offsets (intraday screens)
+        if value == "[":
+            self.next()
+            neg = self.accept("-")
+            n = self.next()[1]
+            self.expect("]")
+            if not isinstance(n, float) or (n and not neg):
+                raise ClauseError("candle offset must be [0] or [-N]")
+            return self._ago(int(n), self.atom())
+
+        if kind == "num":
+            # "200 days ago high" / "5 minute close" / a plain number
+            unit = self.peek(1)[1]
+            if unit in AGO_UNITS and self.peek(2)[1] == "ago":
+                self.i += 3
+                return self._ago(int(value), self.atom())
+            if unit == "minute":
+                if int(value) not in MINUTES:
+                    raise ClauseError(f"no local {int(value)} minute bars")
+                self.i += 2
+                return _with_tf(self.atom(), MINUTES[int(value)])
+            self.next()
+            return ("num", value)
+
+        if kind == "word" and value in TIMEFRAMES:
+            self.next()
+            return _with_tf(self.atom(), TIMEFRAMES[value])
+
+        if kind == "word":
+            return self.name()
+
+        raise ClauseError(f"unexpected {self.where()}")
+
+    def _ago(self, n, node):
+        return node if n == 0 else ("ago", n, node)
+
+    def name(self):
+        words = []
+        while len(words) < LONGEST_NAME and self.peek(len(words))[0] == "word":
+            words.append(self.peek(len(words))[1])
+        for k in range(len(words), 0, -1):
+            name = " ".join(words[:k])
+            if name in NAMES:
+                self.i += k
+                break
+        else:
+            raise ClauseError(f"unsupported term {' '.join(words) or self.peek()[1]!r}")
+
+        if name in FIELDS:
+            return ("field", None, name)
+
+        self.expect("(")
+        args = []
+        if not self.accept(")"):
+            args.append(self.arith())
+            while self.accept(","):
+                args.append(self.arith())
+            self.expect(")")
+        return ("call", None, name, tuple(args))
+
+
+def _with_tf(node, tf):
+    """Apply a timeframe prefix to the term it precedes."""
+    if node[0] in ("field", "call") and node[1] is None:
+        return (node[0], tf) + node[2:]
+    if node[0] == "ago":
+        return ("ago", node[1], _with_tf(node[2], tf))
+    raise ClauseError("timeframe prefix must precede a field or indicator")
+
+
+def _resolve(node, tf="daily"):
+    """Fill in inherited timeframes and check call arguments."""
+    kind = node[0]
+    if kind == "num":
+        return node
+    if kind == "field":
+        return ("field", node[1] or tf, node[2])
+    if kind == "call":
+        own = node[1] or tf
+        name, args = node[2], tuple(_resolve(a, own) for a in node[3])
+        _check_call(name, args, own)
+        return ("call", own, name, args)
+    if kind == "ago":
+        return ("ago", node[1], _resolve(node[2], tf))
+    if kind == "neg":
+        return ("neg", _resolve(node[1], tf))
+    if kind in ("arith", "cmp"):
+        return (kind, node[1], _resolve(node[2], tf), _resolve(node[3], tf))
+    return (kind, tuple(_resolve(n, tf) for n in node[1]))
+
+
+def _check_call(name, args, tf):
+    _, n_nums, takes_field = FUNCTIONS[name]
+    fields = [a for a in args if a[0] == "field"]
+    nums = [a for a in args if a[0] == "num"]
+    if len(fields) != int(takes_field) or len(nums) != n_nums or len(args) != len(fields) + len(nums):
+        raise ClauseError(f"unsupported arguments to {name}()")
+    if fields and fields[0][1] != tf:
+        raise ClauseError(f"{name}() source must be on the {tf} timeframe")
+
+
+def parse(text):
+    """Clause text → resolved AST (raises ClauseError)."""
+    return _resolve(_Parser(text).scan())
+
+
+def supported(text):
+    try:
+        parse(text)
+        return True
+    except ClauseError:
+        return False
+
+
+def terms(node):
+    """Distinct indicator / field terms in a node (for run statistics)."""
+    kind = node[0]
+    if kind in ("field", "call"):
+        return {node}
+    if kind == "num":
+        return set()
+    if kind in ("ago", "neg"):
+        return terms(node[-1])
+    if kind in ("arith", "cmp"):
+        return terms(node[2]) | terms(node[3])
+    return set().union(*(terms(n) for n in node[1]))
+
+
+def depth(node, ago=0):
+    """Furthest bar back (\"N days ago\" / [-N]) any term in a node is read at."""
+    kind = node[0]
+    if kind == "num":
+        return 0
+    if kind in ("field", "call"):
+        return ago
+    if kind == "ago":
+        return depth(node[2], ago + node[1])
+    if kind == "neg":
+        return depth(node[1], ago)
+    if kind in ("arith", "cmp"):
+        return max(depth(node[2], ago), depth(node[3], ago))
+    return max(depth(n, ago) for n in node[1])
+
+
+# ---------------------------------------------------------
+# EVALUATION (latest bar, every symbol at once)
+# ---------------------------------------------------------
+def series(node, ctx):
+    """Full (symbols × bars) series for a field / call node, via ctx's cache."""
+    if node[0] == "field":
+        return ctx.field(node[2], tf=node[1])
+    _, tf, name, args = node
+    # Context methods take their arguments in Chartink's order
+    values = [a[2] if a[0] == "field" else _number(a[1]) for a in args]
+    return getattr(ctx, FUNCTIONS[name][0])(*values, tf=tf)
+
+
+def _number(v):
+    return int(v) if v.is_integer() else v
+
+
+def evaluate(node, ctx):
+    """Value of `node` on the latest bar, one per symbol."""
+    # Incremental contexts keep a short tail per term; widen it first
+    ctx.reserve(depth(node))
+    return _evaluate(node, ctx)
+
+
+def _evaluate(node, ctx, ago=0):
+    kind = node[0]
+    if kind == "num":
+        return node[1]
+    if kind in ("field", "call"):
+        return ctx.last(series(node, ctx), ago)
+    if kind == "ago":
+        return _evaluate(node[2], ctx, ago + node[1])
+    if kind == "neg":
+        return -_evaluate(node[1], ctx, ago)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if kind == "arith":
+            return ARITH_OPS[node[1]](_evaluate(node[2], ctx, ago), _evaluate(node[3], ctx, ago))
+        if kind == "cmp":
+            # NaN compares False: symbols without enough history don't match
+            return CMP_OPS[node[1]](_evaluate(node[2], ctx, ago), _evaluate(node[3], ctx, ago))
+
+    parts = [np.asarray(_evaluate(n, ctx, ago), dtype=bool) for n in node[1]]
+    combine = np.logical_and if kind == "and" else np.logical_or
+    return combine.reduce(parts)
@@ -0,0 +1,191 @@
+# ===================================================================
+# deltas.py — run-to-run screener changes, computed at commit time
+#
+#   record(day, screeners) runs after every committed refresh
+#   (chartink.save_screeners) and compares each screener's new rows
+#   with its last committed rows (kept in MAIN_DB, screener_snapshots):
+#
+#     added    symbols that entered the screener   (new price / change)
+#     dropped  symbols that left it                (last price / change)
+#     moved    symbols still in it whose price or change moved
+#
+#   One screener_deltas row per screener that changed. A failed scan
+#   is never recorded as "everything dropped"; chartink passes only the
+#   screeners that were actually fetched.
+#
+#   diffs(screeners, start, end) answers /api/diff from these rows alone:
+#   the deltas of every run after `start` up to `end` are folded into
+#   one (a symbol's first and last appearance decide whether it was
+#   added, dropped or moved), so no day tables are read or compared.
+#   This relies on refreshes committing in day order, which
+#   update_all / scheduler.py always do.
+# ===================================================================
+
+import json
+import sqlite3
+import time
+
+import storage
+
+_ready = set()   # MAIN_DB paths whose tables this process has created
+
+
+def _connect():
+    conn = sqlite3.connect(storage.MAIN_DB, timeout=15, isolation_level=None)
+    if storage.MAIN_DB in _ready:
+        return conn
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS screener_snapshots (
+            screener TEXT PRIMARY KEY,
+            day TEXT NOT NULL,
+            rows TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS screener_deltas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            screener TEXT NOT NULL,
+            day TEXT NOT NULL,
+            prev_day TEXT,
+            created_at REAL NOT NULL,
+            added TEXT NOT NULL,
+            dropped TEXT NOT NULL,
+            moved TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_screener_deltas ON screener_deltas (screener, day);
+        """
+    )
+    _ready.add(storage.MAIN_DB)
+    return conn
+
+
+def snapshot(df):
+    """DataFrame → {symbol: [stock_name, price, change]} (N/A rows left out)."""
+    out = {}
+    for stock_name, price, change, _, symbol in storage.df_to_rows(df):
+        symbol = symbol or stock_name
+        if symbol and symbol.upper() != "N/A":
+            out[symbol] = [stock_name, round(price, 2), round(change, 2)]
+    return out
+
+
+def _entry(symbol, values):
+    return {"symbol": symbol, "stock_name": values[0], "price": values[1], "change": values[2]}
+
+
+def _moved(symbol, old, new):
+    return {**_entry(symbol, new), "prev_price": old[1], "prev_change": old[2]}
+
+
+def compare(old, new):
+    """Two snapshots → {"added", "dropped", "moved"} lists of entries."""
+    return {
+        "added": [_entry(s, v) for s, v in sorted(new.items()) if s not in old],
+        "dropped": [_entry(s, v) for s, v in sorted(old.items()) if s not in new],
+        "moved": [_moved(s, old[s], v) for s, v in sorted(new.items())
+                  if s in old and old[s][1:] != v[1:]],
+    }
+
+
+# ---------------------------------------------------------
+# WRITE (after a refresh commits)
+# ---------------------------------------------------------
+def record(day, screeners):
+    """Store the changes since each screener's last run → {key: delta} (changed ones)."""
+    snaps = {key: snapshot(df) for key, df in screeners.items()}
+    if not snaps:
+        return {}
+    now = time.time()
+
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        marks = ", ".join("?" * len(snaps))
+        prev = {r[0]: (r[1], json.loads(r[2])) for r in conn.execute(
+            f"SELECT screener, day, rows FROM screener_snapshots WHERE screener IN ({marks})",
+            list(snaps))}
+
+        out, delta_rows = {}, []
+        for key, snap in snaps.items():
+            prev_day, old = prev.get(key, (None, {}))
+            delta = compare(old, snap)
+            if any(delta.values()):
+                out[key] = delta
+                delta_rows.append((key, day, prev_day, now, json.dumps(delta["added"]),
+                                   json.dumps(delta["dropped"]), json.dumps(delta["moved"])))
+
+        conn.executemany(
+            "INSERT INTO screener_deltas (screener, day, prev_day, created_at, added, dropped, moved) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", delta_rows)
+        conn.executemany(
+            "INSERT OR REPLACE INTO screener_snapshots (screener, day, rows) VALUES (?, ?, ?)",
+            [(key, day, json.dumps(snap)) for key, snap in snaps.items()])
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return out
+
+
+# ---------------------------------------------------------
+# READ
+# ---------------------------------------------------------
+def fold(deltas):
+    """Consecutive deltas (oldest first) → the one delta they add up to."""
+    first, last = {}, {}   # symbol → (in the screener?, values) before / after
+    for delta in deltas:
+        for e in delta["added"]:
+            first.setdefault(e["symbol"], (False, None))
+            last[e["symbol"]] = (True, [e["stock_name"], e["price"], e["change"]])
+        for e in delta["dropped"]:
+            first.setdefault(e["symbol"], (True, [e["stock_name"], e["price"], e["change"]]))
+            last[e["symbol"]] = (False, None)
+        for e in delta["moved"]:
+            first.setdefault(e["symbol"], (True, [e["stock_name"], e["prev_price"], e["prev_change"]]))
+            last[e["symbol"]] = (True, [e["stock_name"], e["price"], e["change"]])
+
+    old = {s: v for s, (present, v) in first.items() if present}
+    new = {s: v for s, (present, v) in last.items() if present}
+    # Symbols no delta touched were in the screener (or not) throughout
+    return compare(old, new)
+
+
+_COLS = "screener, id, day, prev_day, created_at, added, dropped, moved"
+
+
+def _load(sql, screeners, params):
+    """Delta rows for `screeners` → {screener: [delta, ...]} (oldest first)."""
+    screeners = list(screeners)
+    out = {key: [] for key in screeners}
+    if not screeners:
+        return out
+    marks = ", ".join("?" * len(screeners))
+    conn = _connect()
+    try:
+        rows = conn.execute(sql.format(cols=_COLS, marks=marks), (*screeners, *params)).fetchall()
+    finally:
+        conn.close()
+    for r in rows:
+        out[r[0]].append({"id": r[1], "day": r[2], "prev_day": r[3], "created_at": r[4],
+                          "added": json.loads(r[5]), "dropped": json.loads(r[6]),
+                          "moved": json.loads(r[7])})
+    return out
+
+
+def last_runs(screeners, day):
+    """The latest stored delta of each screener on `day` → {screener: delta or None}."""
+    found = _load("SELECT {cols} FROM screener_deltas WHERE id IN ("
+                  "SELECT MAX(id) FROM screener_deltas "
+                  "WHERE screener IN ({marks}) AND day = ? GROUP BY screener)",
+                  screeners, (day,))
+    return {key: rows[0] if rows else None for key, rows in found.items()}
+
+
+def diffs(screeners, start, end):
+    """
+    Changes in each screener between the last run of day `start` and
+    the last run of day `end` (YYYY_MM_DD), in one query
+    → {screener: {"added", "dropped", "moved", "runs"}}.
+    """
+    found = _load("SELECT {cols} FROM screener_deltas "
+                  "WHERE screener IN ({marks}) AND day > ? AND day <= ? ORDER BY id",
+                  screeners, (start, end))
+    return {key: {**fold(rows), "runs": len(rows)} for key, rows in found.items()}
@@ -0,0 +1,408 @@
+# ===================================================================
+# engine.py — evaluate screeners locally over bars.py data
+#
+#   Scans marked "engine": "local" in CHARTINK_SCANS are answered here
+#   instead of by chartink.com: the whole universe is loaded as
+#   (symbols × bars) arrays, indicators are computed with numpy for
+#   every symbol at once, and each scan is a boolean mask on the last
+#   bar. Scan clauses are compiled by clause.py; all scans in a run
+#   share one Context, so a repeated term is computed once. Output has
+#   the FINAL_COLS shape, so the rest of the app can't tell a local
+#   result from a Chartink one.
+#
+#   python engine.py                    → run every local scan, print counts
+#   python engine.py --scan potential_breakouts
+#   python engine.py --all              → every scan whose clause compiles
+# ===================================================================
+
+import argparse
+import copy
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import bars as bars_mod
+import clause
+import indicators as ind
+import patterns
+
+FINAL_COLS = ["stock_name", "price", "change", "volume", "symbol"]
+
+# Keep indicator state between runs (IncrementalContext); 0 → recompute
+# every indicator over the full history each run
+INCREMENTAL = os.getenv("ISMARKET_ENGINE_INCREMENTAL", "1") != "0"
+STATE_DIR = os.getenv("ISMARKET_ENGINE_STATE_DIR", os.path.join(bars_mod.BARS_DIR, "state"))
+
+# Indicator values kept per term for "N bars ago" lookups, at least
+# (≥ patterns.WINDOW, the RSI history a candlestick pattern reads);
+# scans reading further back raise it through Context.reserve()
+TAIL = 10
+
+
+class Context:
+    """
+    Bars for every timeframe a run touches plus a cache of computed
+    indicator series, so a term like sma(close, 200) is computed once
+    however many scans use it. Timeframes load on first use and share
+    the first one's symbol rows; weekly / monthly are built from daily.
+    """
+
+    def __init__(self, bars=None, folder=None):
+        self.folder = folder
+        self._bars = {}
+        self.symbols = self.names = None
+        if bars is not None:
+            self.add(bars.timeframe, bars)
+        self._cache = {}
+        self.computed = 0
+
+    def add(self, tf, bars):
+        if self.symbols is None:
+            self.symbols, self.names = bars.symbols, bars.names
+        elif bars.symbols != self.symbols:
+            bars = bars.reindex(self.symbols)
+        self._bars[tf] = bars
+        return bars
+
+    def bars(self, tf="daily"):
+        b = self._bars.get(tf)
+        if b is None:
+            if tf in bars_mod.RESAMPLED:
+                b = bars_mod.resample(self.bars("daily"), tf)
+            else:
+                kwargs = {"folder": self.folder} if self.folder else {}
+                b = bars_mod.load_bars(tf, **kwargs)
+            b = self.add(tf, b)
+        return b
+
+    def term(self, name, fn, *args):
+        key = (name, *args)
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = fn()
+            self.computed += 1
+        return value
+
+    def field(self, f, ago=0, tf="daily"):
+        return self.term("field", lambda: ind.shift(self.bars(tf).field(f), ago), f, ago, tf)
+
+    def sma(self, f, n, tf="daily"):
+        return self.term("sma", lambda: ind.sma(self.field(f, tf=tf), n), f, n, tf)
+
+    def ema(self, f, n, tf="daily"):
+        return self.term("ema", lambda: ind.ema(self.field(f, tf=tf), n), f, n, tf)
+
+    def rsi(self, n=14, tf="daily"):
+        return self.term("rsi", lambda: ind.rsi(self.field("close", tf=tf), n), n, tf)
+
+    def macd_line(self, slow=26, fast=12, tf="daily"):
+        return self.term("macd_line", lambda: self.ema("close", fast, tf) - self.ema("close", slow, tf),
+                         slow, fast, tf)
+
+    def macd_signal(self, slow=26, fast=12, signal=9, tf="daily"):
+        return self.term("macd_signal", lambda: ind.ema(self.macd_line(slow, fast, tf), signal),
+                         slow, fast, signal, tf)
+
+    def macd_hist(self, slow=26, fast=12, signal=9, tf="daily"):
+        return self.term("macd_hist", lambda: self.macd_line(slow, fast, tf)
+                         - self.macd_signal(slow, fast, signal, tf), slow, fast, signal, tf)
+
+    def psar(self, step=0.02, start=0.02, maximum=0.2, tf="daily"):
+        return self.term("psar", lambda: ind.psar(self.field("high", tf=tf), self.field("low", tf=tf),
+                                                  step, start, maximum), step, start, maximum, tf)
+
+    def max(self, n, f, tf="daily"):
+        return self.term("max", lambda: ind.rolling_max(self.field(f, tf=tf), n), n, f, tf)
+
+    def min(self, n, f, tf="daily"):
+        return self.term("min", lambda: ind.rolling_min(self.field(f, tf=tf), n), n, f, tf)
+
+    def reserve(self, ago):
+        """Make sure terms can be read `ago` bars back (full series here: always)."""
+
+    def last(self, series, ago=0):
+        """Value on the latest bar (or `ago` bars before it), per symbol."""
+        if ago >= series.shape[1]:
+            return np.full(series.shape[0], np.nan)
+        return series[:, -1 - ago]
+
+    def save(self):
+        pass
+
+
+class IncrementalContext(Context):
+    """
+    Context whose indicators are updated bar by bar from state saved by
+    the previous run (indicators.*State), so a run costs about the number
+    of new bars rather than the whole history.
+
+    Closed bars (all but the latest) are folded into the state and saved
+    by save(); the latest bar may still be forming (today's daily bar,
+    the current 15m candle, this week), so it is applied to a copy each
+    run. Indicator terms return their last `tail` values, not full
+    series; reserve() widens that before a scan reading further back.
+    """
+
+    def __init__(self, bars=None, folder=None, state_dir=None):
+        super().__init__(bars, folder)
+        self.state_dir = state_dir or (os.path.join(folder, "state") if folder else STATE_DIR)
+        self._states = {}   # tf → {term key: {"state", "tail", "time"}}
+        self.stepped = 0    # bar updates applied this run, over all terms
+        self.tail = TAIL
+        self._stepped_keys = set()
+
+    def reserve(self, ago):
+        if ago < self.tail:
+            return
+        self.tail = ago + 1
+        # Terms already built this run are too short; rebuild on next use
+        for key in self._stepped_keys:
+            self._cache.pop(key, None)
+        self._stepped_keys.clear()
+
+    def _path(self, tf):
+        return os.path.join(self.state_dir, f"{tf}.pkl")
+
+    def _saved(self, tf):
+        terms = self._states.get(tf)
+        if terms is None:
+            terms = {}
+            try:
+                with open(self._path(tf), "rb") as f:
+                    saved = pickle.load(f)
+                if saved["symbols"] == self.bars(tf).symbols:
+                    terms = saved["terms"]
+            except (OSError, EOFError, pickle.UnpicklingError, KeyError):
+                pass
+            self._states[tf] = terms
+        return terms
+
+    def _step(self, name, args, tf, make, fields):
+        def build():
+            b = self.bars(tf)
+            times, n_bars = b.times, len(b.times)
+            terms = self._saved(tf)
+            key = (name, *args)
+
+            # Resume after the last committed bar, or rebuild from scratch
+            # (also when the saved tail is shorter than this run reads)
+            entry, start = terms.get(key), 0
+            if entry is not None and entry["tail"].shape[1] < self.tail:
+                entry = None
+            if entry is not None:
+                hit = np.flatnonzero(times == entry["time"])
+                if len(hit) and hit[0] < n_bars - 1:
+                    start = hit[0] + 1
+                else:
+                    entry = None
+            if entry is None:
+                n_sym = len(self.symbols)
+                entry = {"state": make(n_sym), "tail": np.full((n_sym, self.tail), np.nan), "time": None}
+
+            inputs = [b.field(f) for f in fields]
+            for t in range(start, n_bars - 1):
+                value = entry["state"].update(*(x[:, t] for x in inputs))
+                entry["tail"] = np.column_stack([entry["tail"][:, 1:], value])
+                entry["time"] = times[t]
+            terms[key] = entry
+
+            live = copy.deepcopy(entry["state"]).update(*(x[:, -1] for x in inputs))
+            self.stepped += n_bars - start
+            return np.column_stack([entry["tail"][:, 1:], live])
+
+        self._stepped_keys.add((name, *args, tf))
+        return self.term(name, build, *args, tf)
+
+    def sma(self, f, n, tf="daily"):
+        return self._step("sma", (f, n), tf, lambda s: ind.SMAState(s, n), [f])
+
+    def ema(self, f, n, tf="daily"):
+        return self._step("ema", (f, n), tf, lambda s: ind.EMAState(s, n), [f])
+
+    def rsi(self, n=14, tf="daily"):
+        return self._step("rsi", (n,), tf, lambda s: ind.RSIState(s, n), ["close"])
+
+    def macd_line(self, slow=26, fast=12, tf="daily"):
+        return self._step("macd_line", (slow, fast), tf,
+                          lambda s: ind.MACDState(s, slow, fast, 9, "line"), ["close"])
+
+    def macd_signal(self, slow=26, fast=12, signal=9, tf="daily"):
+        return self._step("macd_signal", (slow, fast, signal), tf,
+                          lambda s: ind.MACDState(s, slow, fast, signal, "signal"), ["close"])
+
+    def macd_hist(self, slow=26, fast=12, signal=9, tf="daily"):
+        return self._step("macd_hist", (slow, fast, signal), tf,
+                          lambda s: ind.MACDState(s, slow, fast, signal, "hist"), ["close"])
+
+    def psar(self, step=0.02, start=0.02, maximum=0.2, tf="daily"):
+        return self._step("psar", (step, start, maximum), tf,
+                          lambda s: ind.PSARState(s, step, start, maximum), ["high", "low"])
+
+    def max(self, n, f, tf="daily"):
+        return self._step("max", (n, f), tf, lambda s: ind.ExtremeState(s, n, "max"), [f])
+
+    def min(self, n, f, tf="daily"):
+        return self._step("min", (n, f), tf, lambda s: ind.ExtremeState(s, n, "min"), [f])
+
+    def save(self):
+        """Write the committed state of every timeframe used (temp file + rename)."""
+        os.makedirs(self.state_dir, exist_ok=True)
+        for tf, terms in self._states.items():
+            path = self._path(tf)
+            # Own temp file per writer: two scans saving at once can't clobber it
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_",
+                                       suffix=os.path.basename(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump({"symbols": self.bars(tf).symbols, "terms": terms}, f,
+                                protocol=pickle.HIGHEST_PROTOCOL)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+
+
+def new_context(folder=None):
+    return IncrementalContext(folder=folder) if INCREMENTAL else Context(folder=folder)
+
+
+# ---------------------------------------------------------
+# LOCAL SCANS: fn(ctx, tf) → bool mask per symbol (latest bar)
+#   For screens the clause language can't express (candlestick
+#   patterns). Scans with a "scan" clause in CHARTINK_SCANS are compiled
+#   by clause.py instead.
+# ---------------------------------------------------------
+def candles(ctx, tf, width=None):
+    """patterns.Candles over the last `width` bars of tf (all bars if None)."""
+    cols = slice(-width, None) if width else slice(None)
+    return patterns.Candles(*(ctx.field(f, tf=tf)[:, cols] for f in bars_mod.FIELDS))
+
+
+def pattern_scan(fn):
+    """patterns.fn(candles, rsi) → LOCAL_SCANS entry, on the last WINDOW bars."""
+    def scan(ctx, tf):
+        width = patterns.WINDOW
+        return fn(candles(ctx, tf, width), ctx.rsi(14, tf=tf)[:, -width:])[:, -1]
+    return scan
+
+
+def first_candle_scan(ctx, tf):
+    return patterns.first_candle_breakout(candles(ctx, tf), ctx.bars(tf).times)[:, -1]
+
+
+PATTERN_SCANS = {
+    "bearish_engulf_5m": patterns.bearish_engulfing,
+    "tweezer_bottom_15m": patterns.tweezer_bottom,
+    "bullish_harami_15m": patterns.bullish_harami,
+    "dragonfly_doji_15m": patterns.dragonfly_doji,
+    "bearish_kicker_15m": patterns.bearish_kicker,
+    "morning_star_bullish": patterns.morning_star,
+    "bearish_engulfing_strong": patterns.bearish_engulfing_strong,
+}
+
+LOCAL_SCANS = {key: pattern_scan(fn) for key, fn in PATTERN_SCANS.items()}
+LOCAL_SCANS["first_15m_breakout_both"] = first_candle_scan
+
+
+# ---------------------------------------------------------
+# RUN
+# ---------------------------------------------------------
+def results_frame(ctx, mask, tf="daily"):
+    """Matching symbols on the latest bar → FINAL_COLS DataFrame."""
+    close = ctx.last(ctx.field("close", tf=tf))
+    prev = ctx.last(ctx.field("close", tf=tf), 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.round((close - prev) / prev * 100, 2)
+
+    mask = np.asarray(mask, dtype=bool) & ~np.isnan(close)
+    idx = np.flatnonzero(mask)
+    return pd.DataFrame({
+        "stock_name": [ctx.names[i] for i in idx],
+        "price": close[idx],
+        "change": np.nan_to_num(change[idx]),
+        "volume": np.nan_to_num(ctx.last(ctx.field("volume", tf=tf))[idx]).astype(np.int64),
+        "symbol": [ctx.symbols[i] for i in idx],
+    }, columns=FINAL_COLS)
+
+
+def compile_scan(key, cfg):
+    """
+    cfg → fn(ctx) → mask: the "scan" clause compiled by clause.py, else
+    a LOCAL_SCANS function. Raises clause.ClauseError if neither applies.
+    """
+    if cfg.get("scan"):
+        node = clause.parse(cfg["scan"])
+        scan = lambda ctx: clause.evaluate(node, ctx)
+        scan.depth = clause.depth(node)
+        return scan
+    if key in LOCAL_SCANS:
+        tf = cfg.get("timeframe", "daily")
+        return lambda ctx: LOCAL_SCANS[key](ctx, tf)
+    raise clause.ClauseError(f"{key} has no clause and no local scan")
+
+
+def run_scans(keys, scans=None, folder=None, ctx=None):
+    """
+    Evaluate local scans → {key: DataFrame}; a scan that can't be
+    compiled or whose bars are missing is left out (with a warning).
+    `scans` maps key → cfg (CHARTINK_SCANS entries). All scans share one
+    Context, so bars load and indicators compute once per run.
+    """
+    scans = scans or {}
+    ctx = ctx or new_context(folder)
+    compiled = {}
+    for key in keys:
+        try:
+            compiled[key] = compile_scan(key, scans.get(key, {}))
+        except clause.ClauseError as e:
+            print(f"⚠ Local scan {key} skipped → {e}")
+    # Size the indicator tails once for the furthest "N days ago" in the run
+    ctx.reserve(max((getattr(fn, "depth", 0) for fn in compiled.values()), default=0))
+
+    results = {}
+    for key, fn in compiled.items():
+        try:
+            mask = fn(ctx)
+            results[key] = results_frame(ctx, mask, scans.get(key, {}).get("timeframe", "daily"))
+        except (clause.ClauseError, FileNotFoundError) as e:
+            print(f"⚠ Local scan {key} skipped → {e}")
+    ctx.save()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run local scans over bars/")
+    parser.add_argument("--scan", action="append", help="scan key (repeatable, default: local scans)")
+    parser.add_argument("--all", action="store_true", help="every scan whose clause compiles")
+    parser.add_argument("--full", action="store_true", help="recompute over full history (no saved state)")
+    args = parser.parse_args()
+
+    from chartink import CHARTINK_SCANS
+
+    if args.scan:
+        keys = args.scan
+    elif args.all:
+        keys = [k for k, cfg in CHARTINK_SCANS.items()
+                if k in LOCAL_SCANS or (cfg.get("scan") and clause.supported(cfg["scan"]))]
+    else:
+        keys = [k for k, cfg in CHARTINK_SCANS.items() if cfg.get("engine") == "local"]
+
+    # Terms as written in the clauses vs. distinct terms across the run
+    written = [clause.terms(clause.parse(CHARTINK_SCANS[k]["scan"])) for k in keys
+               if k not in LOCAL_SCANS and clause.supported(CHARTINK_SCANS[k].get("scan") or "")]
+    ctx = Context() if args.full else new_context()
+    start = time.perf_counter()
+    out = run_scans(keys, CHARTINK_SCANS, ctx=ctx)
+    elapsed = time.perf_counter() - start
+    for key, df in out.items():
+        print(f"   {key:<28} {len(df):5d} matches")
+    print(f"⚡ {len(out)} local scans in {elapsed:.2f}s — {sum(map(len, written))} terms in clauses, "
+          f"{len(set().union(*written))} distinct, {ctx.computed} series computed"
+          + (f", {ctx.stepped} bar updates" if isinstance(ctx, IncrementalContext) else ""))
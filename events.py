@@ -0,0 +1,220 @@
+# ===================================================================
+# events.py — screener update events for connected dashboards
+#
+#   record(store, day, screeners) runs after every committed refresh
+#   (chartink.save_screeners, from the web job or scheduler.py) and
+#   appends one event to MAIN_DB (refresh_events):
+#
+#     {"id": 42, "day": "2025_11_28", "changed": ["bms", ...],
+#      "tables": {"bms": [rows as /api/get_table returns them], ...}}
+#
+#   Only screeners whose rows differ from the last save of that day
+#   are listed; a refresh that changes nothing adds no event.
+#
+#   /api/events (app.py) streams them as Server-Sent Events. Each web
+#   worker runs one Hub thread that polls refresh_events while clients
+#   are connected and wakes them all, so N open tabs cost one small
+#   query per second per worker and one message per refresh each:
+#
+#     const es = new EventSource("/api/events");
+#     es.addEventListener("refresh", e => update(JSON.parse(e.data)));
+#
+#   EventSource reconnects with Last-Event-ID, and the events it missed
+#   are replayed from the table. Serve with threaded workers
+#   (gunicorn -k gthread --threads N): each stream holds a thread.
+# ===================================================================
+
+import collections
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import rules
+import storage
+
+KEEP = int(os.getenv("ISMARKET_EVENTS_KEEP", "200"))        # events kept for replay
+POLL = float(os.getenv("ISMARKET_EVENTS_POLL", "1"))         # Hub poll interval (s)
+HEARTBEAT = float(os.getenv("ISMARKET_EVENTS_HEARTBEAT", "15"))
+
+_ready = set()   # MAIN_DB paths whose tables this process has created
+
+
+def _connect():
+    conn = sqlite3.connect(storage.MAIN_DB, timeout=15, isolation_level=None)
+    if storage.MAIN_DB in _ready:
+        return conn
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS refresh_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at REAL NOT NULL,
+            payload TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS screener_digests (
+            screener TEXT PRIMARY KEY,
+            day TEXT NOT NULL,
+            digest TEXT NOT NULL
+        )
+        """
+    )
+    _ready.add(storage.MAIN_DB)
+    return conn
+
+
+def digest(df):
+    """Content hash of a screener table (what gets saved, in order)."""
+    rows = storage.df_to_rows(df)
+    return hashlib.md5(json.dumps(rows, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# ---------------------------------------------------------
+# WRITE (after a refresh commits)
+# ---------------------------------------------------------
+def record(store, day, screeners):
+    """Add an event for the screeners that changed; returns it, or None."""
+    digests = {key: digest(df) for key, df in screeners.items()}
+
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        marks = ", ".join("?" * len(digests))
+        old = {r[0]: r[1:] for r in conn.execute(
+            f"SELECT screener, day, digest FROM screener_digests WHERE screener IN ({marks})",
+            list(digests))}
+        changed = [key for key, d in digests.items() if old.get(key) != (day, d)]
+        if not changed:
+            conn.execute("COMMIT")
+            return None
+
+        # Rows as the dashboards show them (VIEW_RULES, straight from the store)
+        tables, _ = store.read_filtered(day, {key: rules.VIEW_RULES for key in changed})
+        event = {"day": day, "changed": changed,
+                 "tables": {key: tables.get(key, []) for key in changed}}
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO screener_digests (screener, day, digest) VALUES (?, ?, ?)",
+            [(key, day, digests[key]) for key in changed])
+        cur = conn.execute(
+            "INSERT INTO refresh_events (created_at, payload) VALUES (?, ?)",
+            (time.time(), json.dumps(event, ensure_ascii=False, default=str)))
+        event["id"] = cur.lastrowid
+        conn.execute("DELETE FROM refresh_events WHERE id <= ?", (event["id"] - KEEP,))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return event
+
+
+# ---------------------------------------------------------
+# READ
+# ---------------------------------------------------------
+def since(last_id, limit=KEEP):
+    """Events after `last_id` as [(id, payload JSON)], oldest first."""
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT id, payload FROM refresh_events WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit)).fetchall()
+    finally:
+        conn.close()
+
+
+def latest_id():
+    conn = _connect()
+    try:
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM refresh_events").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def sse(event_id, data, name="refresh"):
+    """One Server-Sent Events message (`data` is already JSON)."""
+    return f"id: {event_id}\nevent: {name}\ndata: {data}\n\n"
+
+
+# ---------------------------------------------------------
+# HUB (one poller per process, fanned out to every stream)
+# ---------------------------------------------------------
+class Hub:
+    def __init__(self, poll=POLL):
+        self.poll = poll
+        self.cond = threading.Condition()
+        self.recent = collections.deque(maxlen=KEEP)   # (id, SSE message)
+        self.last_id = None
+        self.listeners = 0
+        self.thread = None
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.listeners:
+                    # Nobody listening: forget the position, the next
+                    # client starts from the latest event, not this one
+                    self.thread = None
+                    self.last_id = None
+                    self.recent.clear()
+                    return
+                last_id = self.last_id
+            try:
+                new = since(last_id)
+            except sqlite3.Error as e:
+                print(f"⚠ Event poll failed → {e}")
+                new = []
+            if new:
+                with self.cond:
+                    self.recent.extend((i, sse(i, payload)) for i, payload in new)
+                    self.last_id = new[-1][0]
+                    self.cond.notify_all()
+            time.sleep(self.poll)
+
+    def _subscribe(self):
+        with self.cond:
+            if self.thread is None:
+                self.last_id = latest_id()
+            self.listeners += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="events-hub", daemon=True)
+                self.thread.start()
+            return self.last_id
+
+    def _unsubscribe(self):
+        with self.cond:
+            self.listeners -= 1
+
+    def stream(self, last_id=None, heartbeat=HEARTBEAT):
+        """
+        SSE text for one client: events after `last_id` (replayed from
+        the table), then each new one as it's committed; a comment line
+        every `heartbeat` seconds keeps proxies from closing the stream.
+        """
+        current = self._subscribe()
+        try:
+            yield f"retry: {int(self.poll * 3000)}\n\n"
+            if last_id is not None and last_id < current:
+                for i, payload in since(last_id):
+                    if i > current:
+                        break
+                    yield sse(i, payload)
+            # A client already past `current` (reconnected to a worker
+            # whose poller is behind) must not get those events twice
+            last_id = current if last_id is None else max(last_id, current)
+
+            while True:
+                with self.cond:
+                    self.cond.wait_for(lambda: self.last_id > last_id, heartbeat)
+                    out = [(i, msg) for i, msg in self.recent if i > last_id]
+                if not out:
+                    yield ": ping\n\n"
+                    continue
+                for i, msg in out:
+                    last_id = i
+                    yield msg
+        finally:
+            self._unsubscribe()
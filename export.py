@@ -0,0 +1,142 @@
+# ===================================================================
+# export.py — bulk export of screener history
+#
+#   python export.py --from 2025-11-01 --to 2025-11-30 --format csv
+#       → export_2025_11_01_2025_11_30.csv.gz
+#
+#   Rows are streamed from the store through generators, so memory
+#   stays flat however long the date range is. NDJSON and CSV are
+#   gzip-compressed on the fly; XLSX is already a zip and is written
+#   with openpyxl's write-only mode.
+# ===================================================================
+
+import argparse
+import csv
+import io
+import json
+import os
+import tempfile
+import zlib
+
+import storage
+
+EXPORT_COLS = ["day", "screener", "symbol", "stock_name", "price", "change", "volume"]
+
+FORMATS = {
+    # format: (mimetype, file extension)
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+# Rows buffered before a chunk is handed on
+CHUNK_ROWS = 1000
+
+
+# ---------------------------------------------------------
+# ENCODERS (row dicts → byte chunks)
+# ---------------------------------------------------------
+def ndjson_chunks(rows):
+    buf = []
+    for row in rows:
+        buf.append(json.dumps(row, ensure_ascii=False))
+        if len(buf) >= CHUNK_ROWS:
+            yield ("\n".join(buf) + "\n").encode("utf-8")
+            buf = []
+    if buf:
+        yield ("\n".join(buf) + "\n").encode("utf-8")
+
+
+def csv_chunks(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_COLS)
+    n = 0
+    for row in rows:
+        writer.writerow([row[c] for c in EXPORT_COLS])
+        n += 1
+        if n % CHUNK_ROWS == 0:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue().encode("utf-8")
+
+
+def xlsx_chunks(rows, chunk_size=64 * 1024):
+    # openpyxl needs a seekable file for the zip; write-only mode keeps
+    # rows on disk, and the finished file is streamed back in chunks.
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("screeners")
+    ws.append(EXPORT_COLS)
+    for row in rows:
+        ws.append([row[c] for c in EXPORT_COLS])
+
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def gzip_chunks(chunks, level=6):
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 → gzip container
+    for chunk in chunks:
+        data = z.compress(chunk)
+        if data:
+            yield data
+    yield z.flush()
+
+
+ENCODERS = {"ndjson": ndjson_chunks, "csv": csv_chunks, "xlsx": xlsx_chunks}
+
+
+def export_chunks(store, fmt, start=None, end=None, screeners=None, compress=True):
+    """Byte chunks of the export; gzip applies to ndjson/csv only."""
+    chunks = ENCODERS[fmt](store.iter_rows(start, end, screeners))
+    if compress and fmt != "xlsx":
+        chunks = gzip_chunks(chunks)
+    return chunks
+
+
+def export_filename(fmt, start=None, end=None, compress=True):
+    name = f"export_{start or 'first'}_{end or 'last'}.{FORMATS[fmt][1]}"
+    return name + ".gz" if compress and fmt != "xlsx" else name
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+def cli_day(value):
+    try:
+        return storage.parse_day(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r} (expected YYYY-MM-DD)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export screener history")
+    parser.add_argument("--from", dest="start", type=cli_day, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=cli_day, help="last day (YYYY-MM-DD)")
+    parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+    parser.add_argument("--screener", default="", help="comma-separated screener keys")
+    parser.add_argument("--no-gzip", action="store_true", help="write ndjson/csv uncompressed")
+    parser.add_argument("--out", help="output file (default: export_<from>_<to>.<ext>)")
+    args = parser.parse_args()
+
+    start, end = args.start, args.end
+    screeners = [s for s in args.screener.split(",") if s] or None
+    compress = not args.no_gzip
+    out_path = args.out or export_filename(args.format, start, end, compress)
+
+    size = 0
+    with open(out_path, "wb") as f:
+        for chunk in export_chunks(storage.get_store(), args.format,
+                                   start, end, screeners, compress):
+            f.write(chunk)
+            size += len(chunk)
+    print(f"📦 Exported → {os.path.abspath(out_path)} ({size / 1024:.1f} KB)")
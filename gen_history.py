@@ -0,0 +1,87 @@
+# ===================================================================
+# gen_history.py — synthetic screener history for load testing
+#
+#   python gen_history.py --days 1000 --end 2025-11-28
+#
+#   Writes N trading days × every screener in CHARTINK_SCANS into the
+#   configured store (ISMARKET_STORAGE etc., same as the app), through
+#   the store's normal save_run path. Prices follow a random walk per
+#   symbol, so per-symbol history and % change look like the real thing;
+#   result sizes vary per screener and day.
+#
+#   ⚠ It writes into whatever store is configured — point the ISMARKET_*
+#     variables at a scratch location first.
+# ===================================================================
+
+import argparse
+import datetime
+import random
+import time
+
+import pandas as pd
+
+import chartink
+import storage
+
+# Median result size per screener; the actual size varies day to day
+MEDIAN_ROWS = 40
+
+
+def trading_days(end, n):
+    """`n` weekdays ending at `end` (a date), oldest first."""
+    days, d = [], end
+    while len(days) < n:
+        if d.weekday() < 5:
+            days.append(d)
+        d -= datetime.timedelta(days=1)
+    return days[::-1]
+
+
+def generate(store, days=250, end=None, symbols=2000, seed=1, keys=None):
+    """Write the synthetic history; returns the number of rows written."""
+    rnd = random.Random(seed)
+    keys = list(keys or chartink.CHARTINK_SCANS)
+    end = end or datetime.date.today()
+
+    universe = [(f"SYM{i:04d}", f"Synthetic Stock {i:04d}") for i in range(symbols)]
+    prices = [rnd.uniform(5, 3000) for _ in universe]
+
+    total = 0
+    start = time.perf_counter()
+    for n, date in enumerate(trading_days(end, days), start=1):
+        changes = [rnd.gauss(0.2, 2.5) for _ in universe]
+        prices = [max(p * (1 + c / 100), 1.0) for p, c in zip(prices, changes)]
+
+        screeners = {}
+        for key in keys:
+            size = min(int(rnd.lognormvariate(0, 0.8) * MEDIAN_ROWS), symbols)
+            picks = rnd.sample(range(symbols), size)
+            screeners[key] = pd.DataFrame(
+                [{"stock_name": universe[i][1],
+                  "price": round(prices[i], 2),
+                  "change": round(changes[i], 2),
+                  "volume": int(rnd.lognormvariate(11, 1.5)),
+                  "symbol": universe[i][0]} for i in picks],
+                columns=chartink.FINAL_COLS,
+            )
+            total += size
+
+        store.save_run(date.strftime("%Y_%m_%d"), screeners)
+        if n % 50 == 0:
+            print(f"🧬 {n}/{days} days, {total} rows, {time.perf_counter() - start:.1f}s")
+
+    print(f"✅ Generated {days} days × {len(keys)} screeners, {total} rows → {store.name} store")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic screener history")
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--end", help="last day (YYYY-MM-DD, default today)")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=list(storage.BACKENDS), default=None)
+    args = parser.parse_args()
+
+    end = datetime.date.fromisoformat(args.end) if args.end else None
+    generate(storage.get_store(args.backend), args.days, end, args.symbols, args.seed)
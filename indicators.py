@@ -0,0 +1,306 @@
+# ===================================================================
+# indicators.py — vectorized technical indicators
+#
+#   Every function takes 2-D float arrays shaped (symbols, bars),
+#   oldest bar first, and returns the same shape. Values are NaN until
+#   a symbol has enough bars (NaN padding on the left is expected).
+#   Recursive indicators (EMA, RSI, PSAR) loop over bars but work on
+#   every symbol at once, so the cost is O(bars) numpy steps.
+#
+#   The *State classes at the bottom compute the same values one bar
+#   at a time, for engine.IncrementalContext.
+# ===================================================================
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def shift(x, n=1):
+    """Value `n` bars ago ("1 day ago close")."""
+    if n == 0:
+        return x
+    out = np.full_like(x, np.nan)
+    out[:, n:] = x[:, :-n]
+    return out
+
+
+def sma(x, n):
+    valid = ~np.isnan(x)
+    total = np.cumsum(np.where(valid, x, 0.0), axis=1)
+    count = np.cumsum(valid, axis=1)
+    total[:, n:] = total[:, n:] - total[:, :-n]
+    count[:, n:] = count[:, n:] - count[:, :-n]
+    out = total / n
+    out[count < n] = np.nan
+    return out
+
+
+def _smooth(x, n, alpha):
+    """EMA-style recursion seeded with the SMA of the first n values."""
+    seed = sma(x, n)
+    out = np.full_like(x, np.nan)
+    prev = out[:, 0]
+    for t in range(x.shape[1]):
+        cur = alpha * x[:, t] + (1 - alpha) * prev
+        prev = np.where(np.isnan(prev), seed[:, t], cur)
+        out[:, t] = prev
+    return out
+
+
+def ema(x, n):
+    return _smooth(x, n, 2.0 / (n + 1))
+
+
+def wilder(x, n):
+    return _smooth(x, n, 1.0 / n)
+
+
+def rsi(close, n=14):
+    diff = close - shift(close, 1)
+    gain = wilder(np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), n)
+    loss = wilder(np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0)), n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100 - 100 / (1 + gain / loss)
+    out[(loss == 0) & ~np.isnan(gain)] = 100.0
+    return out
+
+
+def macd_line(close, slow=26, fast=12):
+    return ema(close, fast) - ema(close, slow)
+
+
+def macd_signal(close, slow=26, fast=12, signal=9):
+    return ema(macd_line(close, slow, fast), signal)
+
+
+def macd_hist(close, slow=26, fast=12, signal=9):
+    """Chartink's argument order: macd histogram( slow, fast, signal )."""
+    line = macd_line(close, slow, fast)
+    return line - ema(line, signal)
+
+
+def rolling_max(x, n):
+    out = np.full_like(x, np.nan)
+    if x.shape[1] >= n:
+        out[:, n - 1:] = sliding_window_view(x, n, axis=1).max(axis=-1)
+    return out
+
+
+def rolling_min(x, n):
+    out = np.full_like(x, np.nan)
+    if x.shape[1] >= n:
+        out[:, n - 1:] = sliding_window_view(x, n, axis=1).min(axis=-1)
+    return out
+
+
+def psar(high, low, step=0.02, start=0.02, maximum=0.2):
+    """
+    Parabolic SAR. Chartink writes it as parabolic sar( step, start, max );
+    the acceleration factor begins at `start`, grows by `step` on each
+    new extreme and is capped at `maximum`.
+    """
+    n_sym, n_bars = high.shape
+    out = np.full_like(high, np.nan)
+    sar = np.full(n_sym, np.nan)
+    ep = np.full(n_sym, np.nan)
+    af = np.full(n_sym, start)
+    up = np.ones(n_sym, dtype=bool)
+    prev_h = np.full(n_sym, np.nan)
+    prev_l = np.full(n_sym, np.nan)
+
+    for t in range(n_bars):
+        h, l = high[:, t], low[:, t]
+        have = ~np.isnan(h) & ~np.isnan(l)
+
+        # First bar with a previous bar: start long at the prior low
+        fresh = have & np.isnan(sar) & ~np.isnan(prev_h)
+        sar = np.where(fresh, prev_l, sar)
+        ep = np.where(fresh, np.maximum(h, prev_h), ep)
+        af = np.where(fresh, start, af)
+        up = np.where(fresh, True, up)
+
+        run = have & ~np.isnan(sar) & ~fresh
+        nxt = sar + af * (ep - sar)
+        # SAR may not move inside the previous bar's range
+        nxt = np.where(up, np.minimum(nxt, prev_l), np.maximum(nxt, prev_h))
+
+        flip = run & np.where(up, l < nxt, h > nxt)
+        cont = run & ~flip
+
+        new_ep = np.where(up, np.maximum(ep, h), np.minimum(ep, l))
+        grew = cont & (new_ep != ep)
+        af = np.where(grew, np.minimum(af + step, maximum), af)
+        ep = np.where(cont, new_ep, ep)
+        sar = np.where(cont, nxt, sar)
+
+        # Reversal: SAR jumps to the old extreme, AF resets
+        sar = np.where(flip, ep, sar)
+        ep = np.where(flip, np.where(up, l, h), ep)
+        af = np.where(flip, start, af)
+        up = np.where(flip, ~up, up)
+
+        out[:, t] = np.where(have & ~fresh, sar, np.nan)
+        prev_h = np.where(have, h, prev_h)
+        prev_l = np.where(have, l, prev_l)
+    return out
+
+
+# ---------------------------------------------------------
+# INCREMENTAL STATE
+#   The same indicators one bar at a time: update(x) takes the new
+#   bar's values (one per symbol) and returns the indicator on that bar,
+#   in O(1) per symbol. Fed a whole history, the outputs equal the batch
+#   functions above. States are plain numpy arrays, so they pickle.
+# ---------------------------------------------------------
+class SMAState:
+    """Ring buffer of the last n values plus a running sum / valid count."""
+
+    def __init__(self, n_sym, n):
+        self.n = n
+        self.buf = np.full((n_sym, n), np.nan)
+        self.pos = 0
+        self.total = np.zeros(n_sym)
+        self.count = np.zeros(n_sym, dtype=np.int64)
+
+    def update(self, x):
+        old = self.buf[:, self.pos]
+        gone, new = ~np.isnan(old), ~np.isnan(x)
+        self.total -= np.where(gone, old, 0.0)
+        self.total += np.where(new, x, 0.0)
+        self.count += new.astype(np.int64) - gone
+        self.buf[:, self.pos] = x
+        self.pos = (self.pos + 1) % self.n
+        return np.where(self.count < self.n, np.nan, self.total / self.n)
+
+
+class SmoothState:
+    """EMA-style recursion seeded with the SMA of the first n values (as _smooth)."""
+
+    def __init__(self, n_sym, n, alpha):
+        self.alpha = alpha
+        self.seed = SMAState(n_sym, n)
+        self.prev = np.full(n_sym, np.nan)
+
+    def update(self, x):
+        seed = self.seed.update(x)
+        cur = self.alpha * x + (1 - self.alpha) * self.prev
+        self.prev = np.where(np.isnan(self.prev), seed, cur)
+        return self.prev
+
+
+def EMAState(n_sym, n):
+    return SmoothState(n_sym, n, 2.0 / (n + 1))
+
+
+def WilderState(n_sym, n):
+    return SmoothState(n_sym, n, 1.0 / n)
+
+
+class RSIState:
+    def __init__(self, n_sym, n=14):
+        self.prev_close = np.full(n_sym, np.nan)
+        self.gain = WilderState(n_sym, n)
+        self.loss = WilderState(n_sym, n)
+
+    def update(self, close):
+        diff = close - self.prev_close
+        self.prev_close = close
+        missing = np.isnan(diff)
+        gain = self.gain.update(np.where(diff > 0, diff, np.where(missing, np.nan, 0.0)))
+        loss = self.loss.update(np.where(diff < 0, -diff, np.where(missing, np.nan, 0.0)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = 100 - 100 / (1 + gain / loss)
+        return np.where((loss == 0) & ~np.isnan(gain), 100.0, out)
+
+
+class MACDState:
+    """part = "line", "signal" or "hist"."""
+
+    def __init__(self, n_sym, slow=26, fast=12, signal=9, part="hist"):
+        self.part = part
+        self.fast = EMAState(n_sym, fast)
+        self.slow = EMAState(n_sym, slow)
+        self.signal = EMAState(n_sym, signal)
+
+    def update(self, close):
+        line = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(line)
+        return {"line": line, "signal": signal, "hist": line - signal}[self.part]
+
+
+class ExtremeState:
+    """
+    Rolling max / min over n bars. The current extreme is kept per
+    symbol and only rescanned when it drops out of the window, so an
+    update is O(1) amortized. NaN while the window holds any NaN (as
+    rolling_max / rolling_min).
+    """
+
+    def __init__(self, n_sym, n, kind="max"):
+        self.n = n
+        self.sign = 1.0 if kind == "max" else -1.0
+        self.buf = np.full((n_sym, n), np.nan)   # values × sign, so max works for both
+        self.pos = 0
+        self.nans = np.full(n_sym, n, dtype=np.int64)
+        self.best = np.full(n_sym, -np.inf)
+
+    def update(self, x):
+        x = x * self.sign
+        old = self.buf[:, self.pos].copy()
+        self.buf[:, self.pos] = x
+        self.pos = (self.pos + 1) % self.n
+        self.nans += np.isnan(x).astype(np.int64) - np.isnan(old)
+
+        stale = (old == self.best) & ~(x >= old)
+        self.best = np.fmax(self.best, x)
+        if stale.any():
+            rows = self.buf[stale]
+            self.best[stale] = np.where(np.isnan(rows), -np.inf, rows).max(axis=1)
+        return np.where(self.nans > 0, np.nan, self.best * self.sign)
+
+
+class PSARState:
+    """Parabolic SAR one bar at a time (same rules as psar())."""
+
+    def __init__(self, n_sym, step=0.02, start=0.02, maximum=0.2):
+        self.step, self.start, self.maximum = step, start, maximum
+        self.sar = np.full(n_sym, np.nan)
+        self.ep = np.full(n_sym, np.nan)
+        self.af = np.full(n_sym, start)
+        self.up = np.ones(n_sym, dtype=bool)
+        self.prev_h = np.full(n_sym, np.nan)
+        self.prev_l = np.full(n_sym, np.nan)
+
+    def update(self, h, l):
+        start, sar, ep, af, up = self.start, self.sar, self.ep, self.af, self.up
+        prev_h, prev_l = self.prev_h, self.prev_l
+        have = ~np.isnan(h) & ~np.isnan(l)
+
+        fresh = have & np.isnan(sar) & ~np.isnan(prev_h)
+        sar = np.where(fresh, prev_l, sar)
+        ep = np.where(fresh, np.maximum(h, prev_h), ep)
+        af = np.where(fresh, start, af)
+        up = np.where(fresh, True, up)
+
+        run = have & ~np.isnan(sar) & ~fresh
+        nxt = sar + af * (ep - sar)
+        nxt = np.where(up, np.minimum(nxt, prev_l), np.maximum(nxt, prev_h))
+
+        flip = run & np.where(up, l < nxt, h > nxt)
+        cont = run & ~flip
+
+        new_ep = np.where(up, np.maximum(ep, h), np.minimum(ep, l))
+        grew = cont & (new_ep != ep)
+        af = np.where(grew, np.minimum(af + self.step, self.maximum), af)
+        ep = np.where(cont, new_ep, ep)
+        sar = np.where(cont, nxt, sar)
+
+        sar = np.where(flip, ep, sar)
+        ep = np.where(flip, np.where(up, l, h), ep)
+        af = np.where(flip, start, af)
+        up = np.where(flip, ~up, up)
+
+        self.sar, self.ep, self.af, self.up = sar, ep, af, up
+        self.prev_h = np.where(have, h, prev_h)
+        self.prev_l = np.where(have, l, prev_l)
+        return np.where(have & ~fresh, sar, np.nan)
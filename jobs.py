@@ -0,0 +1,195 @@
+# ===================================================================
+# jobs.py — background refresh jobs for the web app
+#
+#   - /api/update_live starts update_all() on a worker thread and
+#     returns a job id straight away
+#   - job rows live in MAIN_DB (refresh_jobs) so every gunicorn
+#     worker sees the same state
+#   - single-flight: while a refresh is running, new triggers get
+#     the running job back instead of starting another scrape
+# ===================================================================
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+import chartink
+
+# A "running" job that has not reported progress for this long is taken
+# to be dead (its process was killed) and no longer blocks new refreshes.
+STALE_AFTER = 30 * 60
+
+# Attempts at a job's final status write (1, 2, 4, ... s apart) before it
+# is left pending and retried on the next call into this module
+FINISH_RETRIES = 5
+
+_lock = threading.Lock()
+_pending = {}   # job id → final fields not yet written to MAIN_DB
+
+
+def _connect():
+    conn = sqlite3.connect(chartink.MAIN_DB, timeout=15, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS refresh_jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL,
+            progress TEXT,
+            error TEXT
+        )
+        """
+    )
+    return conn
+
+
+def _job_dict(row):
+    job = dict(row)
+    job["progress"] = json.loads(job["progress"] or "{}")
+    counts = {}
+    for state in job["progress"].values():
+        counts[state] = counts.get(state, 0) + 1
+    job["counts"] = counts
+    return job
+
+
+def _update(job_id, **fields):
+    fields["updated_at"] = time.time()
+    if "progress" in fields:
+        fields["progress"] = json.dumps(fields["progress"])
+    cols = ", ".join(f"{k} = ?" for k in fields)
+    conn = _connect()
+    try:
+        conn.execute(f"UPDATE refresh_jobs SET {cols} WHERE id = ?",
+                     (*fields.values(), job_id))
+    finally:
+        conn.close()
+
+
+def _finish(job_id, **fields):
+    """
+    Write a job's final status. A job left "running" blocks every new
+    refresh until STALE_AFTER, so a failed write is retried, and if
+    MAIN_DB stays unavailable it is kept and retried by later calls.
+    """
+    _pending[job_id] = fields
+    for attempt in range(FINISH_RETRIES):
+        if _flush_pending():
+            return
+        time.sleep(2 ** attempt)
+    print(f"❌ Refresh job {job_id} status not saved yet; retried on the next request")
+
+
+def _flush_pending():
+    """Write final statuses still pending → True if none are left."""
+    for job_id, fields in list(_pending.items()):
+        try:
+            _update(job_id, **fields)
+        except Exception as e:
+            print(f"⚠ Refresh job {job_id} status not saved → {e}")
+            return False
+        _pending.pop(job_id, None)
+    return True
+
+
+# ---------------------------------------------------------
+# Public API
+# ---------------------------------------------------------
+def get_job(job_id):
+    _flush_pending()
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM refresh_jobs WHERE id = ?",
+                           (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _job_dict(row) if row else None
+
+
+def latest_job():
+    _flush_pending()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT * FROM refresh_jobs ORDER BY created_at DESC LIMIT 1"
+        ).fetchone()
+    finally:
+        conn.close()
+    return _job_dict(row) if row else None
+
+
+def start_refresh():
+    """
+    Start a background refresh, or attach to the one already running.
+
+    Returns (job, started) — `started` is False when an existing job
+    was returned.
+    """
+    _flush_pending()
+    now = time.time()
+    conn = _connect()
+    try:
+        # IMMEDIATE takes the write lock, so two workers can't both
+        # see "nothing running" and start a scrape each.
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE refresh_jobs SET status = 'error', error = 'abandoned', "
+            "finished_at = ? WHERE status = 'running' AND updated_at < ?",
+            (now, now - STALE_AFTER),
+        )
+        row = conn.execute(
+            "SELECT * FROM refresh_jobs WHERE status = 'running' "
+            "ORDER BY created_at DESC LIMIT 1"
+        ).fetchone()
+        if row:
+            conn.execute("COMMIT")
+            return _job_dict(row), False
+
+        job_id = uuid.uuid4().hex[:12]
+        progress = {key: "pending" for key in chartink.CHARTINK_SCANS}
+        conn.execute(
+            "INSERT INTO refresh_jobs (id, status, created_at, updated_at, progress) "
+            "VALUES (?, 'running', ?, ?, ?)",
+            (job_id, now, now, json.dumps(progress)),
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    threading.Thread(target=_run, args=(job_id, progress),
+                     name=f"refresh-{job_id}", daemon=True).start()
+    return get_job(job_id), True
+
+
+def _run(job_id, progress):
+    finished = threading.Event()
+
+    def on_progress(key, state):
+        # A scan abandoned at the deadline may still report in later
+        if finished.is_set():
+            return
+        with _lock:
+            progress[key] = state
+            # Runs inside the fetch workers: a failed progress write
+            # (e.g. MAIN_DB locked) must not abort the refresh
+            try:
+                _update(job_id, progress=progress)
+            except Exception as e:
+                print(f"⚠ Refresh job {job_id} progress not saved → {e}")
+
+    try:
+        chartink.update_all(on_progress=on_progress)
+    except Exception as e:
+        finished.set()
+        print(f"❌ Refresh job {job_id} failed → {e}")
+        _finish(job_id, status="error", error=str(e), finished_at=time.time())
+        return
+
+    finished.set()
+    _finish(job_id, status="done", finished_at=time.time())
+    print(f"✅ Refresh job {job_id} done")
@@ -0,0 +1,167 @@
+# ===================================================================
+# metrics.py — in-process counters / histograms, Prometheus text format
+#
+#   with metrics.timer(metrics.CHARTINK_STAGE, stage="post"): ...
+#   metrics.inc(metrics.FALLBACKS, screener="bms", reason="error")
+#   metrics.render()   → served on /metrics by app.py
+#
+#   A dict update under one lock per observation; no dependencies.
+#   Each process keeps its own numbers (one set per gunicorn worker,
+#   scheduler.py's refreshes are not included).
+# ===================================================================
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds, and bytes for response sizes
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_lock = threading.Lock()
+_meta = {}        # name → (type, help, buckets)
+_counters = {}    # (name, labels) → value
+_histograms = {}  # (name, labels) → [per-bucket counts..., +Inf count, sum]
+_gauges = {}      # name → fn() read at scrape time
+
+
+def counter(name, help_text):
+    _meta[name] = ("counter", help_text, None)
+    return name
+
+
+def histogram(name, help_text, buckets=TIME_BUCKETS):
+    _meta[name] = ("histogram", help_text, tuple(buckets))
+    return name
+
+
+def gauge(name, help_text, fn, kind="gauge"):
+    """
+    A value read at scrape time: `fn` returns a number, or
+    {(("label", "value"), ...): number}. kind="counter" for running totals
+    kept elsewhere (e.g. cache hit counts).
+    """
+    _meta[name] = (kind, help_text, None)
+    _gauges[name] = fn
+    return name
+
+
+# ---------------------------------------------------------
+# METRICS
+# ---------------------------------------------------------
+CHARTINK_STAGE = histogram(
+    "ismarket_chartink_stage_seconds",
+    "Time in each stage of a Chartink fetch (csrf_get, csrf_parse, post, json, dataframe)")
+CHARTINK_SCAN = histogram(
+    "ismarket_chartink_scan_seconds", "Total fetch time per screener")
+CSRF_FETCHES = counter(
+    "ismarket_chartink_csrf_fetches_total", "Screener page loads for a csrf-token")
+CSRF_REJECTED = counter(
+    "ismarket_chartink_csrf_rejected_total", "POSTs answered 403/419 (token refreshed)")
+FALLBACKS = counter(
+    "ismarket_chartink_fallbacks_total", "Scans that produced an N/A table, by reason")
+STORAGE_OP = histogram(
+    "ismarket_storage_seconds", "Time in store writes (write_day, register, index_symbols, save_rows)")
+RENDER = histogram(
+    "ismarket_render_seconds", "Time to pre-render the report files after a refresh (report.py)")
+HTTP_REQUEST = histogram(
+    "ismarket_http_request_seconds", "Flask request handling time (streamed bodies excluded)")
+HTTP_RESPONSE_BYTES = histogram(
+    "ismarket_http_response_bytes", "Flask response body size", SIZE_BUCKETS)
+
+
+# ---------------------------------------------------------
+# RECORDING
+# ---------------------------------------------------------
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    buckets = _meta[name][2]
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(buckets) + 2)
+        h[bisect.bisect_left(buckets, value)] += 1  # index len(buckets) = +Inf
+        h[-1] += value
+
+
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# ---------------------------------------------------------
+# PROMETHEUS TEXT FORMAT
+# ---------------------------------------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+
+    lines = []
+    for name, (kind, help_text, buckets) in _meta.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+        if name in _gauges:
+            try:
+                value = _gauges[name]()
+            except Exception:
+                continue
+            values = value if isinstance(value, dict) else {(): value}
+            for pairs, v in sorted(values.items()):
+                lines.append(f"{name}{_labels(pairs)} {_num(v)}")
+
+        elif kind == "counter":
+            for (n, pairs), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(pairs)} {_num(value)}")
+
+        elif kind == "histogram":
+            for (n, pairs), h in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, h):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(pairs + (('le', bound),))} {cumulative}")
+                cumulative += h[len(buckets)]
+                lines.append(f"{name}_bucket{_labels(pairs + (('le', '+Inf'),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(pairs)} {_num(h[-1])}")
+                lines.append(f"{name}_count{_labels(pairs)} {cumulative}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,153 @@
+# ===================================================================
+# patterns.py — vectorized candlestick patterns
+#
+#   cd = Candles(open, high, low, close, volume)   # (symbols, bars) arrays
+#   mask = tweezer_bottom(cd, rsi)                  # bool, same shape
+#
+#   Every pattern is a handful of shifted-array comparisons, so it is
+#   found on every bar of every symbol at once. The rules follow the
+#   descriptions in app.FORMULAS; the thresholds below are the
+#   "large", "small", "≈" in those descriptions. NaN bars never match.
+# ===================================================================
+
+import numpy as np
+
+import indicators as ind
+
+DOJI_BODY = 0.1        # doji: body ≤ 10% of the candle's range
+SMALL_SHADOW = 0.1     # "almost no" shadow: ≤ 10% of range
+LONG_SHADOW = 0.6      # long shadow: ≥ 60% of range
+STRONG_BODY = 0.6      # "strong" candle: body ≥ 60% of range
+LARGE_BODY = 1.2       # "large" candle: body ≥ 1.2 × average of the 5 before it
+NEAR_LOW = 0.25        # "closing near low": close in the bottom 25% of range
+TWEEZER_TOL = 0.001    # "same low": within 0.1%
+TREND_BARS = 4         # short-term trend: close vs. close 4 bars earlier
+
+# Bars a pattern looks back (callers may pass just the last WINDOW bars)
+WINDOW = 10
+
+
+class Candles:
+    """OHLCV arrays plus the candle parts the patterns are written in."""
+
+    def __init__(self, open, high, low, close, volume):
+        self.open, self.high, self.low, self.close, self.volume = open, high, low, close, volume
+        self.body = np.abs(close - open)
+        self.top = np.maximum(open, close)
+        self.bottom = np.minimum(open, close)
+        self.range = high - low
+        self.green = close > open
+        self.red = close < open
+
+    @staticmethod
+    def ago(x, n=1):
+        """`x` shifted n bars (False / NaN where there is no earlier bar)."""
+        if x.dtype == bool:
+            out = np.zeros_like(x)
+            out[:, n:] = x[:, :-n]
+            return out
+        return ind.shift(x, n)
+
+    def avg_body(self, n=5, ago=1):
+        """Average body of the n candles ending `ago` bars back."""
+        return ind.sma(self.ago(self.body, ago), n)
+
+    def trend(self, ago=1, bars=TREND_BARS):
+        """Close `ago` bars back minus close `bars` bars before that (>0 = up)."""
+        return self.ago(self.close, ago) - self.ago(self.close, ago + bars)
+
+
+# ---------------------------------------------------------
+# PATTERNS: → bool (symbols, bars), True on the pattern's last candle
+# ---------------------------------------------------------
+def bearish_engulfing(cd, rsi, down_bars=8):
+    """Red candle engulfing the previous green body after `down_bars` down; RSI > 55."""
+    ago = cd.ago
+    return (cd.red & ago(cd.green)
+            & (cd.open >= ago(cd.close)) & (cd.close <= ago(cd.open))
+            & (cd.trend(1, down_bars) < 0)
+            & (rsi > 55))
+
+
+def tweezer_bottom(cd, rsi):
+    """Red then green candle with the same low; RSI < 40."""
+    ago = cd.ago
+    prev_low = ago(cd.low)
+    return (ago(cd.red) & cd.green
+            & (np.abs(cd.low - prev_low) <= TWEEZER_TOL * prev_low)
+            & (rsi < 40))
+
+
+def bullish_harami(cd, rsi):
+    """Small green body inside a large red one; RSI rising above 40."""
+    ago = cd.ago
+    return (ago(cd.red) & (ago(cd.body) >= LARGE_BODY * cd.avg_body(5, 2))
+            & cd.green
+            & (cd.top <= ago(cd.open)) & (cd.bottom >= ago(cd.close))
+            & (cd.body <= 0.5 * ago(cd.body))
+            & (rsi > 40) & (rsi > ago(rsi)))
+
+
+def dragonfly_doji(cd, rsi=None):
+    """Open ≈ close at the top of a long lower shadow, after a down move."""
+    return ((cd.range > 0)
+            & (cd.body <= DOJI_BODY * cd.range)
+            & (cd.high - cd.top <= SMALL_SHADOW * cd.range)
+            & (cd.bottom - cd.low >= LONG_SHADOW * cd.range)
+            & (cd.trend() < 0))
+
+
+def bearish_kicker(cd, rsi):
+    """Strong red candle opening below the previous green close; prior RSI > 60."""
+    ago = cd.ago
+    return (ago(cd.green)
+            & (cd.open < ago(cd.close))
+            & cd.red & (cd.body >= STRONG_BODY * cd.range)
+            & (ago(rsi) > 60))
+
+
+def morning_star(cd, rsi=None):
+    """
+    Long red candle closing near its low, a small gapped-down body, then
+    a green candle closing above the middle of the first body — after a
+    down move.
+    """
+    ago = cd.ago
+    o1, c1, l1, r1 = ago(cd.open, 2), ago(cd.close, 2), ago(cd.low, 2), ago(cd.range, 2)
+    body1 = ago(cd.body, 2)
+    return (ago(cd.red, 2) & (body1 >= LARGE_BODY * cd.avg_body(5, 3))
+            & (c1 - l1 <= NEAR_LOW * r1)
+            & (ago(cd.body) <= 0.3 * body1) & (ago(cd.top) < c1)
+            & cd.green & (cd.close >= (o1 + c1) / 2)
+            & (cd.trend(3) < 0))
+
+
+def bearish_engulfing_strong(cd, rsi):
+    """
+    Large red body engulfing the previous green body after a short
+    up-move; body > 1.5 × the last 5 candles' average; RSI > 55.
+    """
+    ago = cd.ago
+    return (ago(cd.green) & (cd.trend() > 0)
+            & cd.red & (cd.open >= ago(cd.close)) & (cd.close <= ago(cd.open))
+            & (cd.body > 1.5 * cd.avg_body(5, 1))
+            & (rsi > 55))
+
+
+def first_candle_breakout(cd, times, volume_bars=5):
+    """
+    Price beyond the high or low of the day's first candle (either side),
+    on volume above its `volume_bars`-bar average. `times` are the bar
+    timestamps ("YYYY-MM-DD HH:MM"); needs the whole day's bars.
+    """
+    n = len(times)
+    day = np.asarray(times).astype("U10")
+    first = np.ones(n, dtype=bool)
+    first[1:] = day[1:] != day[:-1]
+    # Index of each bar's first candle of the day
+    opening = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+
+    high, low = cd.high[:, opening], cd.low[:, opening]
+    return (~first
+            & ((cd.close > high) | (cd.close < low))
+            & (cd.volume > ind.sma(cd.volume, volume_bars)))
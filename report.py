@@ -0,0 +1,192 @@
+# ===================================================================
+# report.py — Technical Analysis Report, pre-rendered at refresh time
+#
+#   publish(store, day) runs after every committed refresh
+#   (chartink.save_screeners) and writes, each to a temp file renamed
+#   into place:
+#
+#     reports/today-report.json      /api/today-report body (+ "day")
+#     reports/today-report.html      the report HTML alone
+#     reports/report_<YYYY-MM-DD>.json   sections → rows, for index.php
+#
+#   app.py serves today-report.json as-is while it matches the latest
+#   day and today's date, so a request does no store reads; index.php
+#   picks the newest report_*.json.
+# ===================================================================
+
+import datetime
+import json
+import os
+import tempfile
+
+import rules
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+REPORTS_DIR = os.getenv("ISMARKET_REPORTS_DIR", os.path.join(BASE_DIR, "reports"))
+
+TODAY_JSON = "today-report.json"
+TODAY_HTML = "today-report.html"
+
+# Sections included in the report (you can add more later)
+SECTIONS = [
+    ("bms", "Best Multibagger Stocks"),
+    ("lowest_pe", "Top stocks with the lowest Price Earning Ratios(PE)"),
+    ("bullish_script", "Bullish Script"),
+    ("profit_jump", "Profit jump by 200%"),
+    ("sales_jump", "Sales jump by 200%"),
+    ("below_book_value", "Stocks below Book value - Undervalued"),
+    ("buy_entry_intraday", "Buy entry intraday"),
+]
+
+# Fixed column order (same as your screenshot)
+COLUMNS = ["stock_name", "price", "change", "volume", "symbol"]
+
+# index.php column labels
+PHP_COLUMNS = {"stock_name": "Stock Name", "price": "Price", "change": "%Chg",
+               "volume": "Volume", "symbol": "Symbol"}
+
+
+# ---------------------------------------------------------
+# FORMAT DATE (Indian style)
+# ---------------------------------------------------------
+def format_indian_date(today=None):
+    today = today or datetime.date.today()
+    day = today.day
+
+    if day in [1, 21, 31]:
+        suffix = "st"
+    elif day in [2, 22]:
+        suffix = "nd"
+    elif day in [3, 23]:
+        suffix = "rd"
+    else:
+        suffix = "th"
+
+    formatted_day = f"{day}{suffix}"
+    month = today.strftime("%B")
+    year = today.year
+
+    return f"{formatted_day} {month} {year}"
+
+
+def report_title(today_str):
+    return f"Technical Analysis Report — {today_str}"
+
+
+# ---------------------------------------------------------
+# TABLE → HTML Generator
+# ---------------------------------------------------------
+_TH = "<th style='border:1px solid #000; padding:6px;'>{}</th>"
+_TD = "<td style='border:1px solid #000; padding:6px;'>{}</td>"
+_HEADER = "<tr>" + "".join(_TH.format(col) for col in COLUMNS) + "</tr>"
+
+
+def table_to_html(rows, title):
+    """
+    Convert rows into an HTML table for the report.
+
+    Even if there is no data, we still show a table
+    with fixed columns:
+    stock_name | price | change | volume | symbol
+    """
+    parts = [f"<h3>{title}</h3>",
+             "<table style='width:100%; border-collapse:collapse; background:#d7ecff;'>",
+             _HEADER]
+    for row in rows or []:
+        parts.append("<tr>" + "".join(_TD.format(row.get(col, "")) for col in COLUMNS) + "</tr>")
+    parts.append("</table><br>")
+    return "".join(parts)
+
+
+# ---------------------------------------------------------
+# BUILD
+# ---------------------------------------------------------
+def read_sections(store, day):
+    """Report conditions + top 5 run inside the store query (see rules.py)."""
+    tables, _ = store.read_filtered(day, {key: rules.rules_for(key) for key, _ in SECTIONS})
+    return tables
+
+
+def build_today_report(tables, today_str):
+    """{key: rows} → the /api/today-report payload."""
+    full_html = f"""
+        <h2>{report_title(today_str)}</h2>
+        <p>This report is automatically generated from Chartink screeners.</p>
+        <br>
+    """ + "".join(table_to_html(tables.get(key, []), f"{i}.) {title}")
+                  for i, (key, title) in enumerate(SECTIONS, start=1))
+
+    return {
+        "title": report_title(today_str),
+        "summary": f"Technical analysis report as on {today_str}.",
+        "content": full_html
+    }
+
+
+def php_report(tables):
+    """{key: rows} → {section title: [{"Stock Name": ..., ...}]} (index.php format)."""
+    return {
+        title: [{label: row.get(col, "") for col, label in PHP_COLUMNS.items()}
+                for row in tables.get(key, [])]
+        for key, title in SECTIONS
+    }
+
+
+# ---------------------------------------------------------
+# PUBLISH (temp file + rename, so readers see old or new, never half)
+# ---------------------------------------------------------
+def write_atomic(path, data):
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp makes it 0600; the PHP front end must read it
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def publish(store, day, folder=None, today=None):
+    """Render the report for `day` (YYYY_MM_DD) and write the report files."""
+    folder = folder or REPORTS_DIR
+    tables = read_sections(store, day)
+
+    payload = build_today_report(tables, format_indian_date(today))
+    payload["day"] = day
+    write_atomic(os.path.join(folder, TODAY_HTML), payload["content"].encode("utf-8"))
+    write_atomic(os.path.join(folder, TODAY_JSON),
+                 json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+    name = f"report_{day.replace('_', '-')}.json"
+    write_atomic(os.path.join(folder, name),
+                 json.dumps(php_report(tables), ensure_ascii=False, indent=2).encode("utf-8"))
+    return payload
+
+
+_published = {}
+
+
+def published(folder=None):
+    """
+    The published today-report as {"payload", "raw", "mtime"}, or None.
+    Re-read only when the file's mtime changes, so serving it costs a stat().
+    """
+    global _published
+    path = os.path.join(folder or REPORTS_DIR, TODAY_JSON)
+    cached = _published   # one snapshot; other threads only ever rebind it
+    try:
+        mtime = os.stat(path).st_mtime
+        if cached.get("path") != path or cached.get("mtime") != mtime:
+            with open(path, "rb") as f:
+                raw = f.read()
+            cached = {"path": path, "mtime": mtime, "raw": raw, "payload": json.loads(raw)}
+            _published = cached
+    except (OSError, ValueError):
+        return None
+    return cached
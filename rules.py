@@ -0,0 +1,130 @@
+# ===================================================================
+# rules.py — business rules for picking stocks out of a screener
+#
+#   One declarative rule set, applied inside the store:
+#     - sql_filter()    → WHERE / ORDER BY / LIMIT pushed into the query
+#     - sort_rows()     → the ORDER BY on rows merged from several queries
+#
+#   Scans are stored in full; rules only ever run at read time, so any
+#   rule set can be replayed over past days.
+# ===================================================================
+
+# Technical Analysis Report:
+#   1) only top 5 stocks (by % change, highest first)
+#   2) skip if % change < 2
+#   3) skip if volume < 2000
+#   4) skip if price < 5
+#   5) skip dummy 'N/A' rows
+REPORT_RULES = {
+    "min_change": 2,
+    "min_volume": 2000,
+    "min_price": 5,
+    "skip_na": True,
+    "order_by": "change",
+    "limit": 5,
+}
+
+# Per-screener overrides on top of REPORT_RULES, e.g.
+#   "buy_entry_intraday": {"min_volume": 100000},
+SCREENER_RULES = {}
+
+# Default for /view/* and /api/get_table (the old fetch-time cut)
+VIEW_RULES = {
+    "min_change": 2,
+    "order_by": "change",
+    "limit": 5,
+}
+
+# Query args that override a rule set, e.g. ?min_change=0&limit=0
+#   (an empty value turns a threshold off, limit=0 means no limit)
+ARG_RULES = {
+    "min_change": float,
+    "min_volume": int,
+    "min_price": float,
+    "limit": int,
+}
+ORDER_FIELDS = ("change", "price", "volume")
+
+# threshold rule → row field it applies to (always "field >= value")
+_THRESHOLDS = {
+    "min_change": "change",
+    "min_volume": "volume",
+    "min_price": "price",
+}
+
+
+def rules_for(key, base=None):
+    rules = dict(REPORT_RULES if base is None else base)
+    rules.update(SCREENER_RULES.get(key, {}))
+    return rules
+
+
+def rules_from_args(args, base):
+    """`base` overridden by request args; ValueError on a bad value."""
+    rules = dict(base)
+    for name, cast in ARG_RULES.items():
+        if name not in args:
+            continue
+        value = args.get(name, "").strip()
+        try:
+            rules[name] = cast(value) if value else None
+        except ValueError:
+            raise ValueError(f"Invalid {name}: {value!r}")
+    if rules.get("limit") is not None and rules["limit"] < 0:
+        raise ValueError(f"Invalid limit: {args.get('limit', '').strip()!r}")
+    if not rules.get("limit"):
+        rules["limit"] = None
+
+    if "order_by" in args:
+        order_by = args.get("order_by")
+        if order_by not in ORDER_FIELDS:
+            raise ValueError(f"Invalid order_by: {order_by!r}")
+        rules["order_by"] = order_by
+    return rules
+
+
+def rules_key(rules):
+    """Hashable form of a rule set (for cache keys)."""
+    return tuple(sorted(rules.items()))
+
+
+def thresholds(rules):
+    """[(field, minimum), ...] for the thresholds a rule set turns on."""
+    return [(field, rules[rule]) for rule, field in _THRESHOLDS.items()
+            if rules.get(rule) is not None]
+
+
+def sql_filter(rules, columns):
+    """
+    Build the SQL tail for a rule set (sqlite3 "?" placeholders).
+
+    `columns` maps row fields (stock_name, price, change, volume) to the
+    store's column expressions. Returns (where_clauses, params, order_by,
+    limit); order_by / limit are None when the rules don't set them.
+    """
+    where, params = [], []
+    for field, minimum in thresholds(rules):
+        where.append(f"{columns[field]} >= ?")
+        params.append(minimum)
+
+    if rules.get("skip_na"):
+        where.append(f"UPPER(TRIM({columns['stock_name']})) NOT IN ('', 'N/A')")
+
+    order_by = None
+    if rules.get("order_by"):
+        order_by = f"{columns[rules['order_by']]} DESC"
+
+    return where, params, order_by, rules.get("limit")
+
+
+def _num(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def sort_rows(rows, rules):
+    if rules.get("order_by"):
+        rows.sort(key=lambda x: _num(x.get(rules["order_by"])), reverse=True)
+    return rows
@@ -0,0 +1,219 @@
+# ===================================================================
+# scheduler.py — market-hours refresh daemon
+#
+#   python scheduler.py          → run forever
+#   python scheduler.py --once   → one scheduling pass, then exit
+#
+#   - "intraday" scans (see CHARTINK_SCANS[...]["refresh"]) are
+#     re-scraped every INTRADAY_MINUTES while NSE is open
+#   - everything else is scraped once per trading day after DAILY_AT,
+#     and again only if its scan clause is edited
+#   - scans without a clause are never scraped ("engine": "local"
+#     scans have none and are evaluated over local bars instead)
+#   - a failing scan backs off exponentially (with jitter) and keeps
+#     the last good table instead of being overwritten with N/A
+# ===================================================================
+
+import argparse
+import hashlib
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime
+from datetime import time as dtime
+from zoneinfo import ZoneInfo
+
+import schedule
+
+import chartink
+
+# ---------------------------------------------------------
+# SETTINGS
+# ---------------------------------------------------------
+IST = ZoneInfo("Asia/Kolkata")
+
+MARKET_OPEN = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+
+INTRADAY_MINUTES = int(os.getenv("SCHED_INTRADAY_MINUTES", "5"))
+DAILY_AT = dtime.fromisoformat(os.getenv("SCHED_DAILY_AT", "15:45"))
+TICK_SECONDS = int(os.getenv("SCHED_TICK_SECONDS", "30"))
+
+# Backoff after failures: BACKOFF_BASE * 2^(n-1), capped, ×[0.5, 1.5) jitter
+BACKOFF_BASE = 60
+BACKOFF_CAP = 30 * 60
+
+# Comma-separated YYYY-MM-DD exchange holidays
+MARKET_HOLIDAYS = {
+    d.strip() for d in os.getenv("MARKET_HOLIDAYS", "").split(",") if d.strip()
+}
+
+
+# ---------------------------------------------------------
+# MARKET CALENDAR
+# ---------------------------------------------------------
+def now_ist():
+    return datetime.now(IST)
+
+
+def is_trading_day(now):
+    return now.weekday() < 5 and now.strftime("%Y-%m-%d") not in MARKET_HOLIDAYS
+
+
+def is_market_open(now):
+    return is_trading_day(now) and MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+
+def refresh_tier(cfg):
+    return cfg.get("refresh", "daily")
+
+
+def clause_hash(cfg):
+    return hashlib.sha1((cfg.get("scan") or "").encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------------------------------------------
+# PER-SCAN STATE (kept in MAIN_DB so restarts don't re-scrape)
+# ---------------------------------------------------------
+def _connect():
+    conn = sqlite3.connect(chartink.MAIN_DB, timeout=15)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scan_schedule (
+            key TEXT PRIMARY KEY,
+            last_ok REAL,
+            last_day TEXT,
+            clause_hash TEXT,
+            failures INTEGER NOT NULL DEFAULT 0,
+            next_try REAL NOT NULL DEFAULT 0
+        )
+        """
+    )
+    return conn
+
+
+def load_state():
+    conn = _connect()
+    try:
+        return {r["key"]: dict(r) for r in conn.execute("SELECT * FROM scan_schedule")}
+    finally:
+        conn.close()
+
+
+def save_state(state):
+    conn = _connect()
+    try:
+        conn.executemany(
+            "REPLACE INTO scan_schedule VALUES "
+            "(:key, :last_ok, :last_day, :clause_hash, :failures, :next_try)",
+            list(state.values()),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def backoff_seconds(failures):
+    delay = min(BACKOFF_BASE * 2 ** (failures - 1), BACKOFF_CAP)
+    return delay * random.uniform(0.5, 1.5)
+
+
+# ---------------------------------------------------------
+# SCHEDULING
+# ---------------------------------------------------------
+def due_keys(state, now):
+    """Scans that should be scraped on this pass."""
+    ts = now.timestamp()
+    today = now.strftime("%Y_%m_%d")
+    due = []
+
+    for key, cfg in chartink.CHARTINK_SCANS.items():
+        if not cfg.get("scan") and cfg.get("engine") != "local":
+            continue
+
+        st = state.get(key) or {}
+        if st.get("next_try", 0) > ts:
+            continue  # backing off after a failure
+
+        if refresh_tier(cfg) == "intraday":
+            if not is_market_open(now):
+                continue
+            # small slack so a 5-minute cadence doesn't slip to 5m30s
+            if ts - (st.get("last_ok") or 0) < INTRADAY_MINUTES * 60 - TICK_SECONDS / 2:
+                continue
+        else:
+            if not is_trading_day(now) or now.time() < DAILY_AT:
+                continue
+            if st.get("last_day") == today and st.get("clause_hash") == clause_hash(cfg):
+                continue
+
+        due.append(key)
+    return due
+
+
+def tick():
+    now = now_ist()
+    state = load_state()
+    keys = due_keys(state, now)
+    if not keys:
+        return []
+
+    print(f"\n⏰ {now:%Y-%m-%d %H:%M} IST → refreshing {', '.join(keys)}")
+    screeners = chartink.build_screeners(keys=keys)
+
+    ts = now.timestamp()
+    good = {}
+    for key, df in screeners.items():
+        cfg = chartink.CHARTINK_SCANS[key]
+        st = state.setdefault(key, {
+            "key": key, "last_ok": None, "last_day": None,
+            "clause_hash": None, "failures": 0, "next_try": 0,
+        })
+
+        if chartink.is_failed(df):
+            st["failures"] += 1
+            delay = backoff_seconds(st["failures"])
+            st["next_try"] = ts + delay
+            print(f"🔁 {key} failed ({st['failures']}x) → retry in {delay:.0f}s")
+            continue
+
+        good[key] = df
+        st.update(last_ok=ts, last_day=now.strftime("%Y_%m_%d"),
+                  clause_hash=clause_hash(cfg), failures=0, next_try=0)
+
+    # Failed scans keep their last good table for the day
+    if good:
+        chartink.save_screeners(good, now.strftime("%Y_%m_%d"))
+    save_state(state)
+    return keys
+
+
+def _safe_tick():
+    try:
+        tick()
+    except Exception as e:
+        print(f"❌ Scheduler pass failed → {e}")
+
+
+def run_forever():
+    print(f"🗓 Scheduler up: intraday every {INTRADAY_MINUTES}m "
+          f"({MARKET_OPEN:%H:%M}–{MARKET_CLOSE:%H:%M} IST), daily after {DAILY_AT:%H:%M} IST")
+
+    schedule.every(TICK_SECONDS).seconds.do(_safe_tick)
+    schedule.run_all()
+    while True:
+        schedule.run_pending()
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Market-hours screener refresh daemon")
+    parser.add_argument("--once", action="store_true", help="run one pass and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        tick()
+    else:
+        run_forever()
@@ -39,5 +39,15 @@ CREATE TABLE IF NOT EXISTS daily_screeners (
   volume BIGINT NOT NULL,
   symbol VARCHAR(32) NOT NULL,
   KEY idx_date_screener (run_date, screener_slug),
-  KEY idx_symbol (symbol)
+  KEY idx_symbol (symbol),
+  KEY idx_symbol_date (symbol, run_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- one row per (day, screener) written by a refresh; drives day listings
+CREATE TABLE IF NOT EXISTS screener_runs (
+  run_date DATE NOT NULL,
+  screener_slug VARCHAR(64) NOT NULL,
+  saved_at DOUBLE NOT NULL,
+  row_count INT NOT NULL,
+  PRIMARY KEY (run_date, screener_slug)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,1129 @@
+# ===================================================================
+# storage.py — where screener runs are written and read from
+#
+#   ISMARKET_STORAGE=history (default)
+#       one WAL-mode SQLite file (history.db) holding every scan in
+#       full, compactly: symbols/names are dictionary-encoded, a quote
+#       seen by several scans or runs is stored once, and each scan
+#       result is just (day, screener, position, quote id). Readers
+#       see it through the daily_screeners view (same shape as
+#       schema.sql)
+#   ISMARKET_STORAGE=sql
+#       daily_screeners / screener_runs from schema.sql on MySQL or
+#       MariaDB (or any SQLAlchemy URL) through a connection pool;
+#       set ISMARKET_DB_URL, e.g. mysql+pymysql://user:pw@host/ismarket
+#   ISMARKET_STORAGE=daily
+#       legacy layout: daily_dbs/YYYY_MM_DD.db with one table per
+#       screener, indexed by `records` in chartink_data.db; a refresh
+#       writes a new day file and renames it over the old one
+#
+#   Days are passed around as "YYYY_MM_DD" keys, same as the web app.
+#
+#   python storage.py migrate [--to sql]
+#       import every daily_dbs/*.db into the history (or SQL) store;
+#       safe to re-run
+#   python storage.py reindex
+#       (daily backend) rebuild `records` and `symbol_history` from
+#       every daily_dbs/*.db
+# ===================================================================
+
+import argparse
+import bisect
+import datetime
+import glob
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import metrics
+import rules as rules_mod
+
+# ---------------------------------------------------------
+# PATH SETTINGS
+# ---------------------------------------------------------
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DB_FOLDER = os.getenv("ISMARKET_DAILY_DIR", os.path.join(BASE_DIR, "daily_dbs"))
+MAIN_DB = os.getenv("ISMARKET_MAIN_DB", os.path.join(BASE_DIR, "chartink_data.db"))
+HISTORY_DB = os.getenv("ISMARKET_HISTORY_DB", os.path.join(BASE_DIR, "history.db"))
+
+STORAGE_BACKEND = os.getenv("ISMARKET_STORAGE", "history")
+DB_URL = os.getenv("ISMARKET_DB_URL", f"sqlite:///{os.path.join(BASE_DIR, 'ismarket.db')}")
+
+# Connection pool and multi-row INSERT size for the SQL backend
+SQL_POOL_SIZE = int(os.getenv("ISMARKET_POOL_SIZE", "5"))
+SQL_BATCH_ROWS = 500
+
+# Read-only day-file connections each thread keeps open (daily backend)
+DAY_CONN_CACHE = 32
+
+# DayIndex re-reads the store at most this often (seconds) to pick up
+# days written by other processes (e.g. scheduler.py)
+DAY_INDEX_TTL = 30
+
+COLUMNS = ["stock_name", "price", "change", "volume", "symbol"]
+# Day file tables. No index: a screener table is read whole (a few
+# hundred rows at most), and per-symbol lookups go to symbol_history
+DAY_TABLE_COLUMNS = "stock_name TEXT, price REAL, change REAL, volume INTEGER, symbol TEXT"
+
+# Held by a day file rewrite (daily backend); not a .db, so list_days skips it
+DAY_WRITE_LOCK = ".write.lock"
+DAY_WRITE_LOCK_TIMEOUT = 120
+
+
+def day_to_date(day):
+    return day.replace("_", "-")
+
+
+def date_to_day(date):
+    return str(date).replace("-", "_")
+
+
+def parse_day(value):
+    """User input "YYYY-MM-DD" (or a "YYYY_MM_DD" key) → day key; ValueError if not a date."""
+    return datetime.date.fromisoformat(day_to_date(value)).strftime("%Y_%m_%d")
+
+
+def _num(value, cast):
+    try:
+        value = cast(value or 0)
+    except (TypeError, ValueError):
+        return cast(0)
+    return value if value == value else cast(0)  # NaN → 0
+
+
+def clean_row(r):
+    """Row dict → (stock_name, price, change, volume, symbol) with clean types."""
+    return (
+        str(r.get("stock_name") or ""),
+        _num(r.get("price"), float),
+        _num(r.get("change"), float),
+        _num(r.get("volume"), lambda v: int(float(v))),
+        str(r.get("symbol") or ""),
+    )
+
+
+def df_to_rows(df):
+    return [clean_row(r) for r in df.to_dict("records")]
+
+
+# ===================================================================
+# LEGACY: ONE SQLITE FILE PER DAY
+# ===================================================================
+
+class DailyFileStore:
+    name = "daily"
+
+    def __init__(self, folder=DB_FOLDER, main_db=MAIN_DB):
+        self.folder = folder
+        self.main_db = main_db
+        self._local = threading.local()
+
+    def day_path(self, day):
+        return os.path.join(self.folder, f"{day}.db")
+
+    # ---- write ----
+    def write_day(self, day, screeners):
+        """
+        Write the day file as a new file swapped in with os.replace: the
+        refreshed screeners as typed tables, plus the day's other tables
+        carried over from the current file (partial refreshes). A reader
+        keeps the file it opened and reopens on the new inode, so it sees
+        the whole old day or the whole new one, never a half-written
+        table, and never waits on the writer.
+
+        Writers (the web refresh job, scheduler.py) take the folder's
+        write lock from reading the current file to the rename, so two
+        refreshes of the same day can't drop each other's tables.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        db_path = self.day_path(day)
+        with metrics.timer(metrics.STORAGE_OP, backend=self.name, op="write_day"), \
+                self._write_lock():
+            fd, tmp = tempfile.mkstemp(dir=self.folder, prefix=f".{day}.", suffix=".tmp")
+            os.close(fd)
+            try:
+                self._build_day(tmp, db_path, screeners)
+                with open(tmp, "rb+") as f:
+                    os.fsync(f.fileno())
+                os.chmod(tmp, 0o644)  # mkstemp makes it 0600; the PHP front end may read it
+                os.replace(tmp, db_path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+        print(f"💾 Saved Daily DB → {db_path}")
+        return db_path
+
+    @contextmanager
+    def _write_lock(self):
+        """
+        Cross-process lock for day file rewrites: a write transaction on
+        an empty SQLite file, so it works wherever SQLite does and is
+        released if the writer dies. One lock for the folder, not per
+        day; a rewrite takes tens of milliseconds.
+        """
+        conn = sqlite3.connect(os.path.join(self.folder, DAY_WRITE_LOCK),
+                               timeout=DAY_WRITE_LOCK_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield
+        finally:
+            conn.close()
+
+    def _build_day(self, path, current, screeners):
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            # Nobody sees this file until it's renamed: no journal needed
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            kept = []
+            if os.path.exists(current):
+                conn.execute("ATTACH DATABASE ? AS old", (current,))
+                kept = [r[0] for r in conn.execute(
+                    "SELECT name FROM old.sqlite_master WHERE type = 'table'")
+                    if r[0] not in screeners]
+
+            conn.execute("BEGIN")
+            for name, df in screeners.items():
+                conn.execute(f'CREATE TABLE "{name}" ({DAY_TABLE_COLUMNS})')
+                conn.executemany(f'INSERT INTO "{name}" VALUES (?, ?, ?, ?, ?)', df_to_rows(df))
+
+            cols = ", ".join(f'"{c}"' for c in COLUMNS)
+            for name in kept:
+                have = {r[1] for r in conn.execute(f'PRAGMA old.table_info("{name}")')}
+                if have.issuperset(COLUMNS):
+                    conn.execute(f'CREATE TABLE "{name}" ({DAY_TABLE_COLUMNS})')
+                    conn.execute(f'INSERT INTO "{name}" SELECT {cols} FROM old."{name}"')
+                else:
+                    # Unexpected column set → copy the table as it is
+                    conn.execute(f'CREATE TABLE "{name}" AS SELECT * FROM old."{name}"')
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _main_conn(self):
+        # WAL: symbol history / day index reads don't wait on a refresh
+        conn = sqlite3.connect(self.main_db, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def register(self, day, path):
+        with metrics.timer(metrics.STORAGE_OP, backend=self.name, op="register"):
+            conn = self._main_conn()
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS records (
+                    day TEXT PRIMARY KEY,
+                    db_path TEXT
+                )
+                """
+            )
+            conn.execute("REPLACE INTO records VALUES (?, ?)", (day, path))
+            conn.commit()
+            conn.close()
+        print("📘 Updated main DB index")
+
+    def index_symbols(self, day, tables):
+        """
+        Keep symbol_history (MAIN_DB) in step with the day files, so a
+        symbol's history is one indexed lookup instead of opening every
+        file. `tables` is {slug: rows}; only those screeners are replaced.
+        """
+        conn = self._main_conn()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS symbol_history (
+                    symbol TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    screener TEXT NOT NULL,
+                    stock_name TEXT,
+                    price REAL,
+                    change REAL,
+                    volume INTEGER
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_symbol_day ON symbol_history (symbol, day)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_day_screener ON symbol_history (day, screener)")
+            with conn:
+                for slug, rows in tables.items():
+                    conn.execute("DELETE FROM symbol_history WHERE day = ? AND screener = ?",
+                                 (day, slug))
+                    conn.executemany(
+                        "INSERT INTO symbol_history VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(symbol, day, slug, name, price, change, volume)
+                         for name, price, change, volume, symbol in rows],
+                    )
+        finally:
+            conn.close()
+
+    def save_run(self, day, screeners):
+        path = self.write_day(day, screeners)
+        self.register(day, path)
+        with metrics.timer(metrics.STORAGE_OP, backend=self.name, op="index_symbols"):
+            self.index_symbols(day, {slug: df_to_rows(df) for slug, df in screeners.items()})
+        return path
+
+    # ---- read ----
+    def list_days(self):
+        """
+        Days from the `records` index in MAIN_DB (newest first). The
+        folder is only scanned when `records` is missing or empty.
+        """
+        days = []
+        if os.path.exists(self.main_db):
+            conn = sqlite3.connect(self.main_db)
+            try:
+                days = [r[0] for r in conn.execute("SELECT day FROM records")]
+            except sqlite3.OperationalError:
+                days = []
+            finally:
+                conn.close()
+
+        if days:
+            # records may list files copied from another machine
+            days = [d for d in days if os.path.exists(self.day_path(d))]
+        elif os.path.exists(self.folder):
+            days = [f[:-3] for f in os.listdir(self.folder) if f.endswith(".db")]
+
+        days.sort(reverse=True)
+        return days
+
+    def latest_day(self):
+        days = self.list_days()
+        return days[0] if days else None
+
+    def has_day(self, day):
+        return os.path.exists(self.day_path(day))
+
+    def data_version(self, day):
+        """Last write time of `day` (epoch seconds), None if there is no data."""
+        try:
+            return os.stat(self.day_path(day)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _day_conn(self, day):
+        """
+        Cached read-only connection to a day file (per thread, LRU).
+        Reopened when the file is replaced on disk.
+        """
+        path = self.day_path(day)
+        try:
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            return None
+
+        cache = getattr(self._local, "conns", None)
+        if cache is None:
+            cache = self._local.conns = OrderedDict()
+
+        cached = cache.get(path)
+        if cached and cached[0] == inode:
+            cache.move_to_end(path)
+            return cached[1]
+        if cached:
+            cached[1].close()
+
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        cache[path] = (inode, conn)
+        if len(cache) > DAY_CONN_CACHE:
+            _, (_, old) = cache.popitem(last=False)
+            old.close()
+        return conn
+
+    def read_tables(self, day, keys):
+        """
+        All requested screeners for `day` in one pass over one connection.
+        Returns ({key: rows}, [missing keys]).
+        """
+        conn = self._day_conn(day)
+        if conn is None:
+            return {}, list(keys)
+
+        present = {r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        found = [k for k in keys if k in present]
+        missing = [k for k in keys if k not in present]
+        tables = {k: [] for k in found}
+        if not found:
+            return tables, missing
+
+        cols = ", ".join(f'"{c}"' for c in COLUMNS)
+        union = " UNION ALL ".join(
+            f'SELECT ? AS _screener, {cols} FROM "{k}"' for k in found)
+        try:
+            for r in conn.execute(union, found):
+                row = dict(r)
+                tables[row.pop("_screener")].append(row)
+        except sqlite3.OperationalError:
+            # A table with an unexpected column set → read them one by one
+            for k in found:
+                tables[k] = [dict(r) for r in conn.execute(f'SELECT * FROM "{k}"')]
+        return tables, missing
+
+    def read_table(self, day, table_name):
+        tables, _ = self.read_tables(day, [table_name])
+        return tables.get(table_name, [])
+
+    def read_filtered(self, day, rules_by_key):
+        """
+        Like read_tables, with each key's rule set applied in SQL so only
+        surviving rows are loaded → ({key: rows}, [missing]).
+        """
+        conn = self._day_conn(day)
+        if conn is None:
+            return {}, list(rules_by_key)
+        present = {r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        out = {key: [] for key in rules_by_key if key in present}
+
+        # Legacy tables come from df.to_sql and may hold text; cast to compare
+        columns = {"stock_name": "stock_name", "price": "CAST(price AS REAL)",
+                   "change": "CAST(change AS REAL)", "volume": "CAST(volume AS INTEGER)"}
+        cols = ", ".join(f'"{c}"' for c in COLUMNS)
+        parts, params = [], []
+        for key, rules in rules_by_key.items():
+            if key not in present:
+                continue
+            where, p, order_by, limit = rules_mod.sql_filter(rules, columns)
+            sql = f'SELECT ? AS _screener, {cols} FROM "{key}"'
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += f" ORDER BY {order_by + ', ' if order_by else ''}rowid"
+            if limit:
+                sql += f" LIMIT {int(limit)}"
+            parts.append(f"SELECT * FROM ({sql})")
+            params += [key, *p]
+
+        if parts:
+            for r in conn.execute(" UNION ALL ".join(parts), params):
+                row = dict(r)
+                out[row.pop("_screener")].append(row)
+        for key, rows in out.items():
+            rules_mod.sort_rows(rows, rules_by_key[key])
+        return out, [k for k in rules_by_key if k not in present]
+
+    def iter_rows(self, start=None, end=None, screeners=None):
+        """Stream {day, screener, ...} rows for a date range, one day file at a time."""
+        days = sorted(d for d in self.list_days()
+                      if (not start or d >= start) and (not end or d <= end))
+        for day in days:
+            conn = self._day_conn(day)
+            if conn is None:
+                continue
+            present = sorted(r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"))
+            for slug in present:
+                if screeners and slug not in screeners:
+                    continue
+                for r in conn.execute(f'SELECT * FROM "{slug}"'):
+                    name, price, change, volume, symbol = clean_row(dict(r))
+                    yield {"day": day, "screener": slug, "symbol": symbol,
+                           "stock_name": name, "price": price, "change": change,
+                           "volume": volume}
+
+    def symbol_history(self, symbol, start=None, end=None, screeners=None):
+        if not os.path.exists(self.main_db):
+            return []
+        sql = ("SELECT day, screener, stock_name, price, change, volume "
+               "FROM symbol_history WHERE symbol = ?")
+        params = [symbol]
+        if start:
+            sql += " AND day >= ?"
+            params.append(start)
+        if end:
+            sql += " AND day <= ?"
+            params.append(end)
+        if screeners:
+            sql += f" AND screener IN ({', '.join('?' * len(screeners))})"
+            params += list(screeners)
+        sql += " ORDER BY day DESC, screener"
+
+        conn = sqlite3.connect(self.main_db)
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(r) for r in conn.execute(sql, params)]
+        except sqlite3.OperationalError:
+            return []  # nothing indexed yet
+        finally:
+            conn.close()
+
+
+# ===================================================================
+# HISTORY: ONE WAL-MODE SQLITE DATABASE FOR EVERY RUN
+# ===================================================================
+
+HISTORY_SCHEMA = """
+-- dictionary of symbols / names, each stored once
+CREATE TABLE IF NOT EXISTS securities (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    stock_name TEXT NOT NULL,
+    UNIQUE (symbol, stock_name)
+);
+
+-- distinct quotes; a stock returned by several scans (or by repeated
+-- intraday runs at the same price) shares one row
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    security_id INTEGER NOT NULL REFERENCES securities (id),
+    price REAL NOT NULL,
+    change_pct REAL NOT NULL,
+    volume INTEGER NOT NULL,
+    UNIQUE (security_id, price, change_pct, volume)
+);
+
+-- full result of each scan: which quotes, in Chartink's order
+CREATE TABLE IF NOT EXISTS hits (
+    run_date TEXT NOT NULL,          -- YYYY-MM-DD
+    screener_slug TEXT NOT NULL,     -- bms, lowest_pe, etc.
+    pos INTEGER NOT NULL,
+    quote_id INTEGER NOT NULL REFERENCES quotes (id),
+    PRIMARY KEY (run_date, screener_slug, pos)
+) WITHOUT ROWID;
+-- per-symbol history lookups: securities → quotes → hits
+CREATE INDEX IF NOT EXISTS idx_hits_quote ON hits (quote_id, run_date);
+
+-- the flat shape of schema.sql, for every reader
+CREATE VIEW IF NOT EXISTS daily_screeners AS
+SELECT h.pos AS id, h.run_date, h.screener_slug, s.stock_name,
+       q.price, q.change_pct, q.volume, s.symbol
+FROM hits h
+JOIN quotes q ON q.id = h.quote_id
+JOIN securities s ON s.id = q.security_id;
+
+-- one row per (day, screener) written; drives day listings
+CREATE TABLE IF NOT EXISTS runs (
+    run_date TEXT NOT NULL,
+    screener_slug TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    row_count INTEGER NOT NULL,
+    PRIMARY KEY (run_date, screener_slug)
+);
+"""
+
+
+_QUOTE_SQL = (
+    "INSERT OR IGNORE INTO quotes (security_id, price, change_pct, volume) "
+    "SELECT id, ?, ?, ? FROM securities WHERE symbol = ? AND stock_name = ?"
+)
+_HIT_SQL = (
+    "INSERT INTO hits (run_date, screener_slug, pos, quote_id) "
+    "SELECT ?, ?, ?, q.id FROM quotes q JOIN securities s ON s.id = q.security_id "
+    "WHERE s.symbol = ? AND s.stock_name = ? "
+    "AND q.price = ? AND q.change_pct = ? AND q.volume = ?"
+)
+
+
+def _replace_screener(conn, run_date, slug, rows, saved_at):
+    old = conn.execute(
+        "SELECT DISTINCT quote_id FROM hits WHERE run_date = ? AND screener_slug = ?",
+        (run_date, slug),
+    ).fetchall()
+    conn.execute("DELETE FROM hits WHERE run_date = ? AND screener_slug = ?",
+                 (run_date, slug))
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO securities (symbol, stock_name) VALUES (?, ?)",
+        {(symbol, name) for name, _, _, _, symbol in rows},
+    )
+    conn.executemany(
+        _QUOTE_SQL,
+        {(price, change, volume, symbol, name) for name, price, change, volume, symbol in rows},
+    )
+    conn.executemany(
+        _HIT_SQL,
+        [(run_date, slug, pos, symbol, name, price, change, volume)
+         for pos, (name, price, change, volume, symbol) in enumerate(rows)],
+    )
+
+    # Quotes only the replaced result pointed at
+    conn.executemany(
+        "DELETE FROM quotes WHERE id = ? AND NOT EXISTS (SELECT 1 FROM hits WHERE quote_id = ?)",
+        [(q, q) for (q,) in old],
+    )
+    conn.execute("REPLACE INTO runs VALUES (?, ?, ?, ?)",
+                 (run_date, slug, saved_at, len(rows)))
+
+
+def _compact_flat_table(conn):
+    """
+    One-off upgrade of a history.db written before the compact layout,
+    when daily_screeners was a plain table. Safe to resume if interrupted.
+    """
+    found = dict(conn.execute(
+        "SELECT name, type FROM sqlite_master "
+        "WHERE name IN ('daily_screeners', 'daily_screeners_flat')").fetchall())
+    if found.get("daily_screeners") == "table":
+        conn.execute("ALTER TABLE daily_screeners RENAME TO daily_screeners_flat")
+    elif "daily_screeners_flat" not in found:
+        return
+
+    print("🗜 Compacting history.db (one-off)...")
+    conn.executescript(HISTORY_SCHEMA)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        groups = {}
+        for r in conn.execute(
+            "SELECT run_date, screener_slug, stock_name, price, change_pct, volume, symbol "
+            "FROM daily_screeners_flat ORDER BY id"
+        ):
+            groups.setdefault((r[0], r[1]), []).append(tuple(r[2:]))
+
+        for (run_date, slug), rows in groups.items():
+            saved_at, = conn.execute(
+                "SELECT saved_at FROM runs WHERE run_date = ? AND screener_slug = ?",
+                (run_date, slug)).fetchone() or (time.time(),)
+            _replace_screener(conn, run_date, slug, rows, saved_at)
+
+        conn.execute("DROP TABLE daily_screeners_flat")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("VACUUM")
+
+
+class HistoryStore:
+    name = "history"
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        _compact_flat_table(conn)
+        conn.executescript(HISTORY_SCHEMA)
+
+    def _conn(self):
+        # sqlite3 connections can't be shared across threads; keep one each
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---- write ----
+    def save_rows(self, day, tables, saved_at=None):
+        """Replace `day`'s rows for every screener in {slug: rows}, in one transaction."""
+        run_date = day_to_date(day)
+        saved_at = saved_at or time.time()
+        conn = self._conn()
+        with metrics.timer(metrics.STORAGE_OP, backend=self.name, op="save_rows"):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for slug, rows in tables.items():
+                    _replace_screener(conn, run_date, slug, rows, saved_at)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self.path
+
+    def save_run(self, day, screeners):
+        self.save_rows(day, {slug: df_to_rows(df) for slug, df in screeners.items()})
+        print(f"💾 Saved {len(screeners)} screeners for {day_to_date(day)} → {self.path}")
+        return self.path
+
+    # ---- read ----
+    def list_days(self):
+        rows = self._conn().execute(
+            "SELECT DISTINCT run_date FROM runs ORDER BY run_date DESC"
+        ).fetchall()
+        return [date_to_day(r[0]) for r in rows]
+
+    def latest_day(self):
+        row = self._conn().execute("SELECT MAX(run_date) FROM runs").fetchone()
+        return date_to_day(row[0]) if row and row[0] else None
+
+    def has_day(self, day):
+        row = self._conn().execute(
+            "SELECT 1 FROM runs WHERE run_date = ? LIMIT 1", (day_to_date(day),)
+        ).fetchone()
+        return row is not None
+
+    def data_version(self, day):
+        """Last write time of `day` (epoch seconds), None if there is no data."""
+        row = self._conn().execute(
+            "SELECT MAX(saved_at) FROM runs WHERE run_date = ?", (day_to_date(day),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def read_tables(self, day, keys):
+        """All requested screeners for `day` in one query → ({key: rows}, [missing])."""
+        keys = list(keys)
+        run_date = day_to_date(day)
+        marks = ", ".join("?" * len(keys))
+        conn = self._conn()
+
+        written = {r[0] for r in conn.execute(
+            f"SELECT screener_slug FROM runs WHERE run_date = ? AND screener_slug IN ({marks})",
+            (run_date, *keys))}
+        tables = {k: [] for k in keys if k in written}
+        for r in conn.execute(
+            "SELECT screener_slug, stock_name, price, change_pct AS change, volume, symbol "
+            f"FROM daily_screeners WHERE run_date = ? AND screener_slug IN ({marks}) ORDER BY id",
+            (run_date, *keys),
+        ):
+            row = dict(r)
+            tables[row.pop("screener_slug")].append(row)
+        return tables, [k for k in keys if k not in written]
+
+    def read_table(self, day, table_name):
+        tables, _ = self.read_tables(day, [table_name])
+        return tables.get(table_name, [])
+
+    def read_filtered(self, day, rules_by_key):
+        """
+        Like read_tables, with each key's rule set pushed into one
+        UNION ALL query (WHERE / ORDER BY / LIMIT on typed columns).
+        """
+        run_date = day_to_date(day)
+        keys = list(rules_by_key)
+        conn = self._conn()
+        written = {r[0] for r in conn.execute(
+            f"SELECT screener_slug FROM runs WHERE run_date = ? "
+            f"AND screener_slug IN ({', '.join('?' * len(keys))})",
+            (run_date, *keys))}
+
+        columns = {"stock_name": "stock_name", "price": "price",
+                   "change": "change_pct", "volume": "volume"}
+        parts, params = [], []
+        for key, rules in rules_by_key.items():
+            where, p, order_by, limit = rules_mod.sql_filter(rules, columns)
+            sql = ("SELECT screener_slug, stock_name, price, change_pct AS change, volume, symbol "
+                   "FROM daily_screeners WHERE run_date = ? AND screener_slug = ?")
+            sql += "".join(f" AND {w}" for w in where)
+            sql += f" ORDER BY {order_by + ', ' if order_by else ''}id"
+            if limit:
+                sql += f" LIMIT {int(limit)}"
+            parts.append(f"SELECT * FROM ({sql})")
+            params += [run_date, key, *p]
+
+        out = {key: [] for key in keys if key in written}
+        if parts:
+            for r in conn.execute(" UNION ALL ".join(parts), params):
+                row = dict(r)
+                out[row.pop("screener_slug")].append(row)
+        for key, rows in out.items():
+            rules_mod.sort_rows(rows, rules_by_key[key])
+        return out, [k for k in keys if k not in written]
+
+    def iter_rows(self, start=None, end=None, screeners=None):
+        """Stream {day, screener, ...} rows for a date range straight off the cursor."""
+        sql = ("SELECT run_date, screener_slug, symbol, stock_name, price, change_pct, volume "
+               "FROM daily_screeners WHERE 1 = 1")
+        params = []
+        if start:
+            sql += " AND run_date >= ?"
+            params.append(day_to_date(start))
+        if end:
+            sql += " AND run_date <= ?"
+            params.append(day_to_date(end))
+        if screeners:
+            sql += f" AND screener_slug IN ({', '.join('?' * len(screeners))})"
+            params += list(screeners)
+        sql += " ORDER BY run_date, screener_slug, id"
+
+        # A separate connection so a slow consumer never holds up this
+        # thread's shared connection
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            for r in conn.execute(sql, params):
+                yield {"day": date_to_day(r[0]), "screener": r[1], "symbol": r[2],
+                       "stock_name": r[3], "price": r[4], "change": r[5], "volume": r[6]}
+        finally:
+            conn.close()
+
+    def symbol_history(self, symbol, start=None, end=None, screeners=None):
+        sql = ("SELECT run_date, screener_slug, stock_name, price, change_pct, volume "
+               "FROM daily_screeners WHERE symbol = ?")
+        params = [symbol]
+        if start:
+            sql += " AND run_date >= ?"
+            params.append(day_to_date(start))
+        if end:
+            sql += " AND run_date <= ?"
+            params.append(day_to_date(end))
+        if screeners:
+            sql += f" AND screener_slug IN ({', '.join('?' * len(screeners))})"
+            params += list(screeners)
+        sql += " ORDER BY run_date DESC, screener_slug"
+
+        return [
+            {"day": date_to_day(r[0]), "screener": r[1], "stock_name": r[2],
+             "price": r[3], "change": r[4], "volume": r[5]}
+            for r in self._conn().execute(sql, params)
+        ]
+
+
+# ===================================================================
+# SQL: POOLED SQLALCHEMY ENGINE (MySQL / MariaDB, or SQLite stand-in)
+# ===================================================================
+
+class SQLStore:
+    name = "sql"
+
+    def __init__(self, url=DB_URL):
+        # Imported here so the other backends work without SQLAlchemy
+        import sqlalchemy as sa
+
+        self.sa = sa
+        self.url = url
+        kwargs = {"pool_pre_ping": True, "future": True}
+        if not url.startswith("sqlite"):
+            kwargs.update(pool_size=SQL_POOL_SIZE, max_overflow=SQL_POOL_SIZE * 2,
+                          pool_recycle=3600)
+        self.engine = sa.create_engine(url, **kwargs)
+        self.label = self.engine.url.render_as_string(hide_password=True)
+
+        # Same shape as schema.sql
+        meta = sa.MetaData()
+        self.screeners = sa.Table(
+            "daily_screeners", meta,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("run_date", sa.Date, nullable=False),
+            sa.Column("screener_slug", sa.String(64), nullable=False),
+            sa.Column("stock_name", sa.String(120), nullable=False),
+            sa.Column("price", sa.Numeric(12, 2), nullable=False),
+            sa.Column("change_pct", sa.Numeric(6, 2), nullable=False),
+            sa.Column("volume", sa.BigInteger, nullable=False),
+            sa.Column("symbol", sa.String(32), nullable=False),
+            sa.Index("idx_date_screener", "run_date", "screener_slug"),
+            sa.Index("idx_symbol", "symbol"),
+            sa.Index("idx_symbol_date", "symbol", "run_date"),
+            mysql_engine="InnoDB", mysql_charset="utf8mb4",
+        )
+        self.runs = sa.Table(
+            "screener_runs", meta,
+            sa.Column("run_date", sa.Date, primary_key=True),
+            sa.Column("screener_slug", sa.String(64), primary_key=True),
+            sa.Column("saved_at", sa.Float, nullable=False),
+            sa.Column("row_count", sa.Integer, nullable=False),
+            mysql_engine="InnoDB", mysql_charset="utf8mb4",
+        )
+        meta.create_all(self.engine)
+
+    @staticmethod
+    def _date(day):
+        return datetime.date.fromisoformat(day_to_date(day))
+
+    # ---- write ----
+    def save_rows(self, day, tables, saved_at=None):
+        """Replace `day`'s rows for every screener in {slug: rows}, in one transaction."""
+        run_date = self._date(day)
+        saved_at = saved_at or time.time()
+        t, runs = self.screeners, self.runs
+
+        with metrics.timer(metrics.STORAGE_OP, backend=self.name, op="save_rows"), \
+                self.engine.begin() as conn:
+            for slug, rows in tables.items():
+                conn.execute(t.delete().where(
+                    (t.c.run_date == run_date) & (t.c.screener_slug == slug)))
+
+                records = [
+                    {"run_date": run_date, "screener_slug": slug,
+                     "stock_name": name[:120], "price": price, "change_pct": change,
+                     "volume": volume, "symbol": symbol[:32]}
+                    for name, price, change, volume, symbol in rows
+                ]
+                # One multi-row INSERT per batch instead of a round-trip per row
+                for i in range(0, len(records), SQL_BATCH_ROWS):
+                    conn.execute(t.insert().values(records[i:i + SQL_BATCH_ROWS]))
+
+                conn.execute(runs.delete().where(
+                    (runs.c.run_date == run_date) & (runs.c.screener_slug == slug)))
+                conn.execute(runs.insert().values(
+                    run_date=run_date, screener_slug=slug,
+                    saved_at=saved_at, row_count=len(records)))
+        return self.label
+
+    def save_run(self, day, screeners):
+        self.save_rows(day, {slug: df_to_rows(df) for slug, df in screeners.items()})
+        print(f"💾 Saved {len(screeners)} screeners for {day_to_date(day)} → {self.label}")
+        return self.label
+
+    # ---- read ----
+    def list_days(self):
+        sa = self.sa
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                sa.select(self.runs.c.run_date).distinct()
+                .order_by(self.runs.c.run_date.desc())
+            ).all()
+        return [date_to_day(r[0]) for r in rows]
+
+    def latest_day(self):
+        sa = self.sa
+        with self.engine.connect() as conn:
+            value = conn.execute(sa.select(sa.func.max(self.runs.c.run_date))).scalar()
+        return date_to_day(value) if value else None
+
+    def has_day(self, day):
+        sa = self.sa
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                sa.select(self.runs.c.run_date)
+                .where(self.runs.c.run_date == self._date(day)).limit(1)
+            ).first()
+        return row is not None
+
+    def data_version(self, day):
+        """Last write time of `day` (epoch seconds), None if there is no data."""
+        sa = self.sa
+        with self.engine.connect() as conn:
+            return conn.execute(
+                sa.select(sa.func.max(self.runs.c.saved_at))
+                .where(self.runs.c.run_date == self._date(day))
+            ).scalar()
+
+    def read_tables(self, day, keys):
+        """All requested screeners for `day` in one query → ({key: rows}, [missing])."""
+        sa = self.sa
+        keys = list(keys)
+        run_date = self._date(day)
+        t, runs = self.screeners, self.runs
+
+        with self.engine.connect() as conn:
+            written = set(conn.execute(
+                sa.select(runs.c.screener_slug).where(
+                    (runs.c.run_date == run_date) & runs.c.screener_slug.in_(keys))
+            ).scalars())
+            rows = conn.execute(
+                sa.select(t.c.screener_slug, t.c.stock_name, t.c.price,
+                          t.c.change_pct, t.c.volume, t.c.symbol)
+                .where((t.c.run_date == run_date) & t.c.screener_slug.in_(keys))
+                .order_by(t.c.id)
+            ).all()
+
+        tables = {k: [] for k in keys if k in written}
+        for slug, name, price, change, volume, symbol in rows:
+            tables[slug].append({"stock_name": name, "price": float(price),
+                                 "change": float(change), "volume": int(volume),
+                                 "symbol": symbol})
+        return tables, [k for k in keys if k not in written]
+
+    def read_table(self, day, table_name):
+        tables, _ = self.read_tables(day, [table_name])
+        return tables.get(table_name, [])
+
+    def read_filtered(self, day, rules_by_key):
+        """Like read_tables, with each key's rule set applied in the query."""
+        sa = self.sa
+        t, runs = self.screeners, self.runs
+        fields = {"stock_name": t.c.stock_name, "price": t.c.price,
+                  "change": t.c.change_pct, "volume": t.c.volume}
+        keys = list(rules_by_key)
+        run_date = self._date(day)
+        out = {}
+
+        with self.engine.connect() as conn:
+            written = set(conn.execute(
+                sa.select(runs.c.screener_slug).where(
+                    (runs.c.run_date == run_date) & runs.c.screener_slug.in_(keys))
+            ).scalars())
+            for key, rules in rules_by_key.items():
+                if key not in written:
+                    continue
+                cond = (t.c.run_date == run_date) & (t.c.screener_slug == key)
+                for field, minimum in rules_mod.thresholds(rules):
+                    cond &= fields[field] >= minimum
+                if rules.get("skip_na"):
+                    cond &= sa.func.upper(sa.func.trim(t.c.stock_name)).not_in(["", "N/A"])
+
+                query = sa.select(t.c.stock_name, t.c.price, t.c.change_pct,
+                                  t.c.volume, t.c.symbol).where(cond)
+                if rules.get("order_by"):
+                    query = query.order_by(fields[rules["order_by"]].desc())
+                query = query.order_by(t.c.id)
+                if rules.get("limit"):
+                    query = query.limit(rules["limit"])
+
+                out[key] = [
+                    {"stock_name": r[0], "price": float(r[1]), "change": float(r[2]),
+                     "volume": int(r[3]), "symbol": r[4]}
+                    for r in conn.execute(query)
+                ]
+        return out, [k for k in keys if k not in written]
+
+    def iter_rows(self, start=None, end=None, screeners=None):
+        """Stream {day, screener, ...} rows for a date range with a server-side cursor."""
+        sa = self.sa
+        t = self.screeners
+        cond = sa.true()
+        if start:
+            cond &= t.c.run_date >= self._date(start)
+        if end:
+            cond &= t.c.run_date <= self._date(end)
+        if screeners:
+            cond &= t.c.screener_slug.in_(list(screeners))
+
+        query = (
+            sa.select(t.c.run_date, t.c.screener_slug, t.c.symbol, t.c.stock_name,
+                      t.c.price, t.c.change_pct, t.c.volume)
+            .where(cond)
+            .order_by(t.c.run_date, t.c.screener_slug, t.c.id)
+        )
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=1000).execute(query)
+            for r in result:
+                yield {"day": date_to_day(r[0]), "screener": r[1], "symbol": r[2],
+                       "stock_name": r[3], "price": float(r[4]), "change": float(r[5]),
+                       "volume": int(r[6])}
+
+    def symbol_history(self, symbol, start=None, end=None, screeners=None):
+        sa = self.sa
+        t = self.screeners
+        cond = t.c.symbol == symbol
+        if start:
+            cond &= t.c.run_date >= self._date(start)
+        if end:
+            cond &= t.c.run_date <= self._date(end)
+        if screeners:
+            cond &= t.c.screener_slug.in_(list(screeners))
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                sa.select(t.c.run_date, t.c.screener_slug, t.c.stock_name,
+                          t.c.price, t.c.change_pct, t.c.volume)
+                .where(cond)
+                .order_by(t.c.run_date.desc(), t.c.screener_slug)
+            ).all()
+        return [
+            {"day": date_to_day(r[0]), "screener": r[1], "stock_name": r[2],
+             "price": float(r[3]), "change": float(r[4]), "volume": int(r[5])}
+            for r in rows
+        ]
+
+
+# ---------------------------------------------------------
+# DAY INDEX: "which days exist" / "latest day" without touching
+# the store on every request
+# ---------------------------------------------------------
+class DayIndex:
+    def __init__(self, store, ttl=DAY_INDEX_TTL):
+        self.store = store
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._days = []        # oldest first ("YYYY_MM_DD" sorts by date)
+        self._set = set()
+        self._loaded_at = 0.0
+        self.reload()
+
+    def reload(self):
+        days = self.store.list_days()
+        with self._lock:
+            self._days = sorted(set(days))
+            self._set = set(self._days)
+            self._loaded_at = time.monotonic()
+
+    def _fresh(self):
+        if time.monotonic() - self._loaded_at > self.ttl:
+            self.reload()
+
+    def add(self, day):
+        """Record a day written by this process (called when a refresh commits)."""
+        with self._lock:
+            if day in self._set:
+                return
+            self._set.add(day)
+            bisect.insort(self._days, day)
+
+    def days(self):
+        """Newest first, like list_days()."""
+        self._fresh()
+        return self._days[::-1]
+
+    def latest(self):
+        self._fresh()
+        return self._days[-1] if self._days else None
+
+    def has(self, day):
+        if day in self._set:
+            return True
+        # Maybe written by another process since the last reload
+        if self.store.has_day(day):
+            self.add(day)
+            return True
+        return False
+
+
+# ---------------------------------------------------------
+# MIGRATION: legacy daily_dbs/*.db → history / SQL store
+# ---------------------------------------------------------
+def import_daily_dbs(store, folder=DB_FOLDER):
+    """Bulk-load legacy day files, one transaction per day. Re-importing a day replaces it."""
+    files = sorted(glob.glob(os.path.join(folder, "*.db")))
+    total = 0
+    for path in files:
+        src = sqlite3.connect(path)
+        try:
+            tables = {}
+            for (slug,) in src.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                cur = src.execute(f'SELECT * FROM "{slug}"')
+                cols = [c[0] for c in cur.description]
+                tables[slug] = [clean_row(dict(zip(cols, values))) for values in cur]
+        finally:
+            src.close()
+
+        store.save_rows(os.path.basename(path)[:-3], tables, os.path.getmtime(path))
+        total += sum(len(rows) for rows in tables.values())
+        print(f"📥 {os.path.basename(path)} → {len(tables)} screeners")
+
+    print(f"✅ Imported {len(files)} day files, {total} rows → {store.name} store")
+    return len(files)
+
+
+# ---------------------------------------------------------
+# BACKEND SELECTION
+# ---------------------------------------------------------
+BACKENDS = {
+    "history": HistoryStore,
+    "sql": SQLStore,
+    "daily": DailyFileStore,
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(name=None):
+    name = name or STORAGE_BACKEND
+    with _stores_lock:
+        if name not in _stores:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown storage backend: {name}")
+            _stores[name] = BACKENDS[name]()
+        return _stores[name]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ISMarket storage tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    mig = sub.add_parser("migrate", help="import daily_dbs/*.db into the history or SQL store")
+    mig.add_argument("--folder", default=DB_FOLDER)
+    mig.add_argument("--to", choices=["history", "sql"], default="history")
+    sub.add_parser("reindex", help="rebuild records + symbol_history from daily_dbs/*.db")
+    args = parser.parse_args()
+
+    if args.cmd == "migrate":
+        import_daily_dbs(get_store(args.to), args.folder)
+    elif args.cmd == "reindex":
+        daily = DailyFileStore()
+        for path in sorted(glob.glob(os.path.join(daily.folder, "*.db"))):
+            day = os.path.basename(path)[:-3]
+            daily.register(day, path)
+            src = sqlite3.connect(path)
+            slugs = [r[0] for r in src.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            src.close()
+            tables, _ = daily.read_tables(day, slugs)
+            daily.index_symbols(day, {k: [clean_row(r) for r in rows] for k, rows in tables.items()})
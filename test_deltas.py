@@ -0,0 +1,101 @@
+# ===================================================================
+# test_deltas.py — folding run-to-run screener deltas
+#
+#   python -m pytest -q test_deltas.py
+#
+#   fold() over the deltas of consecutive runs must equal compare() of
+#   the first and last snapshots, whatever happened in between.
+# ===================================================================
+
+import pandas as pd
+import pytest
+
+import deltas
+
+RUNS = {
+    # symbol → [stock_name, price, change] per run
+    "add_drop_readd": [
+        {"A": ["A", 10, 1]},
+        {"A": ["A", 10, 1], "B": ["B", 20, 2]},
+        {"A": ["A", 10, 1]},
+        {"A": ["A", 10, 1], "B": ["B", 21, 3]},
+    ],
+    "readd_same_values": [
+        {"A": ["A", 10, 1], "B": ["B", 20, 2]},
+        {"A": ["A", 10, 1]},
+        {"A": ["A", 10, 1], "B": ["B", 20, 2]},
+    ],
+    "move_then_move_back": [
+        {"A": ["A", 10, 1]},
+        {"A": ["A", 11, 2]},
+        {"A": ["A", 10, 1]},
+    ],
+    "moves_then_drop": [
+        {"A": ["A", 10, 1], "C": ["C", 5, 0]},
+        {"A": ["A", 11, 2], "C": ["C", 5, 0]},
+        {"A": ["A", 12, 3], "C": ["C", 6, 1]},
+        {"C": ["C", 6, 1]},
+    ],
+    "add_then_move": [
+        {},
+        {"D": ["D", 7, 1]},
+        {"D": ["D", 8, 2]},
+        {"D": ["D", 9, 3], "E": ["E", 1, 0]},
+    ],
+    "drop_then_readd_moved": [
+        {"A": ["A", 10, 1]},
+        {},
+        {"A": ["A", 15, 5]},
+    ],
+}
+
+
+def run_deltas(snaps):
+    return [deltas.compare(old, new) for old, new in zip(snaps, snaps[1:])]
+
+
+@pytest.mark.parametrize("name", RUNS)
+def test_fold_equals_compare_of_endpoints(name):
+    snaps = RUNS[name]
+    assert deltas.fold(run_deltas(snaps)) == deltas.compare(snaps[0], snaps[-1])
+
+
+def test_fold_every_sub_range():
+    snaps = RUNS["moves_then_drop"]
+    for i in range(len(snaps)):
+        for j in range(i, len(snaps)):
+            assert deltas.fold(run_deltas(snaps[i:j + 1])) == deltas.compare(snaps[i], snaps[j])
+
+
+def test_fold_add_drop_readd():
+    out = deltas.fold(run_deltas(RUNS["add_drop_readd"]))
+    assert out["added"] == [{"symbol": "B", "stock_name": "B", "price": 21, "change": 3}]
+    assert out["dropped"] == [] and out["moved"] == []
+
+
+def test_fold_no_runs():
+    assert deltas.fold([]) == {"added": [], "dropped": [], "moved": []}
+
+
+def test_record_and_diffs(tmp_path, monkeypatch):
+    monkeypatch.setattr(deltas.storage, "MAIN_DB", str(tmp_path / "main.db"))
+
+    def frame(rows):
+        return pd.DataFrame([{"stock_name": s, "price": p, "change": c, "volume": 1, "symbol": s}
+                             for s, p, c in rows])
+
+    deltas.record("2025_11_26", {"bms": frame([("A", 10, 1), ("B", 20, 2)])})
+    deltas.record("2025_11_27", {"bms": frame([("A", 10, 1), ("C", 5, 1)]),
+                                 "lowest_pe": frame([("X", 1, 0)])})
+    deltas.record("2025_11_28", {"bms": frame([("A", 11, 1), ("C", 5, 1), ("B", 20, 2)])})
+
+    out = deltas.diffs(["bms", "lowest_pe", "bullish_script"], "2025_11_26", "2025_11_28")
+    assert [e["symbol"] for e in out["bms"]["added"]] == ["C"]
+    assert [e["symbol"] for e in out["bms"]["moved"]] == ["A"]
+    assert out["bms"]["dropped"] == [] and out["bms"]["runs"] == 2
+    assert [e["symbol"] for e in out["lowest_pe"]["added"]] == ["X"]
+    assert out["bullish_script"]["runs"] == 0
+
+    last = deltas.last_runs(["bms", "lowest_pe"], "2025_11_28")
+    assert [e["symbol"] for e in last["bms"]["added"]] == ["B"]
+    assert last["lowest_pe"] is None
@@ -0,0 +1,71 @@
+# ===================================================================
+# test_engine.py — local engine: incremental state vs. full history
+#
+#   python -m pytest -q test_engine.py
+#
+#   IncrementalContext must give the same masks as Context (every
+#   indicator recomputed over the full history), fresh and resumed
+#   from saved state, however far back a clause reads.
+# ===================================================================
+
+import numpy as np
+import pytest
+
+import bars
+import clause
+import engine
+
+CLAUSES = [
+    "( {cash} ( daily close > daily sma( close,20 ) and daily rsi( 14 ) > 50 ) )",
+    "( {cash} ( 15 days ago rsi( 14 ) > 50 ) )",
+    "( {cash} ( 12 days ago sma( close, 20 ) > 0 ) )",
+    "( {cash} ( daily ema( close,12 ) > 1 day ago daily ema( close,12 ) ) )",
+    "( {cash} ( daily macd line( 26,12 ) > daily macd signal( 26,12,9 ) ) )",
+    "( {cash} ( daily close > 30 days ago max( 20, daily high ) ) )",
+    "( {cash} ( [-25] daily parabolic sar( 0.02,0.02,0.2 ) < [-25] daily close ) )",
+]
+
+
+@pytest.fixture(scope="module")
+def folder(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("bars"))
+    bars.synth(60, 300, "daily", path, seed=7)
+    return path
+
+
+@pytest.mark.parametrize("text", CLAUSES)
+def test_incremental_matches_full_history(folder, tmp_path, text):
+    node = clause.parse(text)
+    full = clause.evaluate(node, engine.Context(folder=folder))
+    assert full.any()
+
+    state_dir = str(tmp_path / "state")
+    fresh = engine.IncrementalContext(folder=folder, state_dir=state_dir)
+    np.testing.assert_array_equal(clause.evaluate(node, fresh), full)
+    fresh.save()
+
+    resumed = engine.IncrementalContext(folder=folder, state_dir=state_dir)
+    np.testing.assert_array_equal(clause.evaluate(node, resumed), full)
+    assert resumed.stepped < fresh.stepped
+
+
+def test_saved_tail_too_short_is_rebuilt(folder, tmp_path):
+    state_dir = str(tmp_path / "state")
+    short = engine.IncrementalContext(folder=folder, state_dir=state_dir)
+    clause.evaluate(clause.parse("( {cash} ( daily rsi( 14 ) > 50 ) )"), short)
+    short.save()
+
+    node = clause.parse("( {cash} ( 40 days ago rsi( 14 ) > 50 ) )")
+    ctx = engine.IncrementalContext(folder=folder, state_dir=state_dir)
+    np.testing.assert_array_equal(clause.evaluate(node, ctx),
+                                  clause.evaluate(node, engine.Context(folder=folder)))
+
+
+def test_run_scans_matches_full_history(folder, tmp_path):
+    scans = {f"scan_{i}": {"scan": text} for i, text in enumerate(CLAUSES)}
+    full = engine.run_scans(list(scans), scans, ctx=engine.Context(folder=folder))
+    ctx = engine.IncrementalContext(folder=folder, state_dir=str(tmp_path / "state"))
+    incremental = engine.run_scans(list(scans), scans, ctx=ctx)
+    assert ctx.tail > clause.depth(clause.parse(CLAUSES[-2]))
+    for key in scans:
+        assert list(incremental[key]["symbol"]) == list(full[key]["symbol"])
@@ -0,0 +1,83 @@
+# ===================================================================
+# test_events.py — Hub streams: where a client's stream starts
+#
+#   python -m pytest -q test_events.py
+# ===================================================================
+
+import json
+import time
+
+import pytest
+
+import events
+
+
+@pytest.fixture
+def main_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(events.storage, "MAIN_DB", str(tmp_path / "main.db"))
+    return events.storage.MAIN_DB
+
+
+def add_events(n):
+    conn = events._connect()
+    try:
+        for _ in range(n):
+            conn.execute("INSERT INTO refresh_events (created_at, payload) VALUES (?, ?)",
+                         (time.time(), json.dumps({"changed": []})))
+    finally:
+        conn.close()
+
+
+def read(stream, n):
+    """The next n messages of a stream, "retry:" / ": ping" lines left out."""
+    out = []
+    while len(out) < n:
+        msg = next(stream)
+        if msg.startswith("id: "):
+            out.append(int(msg.split("\n")[0][4:]))
+    return out
+
+
+def wait_stopped(hub):
+    for _ in range(100):
+        if hub.thread is None:
+            return
+        time.sleep(0.02)
+    raise AssertionError("hub poller still running")
+
+
+def test_new_client_after_quiet_period_starts_at_latest(main_db):
+    hub = events.Hub(poll=0.02)
+    add_events(3)
+    first = hub.stream(heartbeat=0.05)
+    next(first)
+    first.close()
+    wait_stopped(hub)
+
+    add_events(5)                       # ids 4..8, nobody connected
+    second = hub.stream(heartbeat=0.05)
+    assert next(second).startswith("retry:")
+    assert next(second) == ": ping\n\n"
+    add_events(1)
+    assert read(second, 1) == [9]
+    second.close()
+
+
+def test_reconnect_ahead_of_poller_gets_no_duplicates(main_db):
+    hub = events.Hub(poll=0.02)
+    add_events(3)
+    stream = hub.stream(last_id=5, heartbeat=0.05)   # current is 3
+    next(stream)
+    add_events(3)                       # ids 4, 5, 6
+    assert read(stream, 1) == [6]
+    stream.close()
+
+
+def test_reconnect_behind_replays_missed(main_db):
+    hub = events.Hub(poll=0.02)
+    add_events(4)
+    stream = hub.stream(last_id=1, heartbeat=0.05)
+    assert read(stream, 3) == [2, 3, 4]
+    add_events(1)
+    assert read(stream, 1) == [5]
+    stream.close()